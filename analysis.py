@@ -0,0 +1,211 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from metadata import DEFAULT_WORKERS, POOL_THRESHOLD, read_header
+
+try:
+    import numpy as np
+except ImportError:  # analysis is optional; everything else works without it
+    np = None
+
+# frames decoded per step, a multiple of HOP so envelope frames line up
+CHUNK_FRAMES = 1 << 18
+# onset envelope resolution (~11.6 ms at 44.1 kHz)
+HOP = 512
+SILENCE_DB = -60.0
+FLOOR_DB = -120.0
+# shorter than this is a one-shot; a tempo estimate would be noise
+MIN_TEMPO_SECONDS = 4.0
+TEMPO_RANGE = (60.0, 200.0)
+
+
+def available():
+    return np is not None
+
+
+def _db(level):
+    return max(FLOOR_DB, 20 * math.log10(level)) if level > 0 else FLOOR_DB
+
+
+def load_pcm(path):
+    """Memory-map the sample data of a WAV/AIFF file.
+
+    Returns (raw bytes as a (frames, channels * width) uint8 array, layout,
+    sample rate), or None for formats we can't decode (mp3, compressed
+    AIFC, ...). Nothing is read until the array is sliced.
+    """
+    meta, pcm = read_header(path)
+    if not meta or not pcm.get("supported") or "offset" not in pcm:
+        return None
+    channels, width = pcm["channels"], pcm["width"]
+    if not channels or width not in (1, 2, 3, 4, 8) or not meta.get("sample_rate"):
+        return None
+    frames = pcm.get("frames", 0)
+    if not frames:
+        return np.zeros((0, channels * width), np.uint8), pcm, meta["sample_rate"]
+    raw = np.memmap(
+        path, np.uint8, "r", offset=pcm["offset"], shape=(frames, channels * width)
+    )
+    return raw, pcm, meta["sample_rate"]
+
+
+def to_float(raw, pcm):
+    """Decode a slice of load_pcm() bytes to float32 samples in [-1, 1]."""
+    channels, width, order = pcm["channels"], pcm["width"], pcm["order"]
+    n = len(raw)
+    if pcm["float"]:
+        x = np.ascontiguousarray(raw).view(f"{order}f{width}")
+        return x.reshape(n, channels).astype(np.float32)
+    if width == 3:
+        # no 24-bit dtype: widen to 32 bits with the sample in the high
+        # bytes, then an arithmetic shift brings back the sign
+        b = np.asarray(raw).reshape(n * channels, 3)
+        wide = np.zeros((n * channels, 4), np.uint8)
+        if order == "<":
+            wide[:, 1:] = b
+        else:
+            wide[:, :3] = b
+        x = wide.view(f"{order}i4").reshape(n, channels) >> 8
+        return x.astype(np.float32) / (1 << 23)
+    if width == 1 and pcm.get("unsigned"):
+        x = np.asarray(raw).reshape(n, channels).astype(np.float32)
+        return (x - 128) / 128
+    x = np.ascontiguousarray(raw).view(f"{order}i{width}").reshape(n, channels)
+    return x.astype(np.float32) / (1 << (8 * width - 1))
+
+
+def estimate_tempo(energy, fps):
+    """Tempo in BPM from per-hop energy, via autocorrelation of onsets."""
+    if len(energy) < 4:
+        return None
+    onset = np.maximum(np.diff(np.log(energy + 1e-10)), 0)
+    onset -= onset.mean()
+    n = len(onset)
+    spec = np.fft.rfft(onset, 2 * n)
+    ac = np.fft.irfft(spec * np.conj(spec))[:n]
+    if ac[0] <= 0:
+        return None
+    lo = max(1, int(fps * 60 / TEMPO_RANGE[1]))
+    hi = min(n - 1, int(fps * 60 / TEMPO_RANGE[0]) + 1)
+    if hi <= lo + 1:
+        return None
+    lags = np.arange(lo, hi)
+    # favour tempos near 120 so a half/double-time peak doesn't win
+    weight = np.exp(-0.5 * np.log2(60 * fps / lags / 120) ** 2)
+    scores = ac[lo:hi] * weight
+    i = int(np.argmax(scores))
+    lag = float(lags[i])
+    if 0 < i < len(scores) - 1:
+        # parabolic interpolation between neighbouring lags
+        a, b, c = scores[i - 1], scores[i], scores[i + 1]
+        if a - 2 * b + c:
+            lag += 0.5 * (a - c) / (a - 2 * b + c)
+    return round(float(60 * fps / lag), 1)
+
+
+def analyze(path):
+    """Peak/RMS level, non-silent span and a tempo estimate for one file.
+
+    Returns a dict of metadata.FIELDS columns (levels in dBFS, start/end
+    and tempo in seconds/BPM), or None if the file can't be decoded.
+    Works chunk by chunk over a memory map, so memory use doesn't grow
+    with file length.
+    """
+    loaded = load_pcm(path)
+    if loaded is None:
+        return None
+    raw, pcm, rate = loaded
+    frames = len(raw)
+    threshold = 10 ** (SILENCE_DB / 20)
+    peak = 0.0
+    sumsq = 0.0
+    first = last = None
+    energy = []
+    for pos in range(0, frames, CHUNK_FRAMES):
+        x = to_float(raw[pos : pos + CHUNK_FRAMES], pcm)
+        level = np.abs(x).max(axis=1)
+        peak = max(peak, float(level.max()))
+        sumsq += float(np.square(x, dtype=np.float64).sum())
+        loud = np.flatnonzero(level > threshold)
+        if len(loud):
+            if first is None:
+                first = pos + int(loud[0])
+            last = pos + int(loud[-1])
+        mono = x.mean(axis=1)
+        usable = len(mono) // HOP * HOP
+        energy.append(np.square(mono[:usable]).reshape(-1, HOP).sum(axis=1))
+    del raw
+
+    result = {
+        "peak_db": round(_db(peak), 2),
+        "rms_db": round(_db(math.sqrt(sumsq / max(1, frames * pcm["channels"]))), 2),
+        "start": round(first / rate, 4) if first is not None else 0.0,
+        "end": round((last + 1) / rate, 4) if last is not None else 0.0,
+    }
+    if frames / rate >= MIN_TEMPO_SECONDS and energy:
+        result["tempo"] = estimate_tempo(np.concatenate(energy), rate / HOP)
+    return result
+
+
+def tempo_matches(estimate, bpm, tolerance=0.03):
+    """True if estimate agrees with bpm, allowing half and double time."""
+    return any(abs(estimate - bpm * f) <= bpm * f * tolerance for f in (0.5, 1.0, 2.0))
+
+
+def _analyze(job):
+    """Worker entry point: (path, digest) -> (digest, result or None)."""
+    path, digest = job
+    try:
+        return digest, analyze(path)
+    except (OSError, ValueError):
+        return digest, None
+
+
+def analyze_many(store, digests, workers=DEFAULT_WORKERS, progress=None):
+    """Analyse every path in digests ({path: full content hash, see
+    HashIndex.full_digests}) not analysed yet.
+
+    Results go into store (a metadata.MetadataStore). Files that can't
+    be decoded are marked as failed there and skipped until their size or
+    mtime changes. Large batches fan out over a process pool. Returns the
+    number of files analysed.
+    """
+    if np is None:
+        raise RuntimeError("audio analysis needs numpy (pip install numpy)")
+    done = store.known(set(digests.values()), field="peak_db")
+    failed = store.failed("analysis")
+    jobs, stats = [], {}
+    for path, digest in digests.items():
+        if digest in done or digest in stats:
+            continue
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stats[digest] = (st.st_size, st.st_mtime)
+        if failed.get(digest) != stats[digest]:
+            jobs.append((str(path), digest))
+    if not jobs:
+        return 0
+    pool = None
+    if len(jobs) >= POOL_THRESHOLD and workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers)
+        results = pool.map(_analyze, jobs, chunksize=8)
+    else:
+        results = map(_analyze, jobs)
+    rows, bad = [], []
+    try:
+        for i, (digest, result) in enumerate(results, 1):
+            if result is not None:
+                rows.append((digest, result))
+            else:
+                bad.append((digest, *stats[digest]))
+            if progress:
+                progress(i, len(jobs))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    store.put_many(rows)
+    store.mark_failed("analysis", bad)
+    return len(jobs)
@@ -0,0 +1,393 @@
+import importlib.util
+import json
+import os
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import core
+import ingest
+from catalog import Catalog
+from hashindex import HashIndex
+from search import SearchIndex
+from watcher import DirCache
+
+HERE = Path(__file__).resolve().parent
+BASELINES = HERE / "bench_baselines.json"
+# a library op fails when its median is this many times its baseline
+TOLERANCE = 2.0
+# synthetic library shapes; "songs" is per artist, "subtypes" per type
+SCALES = {
+    "1k": dict(types=4, subtypes=4, artists=50, songs=4, files=1000),
+    "10k": dict(types=8, subtypes=6, artists=500, songs=4, files=10000),
+    "100k": dict(types=16, subtypes=8, artists=5000, songs=4, files=100000),
+}
+# typed into the artist dropdown, one key release per character; runs
+# through the prefix, substring and fuzzy tiers
+TYPED = "elvt"
+WORDS = (
+    "acid amber blue bright broken cold crystal dark deep dust echo "
+    "ember fast float ghost glass gold heavy hollow iron low lunar metal "
+    "mono neon night pale paper quiet rapid red rough silver slow smoke "
+    "soft solar static steel storm sugar velvet warm wild"
+).split()
+SUBTYPES = (
+    "Kicks Snares Claps Hats Percs Cymbals Toms Rims Shakers Bass Leads Pads "
+    "Plucks Chords Vocals Chops FX Risers Impacts Textures Loops Fills"
+).split()
+KEYS = [
+    f"{n} {m}"
+    for n in ("C", "C#", "D", "Eb", "E", "F", "G", "A")
+    for m in ("Major", "Minor")
+]
+# seconds from process start, median over fresh interpreters
+STARTUP_BUDGET = {"cli": 0.3, "gui import": 0.6, "gui window": 1.5}
+# never imported on the command line path
+GUI_ONLY = ("tkinter", "tkmacosx", "numpy")
+# the app won't import without these; tkmacosx is optional off macOS
+GUI_NEEDS = ("tkinter", "tkmacosx")
+
+_PROBES = {
+    "cli": """
+import cli, core
+from catalog import Catalog
+Catalog.load()
+""",
+    "gui import": """
+import gui
+""",
+    "gui window": """
+import gui
+app = gui.App()
+app.update()
+app.destroy()
+""",
+}
+
+
+def has_display():
+    if sys.platform in ("darwin", "win32"):
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def missing_gui_deps():
+    return [m for m in GUI_NEEDS if importlib.util.find_spec(m) is None]
+
+
+def _probe(name, root):
+    """Run one probe in a fresh interpreter; returns (seconds, modules) or
+    raises RuntimeError with its stderr."""
+    code = (
+        "import sys\n"
+        f"sys.path.insert(0, {str(HERE)!r})\n"
+        "import core\n"
+        + (f"core.set_root({str(root)!r})\n" if root else "")
+        + _PROBES[name]
+        + f"print(__import__('json').dumps([m for m in {GUI_ONLY!r}"
+        " if m in sys.modules]))\n"
+    )
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, cwd=HERE
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return elapsed, json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def startup(runs=5, root=None):
+    """Time cold starts against STARTUP_BUDGET.
+
+    Yields (probe, median seconds or None, budget, problem or "") per
+    probe. The gui probes are skipped when its dependencies aren't
+    installed, the window probe also without a display.
+    """
+    missing = missing_gui_deps()
+    for name, budget in STARTUP_BUDGET.items():
+        if name.startswith("gui") and missing:
+            yield name, None, budget, f"skipped: {', '.join(missing)} not installed"
+            continue
+        if name == "gui window" and not has_display():
+            yield name, None, budget, "skipped: no display"
+            continue
+        try:
+            results = [_probe(name, root) for _ in range(runs)]
+        except RuntimeError as e:
+            yield name, None, budget, f"failed: {e}"
+            continue
+        median = statistics.median(t for t, _ in results)
+        problem = ""
+        loaded = results[0][1]
+        if name == "cli" and loaded:
+            problem = f"imports {', '.join(loaded)}"
+        elif median > budget:
+            problem = "over budget"
+        yield name, median, budget, problem
+
+
+# -- synthetic libraries --
+
+
+def _names(rng, n, pool, words=2):
+    """n distinct title-case names made of words from pool."""
+    names, seen = [], set()
+    while len(names) < n:
+        name = " ".join(rng.choice(pool) for _ in range(words)).title()
+        if name in seen:
+            name = f"{name} {len(names)}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def tiny_wav(seed, frames=8):
+    """A valid 16-bit mono WAV whose few frames are unique to seed."""
+    data = bytes((seed >> (8 * (i % 4)) ^ i) & 0xFF for i in range(frames * 2))
+    fmt = struct.pack("<HHIIHH", 1, 1, 44100, 88200, 2, 16)
+    return (
+        b"RIFF"
+        + struct.pack("<I", 36 + len(data))
+        + b"WAVEfmt "
+        + struct.pack("<I", len(fmt))
+        + fmt
+        + b"data"
+        + struct.pack("<I", len(data))
+        + data
+    )
+
+
+def generate(
+    root,
+    types=4,
+    subtypes=4,
+    artists=50,
+    songs=4,
+    files=1000,
+    hot=None,
+    frames=8,
+    seed=0,
+):
+    """Write a synthetic library into root: config.json plus files tiny WAVs.
+
+    Each song's files are spread over up to three type/subtype folders and
+    named with build_filename. One "hot" song folder (first type, subtype,
+    artist and song) holds hot files, files // 20 by default, so listing
+    and saving have a crowded folder to work on. Same arguments, same
+    library. Returns the hot folder's (type, subtype, artist, song).
+    """
+    root = Path(root).expanduser()
+    if (root / "config.json").exists():
+        raise FileExistsError(f"{root} already holds a library")
+    rng = random.Random(seed)
+    hot = files // 20 if hot is None else min(hot, files)
+    type_names = _names(rng, types, WORDS, 1)
+    folders = [
+        (t, s)
+        for t in type_names
+        for s in rng.sample(SUBTYPES, min(subtypes, len(SUBTYPES)))
+    ]
+    config = {"types": [], "artists": {}}
+    for t in type_names:
+        config["types"].append(
+            {"name": t, "subtypes": [s for u, s in folders if u == t]}
+        )
+    all_songs = []
+    for artist in _names(rng, artists, WORDS):
+        entries = []
+        for name in _names(rng, songs, WORDS):
+            song = {
+                "name": name,
+                "bpm": rng.randrange(70, 175),
+                "key": rng.choice(KEYS),
+            }
+            entries.append(song)
+            all_songs.append((artist, song))
+        config["artists"][artist] = {"songs": entries}
+
+    previous = core.ROOT_DIR
+    core.set_root(root)
+    try:
+        root.mkdir(parents=True, exist_ok=True)
+        core.save_config(config)
+        made = set()
+        for i in range(files):
+            if i < hot:
+                j, (t, sub) = 0, folders[0]
+            else:
+                j = i % len(all_songs)
+                t, sub = folders[(j + i // len(all_songs) % 3) % len(folders)]
+            artist, song = all_songs[j]
+            folder = core.target_dir(t, sub, artist, song["name"])
+            if folder not in made:
+                folder.mkdir(parents=True, exist_ok=True)
+                made.add(folder)
+            name = core.build_filename(
+                f"{rng.choice(WORDS)}_{i:06d}",
+                sub,
+                artist,
+                song["name"],
+                song["bpm"],
+                song["key"],
+                prefix_bpm=i % 2 == 0,
+                prefix_key=i % 3 == 0,
+                ext=".wav",
+            )
+            (folder / name).write_bytes(tiny_wav(seed * files + i, frames))
+    finally:
+        core.set_root(previous)
+    artist, song = all_songs[0]
+    return folders[0][0], folders[0][1], artist, song["name"]
+
+
+def _bench_library(scale):
+    """The generated library for scale under the temp folder, made on first
+    use and kept for later runs. Returns (root, hot selection)."""
+    root = Path(tempfile.gettempdir()) / "samplefsys-bench" / scale
+    marker = root / ".fsys" / "bench.json"
+    try:
+        info = json.loads(marker.read_text())
+        if info["shape"] == SCALES[scale]:
+            return root, tuple(info["hot"])
+    except (OSError, ValueError, KeyError):
+        pass
+    shutil.rmtree(root, ignore_errors=True)
+    hot = generate(root, **SCALES[scale])
+    marker.parent.mkdir(parents=True, exist_ok=True)
+    marker.write_text(json.dumps({"shape": SCALES[scale], "hot": hot}))
+    return root, hot
+
+
+# -- library hot paths --
+
+
+def _median(runs, fn, setup=None, teardown=None):
+    """Median seconds of fn(setup()) over runs; setup and teardown untimed."""
+    times = []
+    for _ in range(runs):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - start)
+        if teardown:
+            teardown(arg)
+    return statistics.median(times)
+
+
+def _library_ops(hot, stage):
+    """(op, fn, setup, teardown) for the headless halves of the GUI's hot
+    paths, named after the GUI method each one stands in for."""
+    type_name, subtype, artist, song = hot
+    catalog = Catalog.load()
+    index = HashIndex()
+    index.refresh()
+    target = core.target_dir(*hot)
+    entry = catalog.get_song(artist, song)
+    naming = {
+        "subtype": subtype,
+        "artist": artist,
+        "song": song,
+        "bpm": entry.bpm,
+        "key": entry.key,
+        "prefix_bpm": True,
+    }
+    before = set(os.listdir(target))
+    seeds = iter(range(10**9, 2 * 10**9))
+
+    def refresh(_):
+        # what a catalog change costs the four dropdowns: fresh name lists
+        # and a new SearchIndex for each
+        fresh = Catalog(catalog.to_config())
+        SearchIndex(fresh.type_names())
+        SearchIndex(fresh.subtype_names(type_name))
+        SearchIndex(fresh.artist_names())
+        SearchIndex(fresh.song_names(artist))
+
+    def keyrelease(dropdown):
+        for n in range(1, len(TYPED) + 1):
+            dropdown.query(TYPED[:n])
+
+    def staged():
+        folder = Path(tempfile.mkdtemp(dir=stage))
+        for _ in range(10):
+            n = next(seeds)
+            (folder / f"take {n}.wav").write_bytes(tiny_wav(n))
+        return folder
+
+    def save(folder):
+        prepared = ingest.prepare(
+            ingest.expand_sources([folder]), target, naming, index
+        )
+        ingest.store(prepared, index=index)
+
+    def unsave(folder):
+        for name in set(os.listdir(target)) - before:
+            (target / name).unlink()
+            index.remove(target / name)
+        shutil.rmtree(folder)
+
+    return [
+        ("load_config", lambda _: Catalog.load(), None, None),
+        ("refresh_from_config", refresh, None, None),
+        (
+            "on_keyrelease",
+            keyrelease,
+            lambda: SearchIndex(catalog.artist_names()),
+            None,
+        ),
+        (
+            "update_existing_files",
+            lambda cache: cache.listing(target),
+            DirCache,
+            lambda cache: cache.stop(),
+        ),
+        ("save", save, staged, unsave),
+    ]
+
+
+def load_baselines():
+    try:
+        return json.loads(BASELINES.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def library(scale="10k", runs=5, tolerance=TOLERANCE, save_baseline=False):
+    """Time the library hot paths on a generated library of scale files.
+
+    Yields (op, median seconds, baseline or None, problem or "") per op;
+    an op is a regression when it takes more than tolerance times its
+    baseline from BASELINES. save_baseline records this run's medians as
+    the new baselines for scale instead.
+    """
+    baselines = load_baselines()
+    expected = baselines.get(scale, {})
+    measured = {}
+    previous = core.ROOT_DIR
+    root, hot = _bench_library(scale)
+    core.set_root(root)
+    try:
+        with tempfile.TemporaryDirectory() as stage:
+            for op, fn, setup, teardown in _library_ops(hot, stage):
+                median = measured[op] = _median(runs, fn, setup, teardown)
+                baseline = expected.get(op)
+                problem = ""
+                if save_baseline:
+                    problem = "saved"
+                elif baseline is None:
+                    problem = "no baseline"
+                elif median > baseline * tolerance:
+                    problem = f"regression: {median / baseline:.1f}x baseline"
+                yield op, median, baseline, problem
+    finally:
+        core.set_root(previous)
+    if save_baseline:
+        baselines[scale] = {op: round(s, 6) for op, s in measured.items()}
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
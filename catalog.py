@@ -0,0 +1,274 @@
+import core
+
+
+class Song:
+    __slots__ = ("name", "bpm", "key")
+
+    def __init__(self, name, bpm=None, key=""):
+        self.name = name
+        self.bpm = bpm
+        self.key = key
+
+    def to_dict(self):
+        return {"name": self.name, "bpm": self.bpm, "key": self.key}
+
+
+class Type:
+    __slots__ = ("name", "subtypes")
+
+    def __init__(self, name, subtypes=()):
+        self.name = name
+        # dict used as an ordered set: O(1) membership, keeps config order
+        self.subtypes = dict.fromkeys(subtypes)
+
+
+class Artist:
+    __slots__ = ("name", "songs")
+
+    def __init__(self, name, songs=()):
+        self.name = name
+        self.songs = {s.name: s for s in songs}
+
+
+def _sorted(names):
+    return sorted(names, key=str.lower)
+
+
+class Catalog:
+    """Types, subtypes, artists and songs keyed by name.
+
+    Built from (and serialized back to) the config.json schema. Lookups are
+    dict hits; sorted name lists for the dropdowns are cached until the
+    part of the catalog they come from changes. ``rev`` counts changes to
+    the "types" and "artists" halves so the UI can tell what moved.
+    """
+
+    def __init__(self, config=None):
+        config = config or {"types": [], "artists": {}}
+        self.types = {
+            t["name"]: Type(t["name"], t["subtypes"]) for t in config["types"]
+        }
+        self.artists = {
+            name: Artist(
+                name,
+                [Song(s["name"], s.get("bpm"), s.get("key", "")) for s in a["songs"]],
+            )
+            for name, a in config["artists"].items()
+        }
+        self.rev = {"types": 0, "artists": 0}
+        self._views = {}
+
+    @classmethod
+    def load(cls):
+        return cls(core.load_config())
+
+    def to_config(self):
+        return {
+            "types": [
+                {"name": t.name, "subtypes": list(t.subtypes)}
+                for t in self.types.values()
+            ],
+            "artists": {
+                a.name: {"songs": [s.to_dict() for s in a.songs.values()]}
+                for a in self.artists.values()
+            },
+        }
+
+    # -- lookups --
+
+    def _view(self, key, names):
+        view = self._views.get(key)
+        if view is None:
+            view = self._views[key] = _sorted(names())
+        return view
+
+    def type_names(self):
+        return self._view(("types",), lambda: self.types)
+
+    def subtype_names(self, type_name):
+        t = self.types.get(type_name)
+        if t is None:
+            return []
+        return self._view(("subtypes", type_name), lambda: t.subtypes)
+
+    def artist_names(self):
+        return self._view(("artists",), lambda: self.artists)
+
+    def song_names(self, artist):
+        a = self.artists.get(artist)
+        if a is None:
+            return []
+        return self._view(("songs", artist), lambda: a.songs)
+
+    def has_subtype(self, type_name, subtype):
+        t = self.types.get(type_name)
+        return t is not None and subtype in t.subtypes
+
+    def get_song(self, artist, song):
+        a = self.artists.get(artist)
+        return a.songs.get(song) if a is not None else None
+
+    # -- mutations (journaled as-is; loading replays them through here) --
+
+    def update(self, op, **fields):
+        """Apply one change and durably journal just that change."""
+        getattr(self, "_" + op)(**fields)
+        core.config_store().record({"op": op, **fields}, self.to_config)
+
+    def update_many(self, entries):
+        """Apply several {"op": ..., **fields} changes with one journal write."""
+        for entry in entries:
+            self._apply(entry)
+        core.config_store().record_many(entries, self.to_config)
+
+    @classmethod
+    def replay(cls, config, entries):
+        """config (schema dict, or None) with journal entries applied."""
+        catalog = cls(config)
+        for entry in entries:
+            catalog._apply(entry)
+        return catalog.to_config()
+
+    def _apply(self, entry):
+        fields = dict(entry)
+        getattr(self, "_" + fields.pop("op"))(**fields)
+
+    def inverse(self, op, **fields):
+        """Entries that undo op, from the catalog as it is before op runs."""
+        if op == "delete_type":
+            t = self.types.get(fields["name"])
+            if t is None:
+                return []
+            return [{"op": "add_type", "name": t.name}] + [
+                {"op": "add_subtype", "type_name": t.name, "name": s}
+                for s in t.subtypes
+            ]
+        if op == "delete_subtype":
+            if not self.has_subtype(fields["type_name"], fields["name"]):
+                return []
+            return [{"op": "add_subtype", **fields}]
+        if op == "delete_artist":
+            a = self.artists.get(fields["name"])
+            if a is None:
+                return []
+            return [{"op": "add_artist", "name": a.name}] + [
+                {"op": "add_song", "artist": a.name, "song": s.to_dict()}
+                for s in a.songs.values()
+            ]
+        if op == "delete_song":
+            s = self.get_song(fields["artist"], fields["name"])
+            if s is None:
+                return []
+            return [{"op": "add_song", "artist": fields["artist"], "song": s.to_dict()}]
+        raise ValueError(f"no inverse for {op}")
+
+    def song_dirs(self, artist, song):
+        """Every <type>/<subtype>/<artist>/<song> folder this song can have."""
+        return [
+            core.target_dir(t.name, sub, artist, song)
+            for t in self.types.values()
+            for sub in t.subtypes
+        ]
+
+    def _changed(self, section, *keys):
+        self.rev[section] += 1
+        for key in keys:
+            self._views.pop(key, None)
+
+    def _add_type(self, name):
+        if name not in self.types:
+            self.types[name] = Type(name)
+            self._changed("types", ("types",))
+
+    def _delete_type(self, name):
+        if self.types.pop(name, None) is not None:
+            self._changed("types", ("types",), ("subtypes", name))
+
+    def _rename_type(self, name, new_name):
+        t = self.types.get(name)
+        if t is None or new_name in self.types:
+            return
+        t.name = new_name
+        # rebuilt so the type keeps its place in config order
+        self.types = {t.name: t for t in self.types.values()}
+        self._changed("types", ("types",), ("subtypes", name), ("subtypes", new_name))
+
+    def _add_subtype(self, type_name, name):
+        t = self.types.get(type_name)
+        if t is not None and name not in t.subtypes:
+            t.subtypes[name] = None
+            self._changed("types", ("subtypes", type_name))
+
+    def _delete_subtype(self, type_name, name):
+        t = self.types.get(type_name)
+        if t is not None and t.subtypes.pop(name, 0) is None:
+            self._changed("types", ("subtypes", type_name))
+
+    def _rename_subtype(self, type_name, name, new_name, new_type=None):
+        old = self.types.get(type_name)
+        new = self.types.get(new_type or type_name)
+        if old is None or new is None:
+            return
+        if name not in old.subtypes or new_name in new.subtypes:
+            return
+        if old is new:
+            old.subtypes = {new_name if s == name else s: None for s in old.subtypes}
+        else:
+            del old.subtypes[name]
+            new.subtypes[new_name] = None
+        self._changed("types", ("subtypes", old.name), ("subtypes", new.name))
+
+    def _add_artist(self, name):
+        if name not in self.artists:
+            self.artists[name] = Artist(name)
+            self._changed("artists", ("artists",))
+
+    def _delete_artist(self, name):
+        if self.artists.pop(name, None) is not None:
+            self._changed("artists", ("artists",), ("songs", name))
+
+    def _rename_artist(self, name, new_name):
+        a = self.artists.get(name)
+        if a is None or new_name in self.artists:
+            return
+        a.name = new_name
+        self.artists = {a.name: a for a in self.artists.values()}
+        self._changed("artists", ("artists",), ("songs", name), ("songs", new_name))
+
+    def _add_song(self, artist, song):
+        self._add_artist(artist)
+        a = self.artists[artist]
+        if song["name"] not in a.songs:
+            a.songs[song["name"]] = Song(
+                song["name"], song.get("bpm"), song.get("key", "")
+            )
+            self._changed("artists", ("songs", artist))
+
+    def _update_song(self, artist, song):
+        a = self.artists.get(artist)
+        if a is not None and song["name"] in a.songs:
+            a.songs[song["name"]] = Song(
+                song["name"], song.get("bpm"), song.get("key", "")
+            )
+            self._changed("artists")
+
+    def _rename_song(self, artist, name, new_name, new_artist=None):
+        old = self.artists.get(artist)
+        new = self.artists.get(new_artist or artist)
+        if old is None or new is None:
+            return
+        if name not in old.songs or new_name in new.songs:
+            return
+        song = old.songs[name]
+        song.name = new_name
+        if old is new:
+            old.songs = {s.name: s for s in old.songs.values()}
+        else:
+            del old.songs[name]
+            new.songs[new_name] = song
+        self._changed("artists", ("songs", old.name), ("songs", new.name))
+
+    def _delete_song(self, artist, name):
+        a = self.artists.get(artist)
+        if a is not None and a.songs.pop(name, None) is not None:
+            self._changed("artists", ("songs", artist))
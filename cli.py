@@ -0,0 +1,781 @@
+import argparse
+import csv
+import sys
+import time
+
+import core
+import hashindex
+import ingest
+import instrument
+from catalog import Catalog
+from copyengine import DEFAULT_WORKERS, STORAGE_MODES
+from hashindex import HashIndex
+from ingest import expand_sources
+from metadata import MetadataStore
+import fsck
+import renamer
+from sampleindex import SampleIndex
+from scanner import LibraryScan
+from trash import Trash
+
+
+def cmd_bench(args):
+    # subprocess and statistics stay off every other command's startup
+    import bench
+
+    if args.suite == "generate":
+        if not args.root:
+            print("generate needs --root", file=sys.stderr)
+            return 2
+        shape = dict(bench.SCALES[args.scale])
+        for size in ("types", "subtypes", "artists", "songs", "files", "hot"):
+            if getattr(args, size) is not None:
+                shape[size] = getattr(args, size)
+        try:
+            hot = bench.generate(args.root, frames=args.frames, **shape)
+        except FileExistsError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print(f"{shape['files']} files in {args.root}; crowded folder: {'/'.join(hot)}")
+        return 0
+    if args.suite == "startup":
+        results = bench.startup(args.runs, args.root)
+        width, against = 12, "budget"
+    else:
+        results = bench.library(
+            args.scale, args.runs, args.tolerance, args.save_baseline
+        )
+        width, against = 22, "baseline"
+    failed = 0
+    for name, seconds, limit, problem in results:
+        took = f"{seconds * 1000:8.1f} ms" if seconds is not None else "       — "
+        limit = f"{limit * 1000:.1f} ms" if limit is not None else "—"
+        print(f"{name:<{width}} {took}  ({against} {limit})  {problem}")
+        if problem and not problem.startswith(("skipped", "saved", "no baseline")):
+            failed += 1
+    return 1 if failed else 0
+
+
+def cmd_fsck(args):
+    catalog = Catalog.load()
+    trash = Trash()
+    trash.recover(catalog)
+    index = HashIndex()
+    # hashes.db follows anything rolled forward, as in cmd_move
+    renamer.recover_renames(index.rename)
+    renamer.recover_moves(catalog, index.rename_tree, index.rename)
+    scan = LibraryScan()
+    start = time.perf_counter()
+    scan.rescan(full=args.full)
+    issues = fsck.check(catalog, scan)
+    elapsed = time.perf_counter() - start
+    if not args.quiet:
+        for issue in issues:
+            print(f"{issue.kind:<8} {issue.path}  ({issue.detail})")
+    counts = {}
+    for issue in issues:
+        counts[issue.kind] = counts.get(issue.kind, 0) + 1
+    summary = ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items()))
+    files, dirs = scan.count()
+    print(
+        f"Checked {files} file(s) in {dirs} folder(s) in {elapsed * 1000:.0f} ms:"
+        f" {summary or 'no problems'}"
+    )
+    if args.adopt or args.create or args.clean or args.discard or args.prune:
+        done = fsck.repair(
+            catalog,
+            scan,
+            issues,
+            adopt=args.adopt,
+            create=args.create,
+            clean=args.clean,
+            discard=args.discard,
+            prune=args.prune,
+            trash=trash,
+        )
+        print("Repaired: " + ", ".join(f"{n} {what}" for what, n in done.items()))
+        if args.discard or args.prune:
+            print("(python app.py trash --undo puts them back)")
+        scan.rescan()
+        return 0
+    return 1 if issues else 0
+
+
+def cmd_import(args):
+    catalog = Catalog.load()
+
+    if args.type not in catalog.types:
+        print(f"Unknown type: {args.type}", file=sys.stderr)
+        return 2
+    if not catalog.has_subtype(args.type, args.subtype):
+        print(f"Unknown subtype for {args.type}: {args.subtype}", file=sys.stderr)
+        return 2
+    if args.artist not in catalog.artists:
+        print(f"Unknown artist: {args.artist}", file=sys.stderr)
+        return 2
+    song_info = catalog.get_song(args.artist, args.song)
+    if song_info is None:
+        print(f"Unknown song for {args.artist}: {args.song}", file=sys.stderr)
+        return 2
+
+    naming = {
+        "subtype": args.subtype,
+        "artist": args.artist,
+        "song": args.song,
+        "bpm": song_info.bpm,
+        "key": song_info.key,
+        "prefix_artist": args.prefix_artist,
+        "prefix_song": args.prefix_song,
+        "prefix_bpm": args.prefix_bpm,
+        "prefix_key": args.prefix_key,
+        "suffix_og": args.suffix_og,
+    }
+    settings = ingest.Settings(
+        args.rate, args.bits, args.normalize, args.level, args.trim
+    )
+    if ingest.active(settings) and not ingest.numpy_available():
+        print("conversion needs numpy: pip install numpy", file=sys.stderr)
+        return 2
+
+    target = core.target_dir(args.type, args.subtype, args.artist, args.song)
+    index = HashIndex()
+    prepared = ingest.prepare(
+        expand_sources(args.sources),
+        target,
+        naming,
+        index=index if args.duplicates != "copy" else None,
+        settings=settings,
+    )
+    plan = []
+    for status, src, dest, reason in prepared.rows:
+        dup = prepared.dups.get(dest) if status == "save" else None
+        if dup is not None:
+            rel = dup.relative_to(core.ROOT_DIR)
+            if args.duplicates == "skip":
+                status, dest, reason = "skip", None, f"identical to {rel}"
+            else:
+                status, reason = "link", f"identical to {rel}, linked"
+        plan.append((status, src, dest, reason))
+
+    results = {}
+    if not args.dry_run:
+        results = ingest.store(
+            prepared, args.mode, args.duplicates, settings, args.workers, index
+        )
+    # WAV/AIFF files the settings change are converted instead of copied
+    converted = {dest for src, dest in prepared.jobs if src in prepared.converting}
+
+    report = []
+    counts = {"saved": 0, "skipped": 0, "collision": 0, "failed": 0}
+    for status, src, dest, reason in plan:
+        if status in ("save", "link"):
+            r = results.get(dest)
+            if r is None or r.ok:
+                wanted = args.mode if status == "save" else "hardlink"
+                status = "saved"
+                if dest in converted:
+                    reason = "converted"
+                elif r is not None and r.mode != wanted:
+                    reason = f"{wanted} unsupported, copied"
+            else:
+                status, reason = "failed", r.error
+        elif status == "skip":
+            status = "skipped"
+        counts[status] += 1
+        report.append((status, src, dest, reason))
+        if not args.quiet:
+            line = f"{status:<10} {src}"
+            if dest is not None:
+                line += f" -> {dest.name}"
+            if reason:
+                line += f" ({reason})"
+            print(line)
+
+    if args.report:
+        with open(args.report, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["status", "source", "dest", "reason"])
+            for status, src, dest, reason in report:
+                w.writerow([status, src, dest or "", reason])
+
+    print(
+        f"{'Would save' if args.dry_run else 'Saved'} {counts['saved']} file(s) "
+        f"→ {target} — {counts['skipped']} skipped, "
+        f"{counts['collision']} collision(s), {counts['failed']} failed"
+    )
+    return 1 if counts["failed"] else 0
+
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+
+def cmd_dedupe(args):
+    index = HashIndex()
+    hashed, dropped = index.refresh(workers=args.workers)
+    print(f"Index updated: {hashed} file(s) hashed, {dropped} dropped")
+
+    groups = wasted = reclaimed = 0
+    for group in index.duplicate_groups():
+        groups += 1
+        size = group[0].stat().st_size
+        wasted += size * (len(group) - 1)
+        print(f"{len(group)} copies, {format_size(size)} each:")
+        for p in group:
+            print(f"    {p.relative_to(core.ROOT_DIR)}")
+        if args.collapse:
+            freed, skipped = hashindex.collapse(group)
+            reclaimed += freed
+            for p, reason in skipped:
+                print(f"    skipped {p.relative_to(core.ROOT_DIR)} ({reason})")
+            for p in group[1:]:
+                index.add(p)
+
+    print(f"{groups} duplicate group(s), {format_size(wasted)} duplicated")
+    if args.collapse:
+        print(f"Collapsed into hardlinks, {format_size(reclaimed)} reclaimed")
+    return 0
+
+
+def parse_range(text):
+    low, _, high = text.partition("-")
+    return float(low), float(high or low)
+
+
+def cmd_metadata(args):
+    index = HashIndex()
+    index.refresh(workers=args.workers)
+    digests = index.full_digests(workers=args.workers)
+    store = MetadataStore()
+    read = store.extract(list(digests), digests, workers=args.workers)
+    print(f"Read metadata from {read} file(s), {len(digests) - read} cached")
+
+    bpm = parse_range(args.bpm) if args.bpm else None
+    if bpm is None and not args.key:
+        return 0
+    matches = store.find(bpm=bpm, key=args.key)
+    for path, meta in matches:
+        details = [f"{meta['duration']:.2f}s"] if "duration" in meta else []
+        if "bpm" in meta:
+            details.append(f"{meta['bpm']:g} BPM")
+        if "key" in meta:
+            details.append(meta["key"])
+        print(f"{path.relative_to(core.ROOT_DIR)}  ({', '.join(details)})")
+    print(f"{len(matches)} match(es)")
+    return 0
+
+
+def cmd_analyze(args):
+    # numpy is only imported by the commands that use it
+    import analysis
+
+    if not analysis.available():
+        print("analyze needs numpy: pip install numpy", file=sys.stderr)
+        return 1
+    index = HashIndex()
+    index.refresh(workers=args.workers)
+    digests = index.full_digests(workers=args.workers)
+    store = MetadataStore()
+    start = time.perf_counter()
+    done = analysis.analyze_many(store, digests, workers=args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Analysed {done} new sample(s) in {elapsed:.1f}s")
+    if not args.check_bpm:
+        return 0
+
+    # song folders are <type>/<subtype>/<artist>/<song>
+    catalog = Catalog.load()
+    mismatches = 0
+    for path, digest in sorted(digests.items()):
+        parts = path.relative_to(core.ROOT_DIR).parts
+        if len(parts) < 5:
+            continue
+        song = catalog.get_song(parts[2], parts[3])
+        meta = store.get(digest) or {}
+        if song is None or not song.bpm or not meta.get("tempo"):
+            continue
+        if not analysis.tempo_matches(meta["tempo"], song.bpm):
+            mismatches += 1
+            print(
+                f"{path.relative_to(core.ROOT_DIR)}: sounds like "
+                f"{meta['tempo']:g} BPM, song is {song.bpm}"
+            )
+    print(f"{mismatches} tempo mismatch(es)")
+    return 0
+
+
+def cmd_rename(args):
+    catalog = Catalog.load()
+    index = HashIndex()
+    renamer.recover_renames(index.rename)
+    renamer.recover_moves(catalog, index.rename_tree, index.rename)
+    was = {}
+    if args.bpm is not None or args.key is not None:
+        song = catalog.get_song(args.artist, args.song) if args.song else None
+        if song is None:
+            print("--bpm/--key need an existing --artist and --song", file=sys.stderr)
+            return 2
+        # names built with the values being corrected still parse
+        was = {"bpm": song.bpm, "key": song.key}
+        # plan with the corrected values; only saved with --apply
+        if args.bpm is not None:
+            song.bpm = args.bpm
+        if args.key is not None:
+            song.key = args.key
+
+    naming = {
+        opt: getattr(args, opt)
+        for opt in (
+            "prefix_artist",
+            "prefix_song",
+            "prefix_bpm",
+            "prefix_key",
+            "suffix_og",
+        )
+        if getattr(args, opt) is not None
+    }
+    folders = renamer.song_folders(
+        catalog, args.type, args.subtype, args.artist, args.song
+    )
+    plan = renamer.plan_renames(catalog, folders, naming, was)
+    renames = [(src, dest) for status, src, dest, _ in plan if status == "rename"]
+    collisions = [p for p in plan if p[0] == "collision"]
+    if not args.quiet:
+        for status, src, dest, reason in plan:
+            line = f"{status:<10} {src.relative_to(core.ROOT_DIR)} -> {dest.name}"
+            print(line + (f"  ({reason})" if reason else ""))
+
+    if args.apply:
+        search = SampleIndex(catalog)
+
+        def renamed(src, dest):
+            index.rename(src, dest)
+            search.rename(src, dest)
+
+        if args.bpm is not None or args.key is not None:
+            catalog.update("update_song", artist=args.artist, song=song.to_dict())
+        failed = renamer.apply_renames(renames, on_renamed=renamed)
+        if args.bpm is not None or args.key is not None:
+            # the song's samples are found by its BPM/key too
+            for folder in catalog.song_dirs(args.artist, args.song):
+                search.reindex_tree(folder)
+        for src, dest, reason in failed:
+            print(f"failed     {src.relative_to(core.ROOT_DIR)}  ({reason})")
+        print(
+            f"{len(renames) - len(failed)} renamed, {len(collisions)} collision(s),"
+            f" {len(failed)} failed"
+        )
+        return 1 if failed or collisions else 0
+    print(
+        f"{len(renames)} to rename, {len(collisions)} collision(s)"
+        " (dry run, use --apply)"
+    )
+    return 1 if collisions else 0
+
+
+def cmd_move(args):
+    catalog = Catalog.load()
+    index = HashIndex()
+    renamer.recover_moves(catalog, index.rename_tree, index.rename)
+    new_name = args.new_name or args.name
+    if args.kind == "type":
+        fields = {"name": args.name, "new_name": new_name}
+    elif args.kind == "subtype":
+        if not args.type:
+            print("moving a subtype needs --type", file=sys.stderr)
+            return 2
+        fields = {
+            "type_name": args.type,
+            "name": args.name,
+            "new_name": new_name,
+            "new_type": args.to_type,
+        }
+    elif args.kind == "artist":
+        fields = {"name": args.name, "new_name": new_name}
+    else:
+        if not args.artist:
+            print("moving a song needs --artist", file=sys.stderr)
+            return 2
+        fields = {
+            "artist": args.artist,
+            "name": args.name,
+            "new_name": new_name,
+            "new_artist": args.to_artist,
+        }
+
+    def moved(src, dest):
+        index.rename_tree(src, dest)
+        print(
+            f"moved    {src.relative_to(core.ROOT_DIR)}"
+            f" -> {dest.relative_to(core.ROOT_DIR)}"
+        )
+
+    def renamed(src, dest):
+        index.rename(src, dest)
+        if not args.quiet:
+            print(f"renamed  {src.name} -> {dest.name}")
+
+    try:
+        skipped = renamer.move_node(
+            catalog,
+            f"rename_{args.kind}",
+            fields,
+            rename_files=args.rename_files,
+            on_moved=moved,
+            on_renamed=renamed,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    except OSError as e:
+        print(f"nothing moved: {e.strerror}: {e.filename}", file=sys.stderr)
+        return 1
+    for src, dest, reason in skipped:
+        print(f"skipped  {src.relative_to(core.ROOT_DIR)} -> {dest.name}  ({reason})")
+    print(f"Moved {args.kind} {args.name}")
+    return 1 if skipped else 0
+
+
+def cmd_scan(args):
+    scan = LibraryScan()
+    start = time.perf_counter()
+    listed, seen = scan.rescan(full=args.full)
+    elapsed = time.perf_counter() - start
+    files, dirs = scan.count()
+    print(f"{files} file(s) in {dirs} folder(s)")
+    print(f"Listed {listed} of {seen} folder(s) in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+def cmd_search(args):
+    catalog = Catalog.load()
+    scan = LibraryScan()
+    scan.rescan()
+    index = SampleIndex(catalog)
+    added, removed = index.sync(scan)
+    if added or removed:
+        print(f"Indexed {added} new, dropped {removed} gone", file=sys.stderr)
+    start = time.perf_counter()
+    hits = index.search(" ".join(args.terms), limit=args.limit)
+    elapsed = time.perf_counter() - start
+    for path in hits:
+        print(path.relative_to(core.ROOT_DIR))
+    more = "+" if len(hits) >= args.limit else ""
+    print(f"{len(hits)}{more} match(es) in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0 if hits else 1
+
+
+def cmd_trace(args):
+    try:
+        events = instrument.read_trace(args.file)
+    except OSError as e:
+        print(f"{args.file}: {e.strerror}", file=sys.stderr)
+        return 1
+    for name, count, total, peak in instrument.summarize(events):
+        print(
+            f"{name:<16} {count:>7}×  total {total * 1000:9.1f} ms"
+            f"  mean {total / count * 1000:7.2f} ms  max {peak * 1000:7.1f} ms"
+        )
+    if args.chrome:
+        instrument.write_chrome(events, args.chrome)
+        print(f"Wrote {args.chrome} (chrome://tracing, ui.perfetto.dev, speedscope)")
+    return 0
+
+
+def cmd_trash(args):
+    trash = Trash()
+    catalog = Catalog.load()
+    trash.recover(catalog)
+    if args.undo:
+        tx, restored = trash.undo(catalog)
+        if tx is None:
+            print("Nothing to undo")
+            return 1
+        for path in restored:
+            print(f"restored  {path.relative_to(core.ROOT_DIR)}")
+        print(f"Undid {', '.join(e['op'] for e in tx.ops)}")
+        return 0
+    if args.empty:
+        print(f"Reclaimed {trash.reclaim(keep=0)} delete(s)")
+        return 0
+    for tx in trash.transactions():
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(tx.time))
+        what = ", ".join(f"{e['op']} {e.get('name', '')}".strip() for e in tx.ops)
+        print(f"{when}  {tx.state:<9}  {what}  ({len(tx.items)} folder(s))")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="app.py", description="sample fsys")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--root", help="library folder (defaults to ROOT_DIR)")
+    common.add_argument(
+        "--trace", metavar="FILE", help="append timing spans to FILE (JSON lines)"
+    )
+
+    p = sub.add_parser(
+        "import", parents=[common], help="file many samples into one song folder"
+    )
+    p.add_argument("--type", required=True)
+    p.add_argument("--subtype", required=True)
+    p.add_argument("--artist", required=True)
+    p.add_argument("--song", required=True)
+    p.add_argument(
+        "sources",
+        nargs="+",
+        help="audio files, folders, globs, or .csv/.txt manifests",
+    )
+    # same defaults as the checkboxes in the GUI
+    p.add_argument(
+        "--prefix-artist", action=argparse.BooleanOptionalAction, default=True
+    )
+    p.add_argument("--prefix-song", action=argparse.BooleanOptionalAction, default=True)
+    p.add_argument("--prefix-bpm", action=argparse.BooleanOptionalAction, default=False)
+    p.add_argument("--prefix-key", action=argparse.BooleanOptionalAction, default=False)
+    p.add_argument("--suffix-og", action=argparse.BooleanOptionalAction, default=True)
+    p.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help=f"parallel copies (default {DEFAULT_WORKERS})",
+    )
+    p.add_argument(
+        "--mode",
+        choices=STORAGE_MODES,
+        default="copy",
+        help="how files get into the library (falls back to copy)",
+    )
+    p.add_argument(
+        "--duplicates",
+        choices=("copy", "link", "skip"),
+        default="copy",
+        help="what to do with audio already in the library (default copy)",
+    )
+    # conversion of WAV/AIFF on the way in (needs numpy); other files are
+    # stored as they are
+    p.add_argument("--rate", type=int, help="resample to this rate (Hz)")
+    p.add_argument(
+        "--bits",
+        type=int,
+        choices=sorted(ingest.FORMATS),
+        help="bit depth to write (32 is float)",
+    )
+    p.add_argument("--normalize", choices=ingest.NORMALIZE)
+    p.add_argument(
+        "--level",
+        type=float,
+        help="normalization target in dB: peak dBFS (default "
+        f"{ingest.DEFAULT_LEVELS['peak']}) or RMS for loudness (default "
+        f"{ingest.DEFAULT_LEVELS['loudness']})",
+    )
+    p.add_argument("--trim", action="store_true", help="cut leading silence")
+    p.add_argument("--dry-run", action="store_true", help="report without copying")
+    p.add_argument("--report", help="also write the per-file report to this CSV")
+    p.add_argument("-q", "--quiet", action="store_true", help="only print summary")
+    p.set_defaults(func=cmd_import)
+
+    p = sub.add_parser("dedupe", parents=[common], help="report byte-identical samples")
+    p.add_argument(
+        "--collapse",
+        action="store_true",
+        help="replace duplicates with hardlinks to one copy",
+    )
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    p.set_defaults(func=cmd_dedupe)
+
+    p = sub.add_parser(
+        "metadata",
+        parents=[common],
+        help="read sample headers into the index and filter on them",
+    )
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    p.add_argument("--bpm", help="list samples at this tempo, e.g. 120 or 118-124")
+    p.add_argument("--key", help="list samples in this key, e.g. C# or 'C# Minor'")
+    p.set_defaults(func=cmd_metadata)
+
+    p = sub.add_parser(
+        "analyze",
+        parents=[common],
+        help="measure levels, silence and tempo of every sample (needs numpy)",
+    )
+    p.add_argument("--workers", type=int, default=DEFAULT_WORKERS)
+    p.add_argument(
+        "--check-bpm",
+        action="store_true",
+        help="list samples whose tempo disagrees with their song's BPM",
+    )
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser(
+        "search",
+        parents=[common],
+        help="find samples anywhere by name, type, artist, song, BPM or key",
+    )
+    p.add_argument("terms", nargs="+", help='e.g. 128 "c# minor" kick')
+    p.add_argument("--limit", type=int, default=500)
+    p.set_defaults(func=cmd_search)
+
+    p = sub.add_parser(
+        "trace", parents=[common], help="summarize a timing trace (see --trace)"
+    )
+    p.add_argument("file", help="JSON-lines trace from --trace, FSYS_TRACE or F12")
+    p.add_argument(
+        "--chrome",
+        metavar="OUT",
+        help="also write it as a Chrome trace for flame charts",
+    )
+    p.set_defaults(func=cmd_trace)
+
+    p = sub.add_parser("trash", parents=[common], help="list, undo or empty deletes")
+    group = p.add_mutually_exclusive_group()
+    group.add_argument("--undo", action="store_true", help="undo the last delete")
+    group.add_argument(
+        "--empty", action="store_true", help="reclaim every delete (no undo after)"
+    )
+    p.set_defaults(func=cmd_trash)
+
+    p = sub.add_parser(
+        "fsck", parents=[common], help="check the library against the config"
+    )
+    p.add_argument("--full", action="store_true", help="list every folder again")
+    p.add_argument("--adopt", action="store_true", help="add orphan folders to config")
+    p.add_argument(
+        "--create", action="store_true", help="make missing type/subtype folders"
+    )
+    p.add_argument("--clean", action="store_true", help="remove stale temp files")
+    p.add_argument(
+        "--discard",
+        action="store_true",
+        help="trash orphan folders (unless adopted) and stray/unknown files",
+    )
+    p.add_argument(
+        "--prune",
+        action="store_true",
+        help="trash config entries for artists/songs with no folder",
+    )
+    p.add_argument("-q", "--quiet", action="store_true", help="only print summary")
+    p.set_defaults(func=cmd_fsck)
+
+    p = sub.add_parser(
+        "move",
+        parents=[common],
+        help="rename a type/subtype/artist/song, or move it to a new parent",
+    )
+    p.add_argument("kind", choices=("type", "subtype", "artist", "song"))
+    p.add_argument("name")
+    p.add_argument("new_name", nargs="?", help="defaults to the same name")
+    p.add_argument("--type", help="the subtype's type")
+    p.add_argument("--artist", help="the song's artist")
+    p.add_argument("--to-type", help="move the subtype under this type")
+    p.add_argument("--to-artist", help="move the song to this artist")
+    p.add_argument(
+        "--rename-files",
+        action="store_true",
+        help="also rename samples whose names carry the old name",
+    )
+    p.add_argument("-q", "--quiet", action="store_true", help="don't list renames")
+    p.set_defaults(func=cmd_move)
+
+    p = sub.add_parser(
+        "rename",
+        parents=[common],
+        help="rename existing samples after naming options or BPM/key change",
+    )
+    p.add_argument("--type")
+    p.add_argument("--subtype")
+    p.add_argument("--artist")
+    p.add_argument("--song")
+    p.add_argument("--bpm", type=int, help="correct the song's BPM first")
+    p.add_argument("--key", help="correct the song's key first")
+    # unset flags keep what each file was named with
+    for opt in ("artist", "song", "bpm", "key"):
+        p.add_argument(f"--prefix-{opt}", action=argparse.BooleanOptionalAction)
+    p.add_argument("--suffix-og", action=argparse.BooleanOptionalAction)
+    p.add_argument("--apply", action="store_true", help="rename (default: dry run)")
+    p.add_argument("-q", "--quiet", action="store_true", help="only print summary")
+    p.set_defaults(func=cmd_rename)
+
+    p = sub.add_parser(
+        "bench",
+        parents=[common],
+        help="check startup time and the library hot paths for regressions",
+    )
+    p.add_argument(
+        "suite",
+        choices=("startup", "library", "generate"),
+        help="cold starts against their budgets, library operations against"
+        " their baselines, or write a synthetic library into --root",
+    )
+    p.add_argument(
+        "--runs", type=int, default=5, help="fresh processes or repeats per timing"
+    )
+    p.add_argument(
+        "--scale",
+        choices=("1k", "10k", "100k"),
+        default="10k",
+        help="synthetic library size (bench.SCALES)",
+    )
+    p.add_argument(
+        "--tolerance",
+        type=float,
+        default=2.0,
+        help="fail when an operation takes this many times its baseline",
+    )
+    p.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="record this run as the baseline for --scale",
+    )
+    for size in ("types", "subtypes", "artists", "songs", "files"):
+        p.add_argument(f"--{size}", type=int, help=f"generate: number of {size}")
+    p.add_argument(
+        "--hot", type=int, help="generate: files in the one crowded song folder"
+    )
+    p.add_argument(
+        "--frames", type=int, default=8, help="generate: audio frames per file"
+    )
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser(
+        "scan", parents=[common], help="update the library snapshot in .fsys"
+    )
+    p.add_argument(
+        "--full", action="store_true", help="list every folder, even unchanged ones"
+    )
+    p.set_defaults(func=cmd_scan)
+
+    return parser
+
+
+COMMANDS = (
+    "import",
+    "analyze",
+    "bench",
+    "dedupe",
+    "fsck",
+    "metadata",
+    "move",
+    "rename",
+    "scan",
+    "search",
+    "trace",
+    "trash",
+)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.root:
+        core.set_root(args.root)
+    if args.trace:
+        instrument.start_trace(args.trace)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import instrument
+
+# rewrite config.json and start a fresh journal after this many changes
+COMPACT_EVERY = 1000
+
+
+def _base(text):
+    """Names the snapshot a journal applies to; None for no snapshot."""
+    if text is None:
+        return None
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def write_atomic(path, text):
+    """Replace path with text so readers only ever see the old or new file."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class ConfigStore:
+    """config.json snapshot plus an append-only journal of changes.
+
+    Each change is one fsync'd JSON line in config.journal, so an edit costs
+    a few bytes instead of a full rewrite. Loading replays the journal over
+    the snapshot with replay(config, entries), which returns the new
+    config; every COMPACT_EVERY changes the snapshot is rewritten
+    atomically and the journal is emptied. A journal starts with the hash
+    of the snapshot it applies to, so one left behind by a compaction
+    that died halfway is not replayed a second time.
+    """
+
+    def __init__(self, path, replay):
+        self.path = Path(path)
+        self.replay = replay
+        self.journal_path = self.path.with_suffix(".journal")
+        self.pending = 0
+        self._journal = None
+
+    @instrument.timed("config.load")
+    def load(self, default=None):
+        text = self.path.read_text() if self.path.exists() else None
+        config = json.loads(text) if text is not None else default
+        torn = False
+        entries = []
+        if self.journal_path.exists():
+            with open(self.journal_path) as f:
+                for i, line in enumerate(f):
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # crash mid-append; everything before it is intact
+                        torn = True
+                        break
+                    if i == 0 and "base" in entry:
+                        if entry["base"] != _base(text):
+                            # already in the snapshot; compact cut it short
+                            torn = True
+                            break
+                    else:
+                        entries.append(entry)
+                    if not line.endswith("\n"):
+                        # complete entry, but the next append would join it
+                        torn = True
+        if entries:
+            config = self.replay(config, entries)
+        self.pending = len(entries)
+        if config is None:
+            return None
+        if torn or self.pending >= COMPACT_EVERY or not self.path.exists():
+            self.compact(config)
+        return config
+
+    @instrument.timed("config.journal")
+    def record(self, entry, snapshot):
+        """Durably append one change; compact if the journal got long.
+
+        snapshot() returns the full config and is only called to compact.
+        """
+        self._append([entry], snapshot)
+
+    @instrument.timed("config.journal")
+    def record_many(self, entries, snapshot):
+        """Like record() for several changes, with a single fsync."""
+        if entries:
+            self._append(entries, snapshot)
+
+    def _append(self, entries, snapshot):
+        if self._journal is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "a")
+            if self._journal.tell() == 0:
+                text = self.path.read_text() if self.path.exists() else None
+                self._journal.write(json.dumps({"base": _base(text)}) + "\n")
+        self._journal.write(
+            "".join(json.dumps(e, separators=(",", ":")) + "\n" for e in entries)
+        )
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self.pending += len(entries)
+        if self.pending >= COMPACT_EVERY:
+            self.compact(snapshot())
+
+    @instrument.timed("config.save")
+    def compact(self, config):
+        """Write the full config as the new snapshot and empty the journal."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(self.path, json.dumps(config, indent=4))
+        # snapshot is durable now; a crash before this truncate leaves a
+        # journal whose base no longer matches, and load() drops it
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+        with open(self.journal_path, "w") as f:
+            os.fsync(f.fileno())
+        self.pending = 0
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
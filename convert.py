@@ -0,0 +1,350 @@
+import math
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+
+from analysis import CHUNK_FRAMES, SILENCE_DB, load_pcm, to_float
+from copyengine import CopyResult, part_paths, publish
+from ingest import DEFAULT_LEVELS, FORMATS, active
+from metadata import DEFAULT_WORKERS, POOL_THRESHOLD
+
+try:
+    import numpy as np
+except ImportError:  # conversion is optional, like analysis
+    np = None
+
+# loudness normalization never pushes peaks above this
+PEAK_CEILING = -0.3
+# kept ahead of the first sound when trimming, so the attack survives
+TRIM_PAD = 0.005
+# windowed-sinc resampler: input samples each side, Kaiser window shape
+TAPS = 24
+KAISER_BETA = 8.6
+OUT_BLOCK = 1 << 16
+# chunks copied into the converted file; the rest describe the old audio
+KEEP_CHUNKS = {"wav": (b"acid",), "aiff": (b"basc",)}
+
+
+def _container(path):
+    with open(path, "rb") as f:
+        return "wav" if f.read(4) == b"RIFF" else "aiff"
+
+
+def _out_format(pcm, bits):
+    if bits:
+        return FORMATS[bits]
+    fmt = (pcm["width"], pcm["float"])
+    if fmt in FORMATS.values():
+        return fmt
+    # 8-bit goes up to 16; 32-bit int and 64-bit float become 32-bit float
+    return FORMATS[16] if pcm["width"] == 1 else FORMATS[32]
+
+
+def needed(path, settings):
+    """True if saving path with settings changes its audio.
+
+    False for anything we can't decode (mp3, flac, compressed AIFC), which
+    is then stored as it is.
+    """
+    if not active(settings) or np is None:
+        return False
+    try:
+        loaded = load_pcm(path)
+    except (OSError, ValueError):
+        return False
+    if loaded is None:
+        return False
+    raw, pcm, rate = loaded
+    del raw
+    if settings.normalize or settings.trim:
+        return True
+    if settings.rate and settings.rate != rate:
+        return True
+    return _out_format(pcm, settings.bits) != (pcm["width"], pcm["float"])
+
+
+def measure(raw, pcm):
+    """(peak, RMS of the frames above the silence threshold, first such
+    frame or None) for load_pcm() data."""
+    threshold = 10 ** (SILENCE_DB / 20)
+    peak = 0.0
+    sumsq = 0.0
+    loud_frames = 0
+    first = None
+    for pos in range(0, len(raw), CHUNK_FRAMES):
+        x = to_float(raw[pos : pos + CHUNK_FRAMES], pcm)
+        level = np.abs(x).max(axis=1)
+        peak = max(peak, float(level.max(initial=0)))
+        loud = level > threshold
+        n = int(loud.sum())
+        if n:
+            if first is None:
+                first = pos + int(np.argmax(loud))
+            sumsq += float(np.square(x[loud], dtype=np.float64).sum())
+            loud_frames += n
+    rms = math.sqrt(sumsq / (loud_frames * pcm["channels"])) if loud_frames else 0.0
+    return peak, rms, first
+
+
+def _db(level):
+    return 20 * math.log10(level)
+
+
+def gain_for(settings, peak, rms):
+    """Linear gain that brings a file to the settings' level."""
+    if not settings.normalize or peak <= 0:
+        return 1.0
+    level = settings.level
+    if level is None:
+        level = DEFAULT_LEVELS[settings.normalize]
+    if settings.normalize == "peak":
+        gain_db = level - _db(peak)
+    else:
+        gain_db = min(level - _db(rms), PEAK_CEILING - _db(peak))
+    return 10 ** (gain_db / 20)
+
+
+def _kernel(up, down):
+    """Windowed-sinc weights, one row of 2 * TAPS per output phase."""
+    # below the lower of the two Nyquist frequencies, as a fraction of the input's
+    cutoff = min(1.0, up / down) * 0.95
+    k = np.arange(-TAPS + 1, TAPS + 1)
+    x = k[None, :] - np.arange(up)[:, None] / up
+    window = np.i0(KAISER_BETA * np.sqrt(np.clip(1 - (x / TAPS) ** 2, 0, None)))
+    h = cutoff * np.sinc(cutoff * x) * window
+    # unity gain at DC for every phase
+    return (h / h.sum(axis=1, keepdims=True)).astype(np.float32)
+
+
+def _reader(raw, pcm, start, frames):
+    """read(lo, hi) -> float frames lo..hi after start, zeros outside."""
+    channels = pcm["channels"]
+
+    def read(lo, hi):
+        a, b = max(lo, 0), min(hi, frames)
+        if a == lo and b == hi:
+            return to_float(raw[start + a : start + b], pcm)
+        x = np.zeros((hi - lo, channels), np.float32)
+        if b > a:
+            x[a - lo : b - lo] = to_float(raw[start + a : start + b], pcm)
+        return x
+
+    return read
+
+
+def _resample(read, up, down, h, n0, n1):
+    """Output frames n0..n1 at up/down times the input rate.
+
+    n0 is a multiple of up, so output r of each run of up frames always
+    uses kernel phase r * down % up, starting r * down // up inputs into
+    the run: one strided matrix-vector product per phase.
+    """
+    i0 = n0 // up * down
+    periods = -(-(n1 - n0) // up)
+    x = read(i0 - TAPS + 1, i0 + periods * down + TAPS + 1)
+    windows = np.lib.stride_tricks.sliding_window_view(x, 2 * TAPS, axis=0)
+    out = np.empty((periods * up, x.shape[1]), np.float32)
+    for r in range(up):
+        c = r * down // up
+        out[r::up] = windows[c : c + periods * down : down] @ h[r * down % up]
+    return out[: n1 - n0]
+
+
+def _encode(x, fmt, order, rng=None):
+    """Float frames to interleaved sample bytes; rng adds TPDF dither."""
+    width, is_float = fmt
+    if is_float:
+        return x.astype(f"{order}f4").tobytes()
+    scale = float(1 << (8 * width - 1))
+    y = x * scale
+    if rng is not None:
+        y += rng.random(y.shape, np.float32) - rng.random(y.shape, np.float32)
+    y = np.clip(np.round(y), -scale, scale - 1).astype(np.int32)
+    if width == 2:
+        return y.astype(f"{order}i2").tobytes()
+    b = y.astype(f"{order}i4").view(np.uint8).reshape(-1, 4)
+    return (b[:, :3] if order == "<" else b[:, 1:]).tobytes()
+
+
+def _extended(value):
+    """float to 80-bit IEEE 754 extended (AIFF sample rate)."""
+    if value <= 0:
+        return bytes(10)
+    mant, exp = math.frexp(value)
+    return struct.pack(">HQ", exp - 1 + 16383, int(mant * 2**64))
+
+
+def _chunk(cid, data, order):
+    return cid + struct.pack(order + "I", len(data)) + data + b"\0" * (len(data) & 1)
+
+
+def _kept_chunks(path, container):
+    order = "<" if container == "wav" else ">"
+    out = b""
+    with open(path, "rb") as f:
+        f.seek(12)
+        while True:
+            head = f.read(8)
+            if len(head) < 8:
+                break
+            cid, size = struct.unpack(order + "4sI", head)
+            if cid in KEEP_CHUNKS[container]:
+                out += _chunk(cid, f.read(size), order)
+                f.seek(size & 1, 1)
+            else:
+                f.seek(size + (size & 1), 1)
+    return out
+
+
+def _header(container, channels, rate, fmt, frames, extra):
+    width, is_float = fmt
+    data = frames * channels * width
+    pad = data & 1
+    if container == "wav":
+        fmt_chunk = struct.pack(
+            "<HHIIHH",
+            3 if is_float else 1,
+            channels,
+            rate,
+            rate * channels * width,
+            channels * width,
+            width * 8,
+        )
+        chunks = _chunk(b"fmt ", fmt_chunk, "<")
+        if is_float:
+            chunks += _chunk(b"fact", struct.pack("<I", frames), "<")
+        chunks += extra
+        size = 4 + len(chunks) + 8 + data + pad
+        return (
+            b"RIFF"
+            + struct.pack("<I", size)
+            + b"WAVE"
+            + chunks
+            + b"data"
+            + struct.pack("<I", data)
+        )
+    comm = struct.pack(">hIh", channels, frames, width * 8) + _extended(rate)
+    if is_float:
+        # AIFC: float samples need a compression type (and FVER)
+        name = b"\x0c32-bit float\x00"
+        chunks = _chunk(b"FVER", struct.pack(">I", 0xA2805140), ">")
+        chunks += _chunk(b"COMM", comm + b"fl32" + name, ">")
+        form = b"AIFC"
+    else:
+        chunks = _chunk(b"COMM", comm, ">")
+        form = b"AIFF"
+    chunks += extra
+    size = 4 + len(chunks) + 16 + data + pad
+    return (
+        b"FORM"
+        + struct.pack(">I", size)
+        + form
+        + chunks
+        + b"SSND"
+        + struct.pack(">III", 8 + data, 0, 0)
+    )
+
+
+def convert_file(src, dest, settings):
+    """Write src (WAV/AIFF) to dest converted with settings.
+
+    Two passes over a memory map: one measures peak/RMS and where the
+    sound starts (only when normalizing or trimming), the other resamples,
+    applies gain and re-encodes block by block, so memory use doesn't grow
+    with file length. The result keeps src's container (plain AIFF, or
+    AIFC for float) and goes through a hidden .part file, so dest is
+    either absent or complete; an existing dest is never replaced.
+    Returns the size written.
+    """
+    loaded = load_pcm(src)
+    if loaded is None:
+        raise ValueError("not a WAV/AIFF file that can be decoded")
+    raw, pcm, rate = loaded
+    container = _container(src)
+    frames = len(raw)
+    start = 0
+    gain = 1.0
+    if settings.normalize or settings.trim:
+        peak, rms, first = measure(raw, pcm)
+        gain = gain_for(settings, peak, rms)
+        if settings.trim and first is not None:
+            start = max(0, first - int(TRIM_PAD * rate))
+    frames -= start
+    out_rate = settings.rate or rate
+    ratio = Fraction(int(out_rate), int(rate))
+    up, down = ratio.numerator, ratio.denominator
+    out_frames = -(-frames * up // down)
+    fmt = _out_format(pcm, settings.bits)
+    order = "<" if container == "wav" else ">"
+    # dither only when samples are actually recomputed for 16 bits
+    exact = gain == 1.0 and up == down and not pcm["float"] and pcm["width"] <= 2
+    rng = np.random.default_rng(0) if fmt == FORMATS[16] and not exact else None
+    extra = _kept_chunks(src, container)
+    if container == "aiff" and (start or up != down):
+        extra = b""  # 'basc' counts beats; its tempo comes from the duration
+
+    read = _reader(raw, pcm, start, frames)
+    h = _kernel(up, down) if up != down else None
+    part = part_paths(dest)[0]
+    try:
+        with open(part, "wb") as f:
+            f.write(
+                _header(
+                    container, pcm["channels"], int(out_rate), fmt, out_frames, extra
+                )
+            )
+            block = max(1, OUT_BLOCK // up) * up if h is not None else CHUNK_FRAMES
+            for n0 in range(0, out_frames, block):
+                n1 = min(out_frames, n0 + block)
+                if h is not None:
+                    x = _resample(read, up, down, h, n0, n1)
+                else:
+                    x = read(n0, n1)
+                if gain != 1.0:
+                    x = x * np.float32(gain)
+                f.write(_encode(x, fmt, order, rng))
+            if (out_frames * pcm["channels"] * fmt[0]) & 1:
+                f.write(b"\0")
+            f.flush()
+            os.fsync(f.fileno())
+            size = f.tell()
+        publish(part, dest)
+    except BaseException:
+        try:
+            os.unlink(part)
+        except OSError:
+            pass
+        raise
+    finally:
+        del raw
+    return size
+
+
+def _convert(job):
+    """Worker entry point: (src, dest, settings) -> CopyResult."""
+    src, dest, settings = job
+    try:
+        size = convert_file(src, dest, settings)
+    except FileExistsError:
+        return CopyResult(src, dest, False, "target filename already exists")
+    except OSError as e:
+        return CopyResult(src, dest, False, e.strerror or str(e))
+    except ValueError as e:
+        return CopyResult(src, dest, False, str(e))
+    return CopyResult(src, dest, True, size=size, mode="convert")
+
+
+def convert_many(jobs, settings, workers=DEFAULT_WORKERS):
+    """Convert (src, dest) pairs, yielding a CopyResult for each in order.
+
+    Large batches fan out over a process pool.
+    """
+    if np is None:
+        raise RuntimeError("conversion needs numpy (pip install numpy)")
+    jobs = [(src, dest, settings) for src, dest in jobs]
+    if len(jobs) < POOL_THRESHOLD or workers <= 1:
+        yield from map(_convert, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        yield from pool.map(_convert, jobs)
@@ -0,0 +1,488 @@
+import ctypes
+import ctypes.util
+import errno
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import instrument
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, copies just aren't guarded
+    fcntl = None
+
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 2) * 2)
+CHUNK_SIZE = 4 * 1024 * 1024
+PART_SUFFIX = ".part"
+# big enough that redoing an interrupted copy hurts; these checkpoint
+RESUME_MIN_SIZE = 64 * 1024 * 1024
+CHECKPOINT_BYTES = 64 * 1024 * 1024
+
+STORAGE_MODES = ("copy", "hardlink", "reflink", "move")
+
+# errors meaning "this filesystem can't do that", as opposed to real failures
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EPERM,
+    errno.EINVAL,
+    errno.ENOTSUP,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.ENOSYS,
+    errno.EMLINK,
+}
+
+FICLONE = 0x40049409  # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def _direct(fn, *args):
+    fn(*args)
+
+
+class CopyResult:
+    __slots__ = ("src", "dest", "ok", "error", "size", "mode", "checksum")
+
+    def __init__(self, src, dest, ok, error=None, size=0, mode=None, checksum=None):
+        self.src = src
+        self.dest = dest
+        self.ok = ok
+        self.error = error
+        self.size = size
+        self.mode = mode  # storage mode actually used, after any fallback
+        self.checksum = checksum  # from copy_file, when bytes were copied
+
+
+class CopyBatch:
+    """Progress and results for one group of copies."""
+
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.files_total = len(jobs)
+        self.files_done = 0
+        self.bytes_total = 0
+        self.bytes_done = 0
+        self.sizes = {}
+        self.results = []
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        if not jobs:
+            self._finished.set()
+
+    @property
+    def ok(self):
+        return [r for r in self.results if r.ok]
+
+    @property
+    def failed(self):
+        return [r for r in self.results if not r.ok]
+
+    def cancel(self):
+        """Stop copies that haven't started yet (running ones finish)."""
+        self.cancelled = True
+
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+
+def part_paths(dest):
+    """Hidden temp file and checkpoint a copy to dest streams into."""
+    dest = Path(dest)
+    return (
+        dest.with_name(f".{dest.name}{PART_SUFFIX}"),
+        dest.with_name(f".{dest.name}{PART_SUFFIX}.ckpt"),
+    )
+
+
+def _chunk_digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def _fsync_dir(folder):
+    try:
+        fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _read_checkpoint(ckpt, part, src, st):
+    """(offset, chunk digests) to resume from, or (0, []) if it doesn't fit."""
+    try:
+        with open(ckpt) as f:
+            state = json.load(f)
+        if (state["src"], state["size"], state["mtime_ns"]) != (
+            os.path.abspath(src),
+            st.st_size,
+            st.st_mtime_ns,
+        ):
+            return 0, []
+        offset = state["offset"]
+        chunks = [bytes.fromhex(c) for c in state["chunks"]]
+        if offset != sum(state["lengths"]) or os.path.getsize(part) < offset:
+            return 0, []
+        if chunks:
+            # the last checkpointed chunk must read back as it was written
+            with open(part, "rb") as f:
+                f.seek(offset - state["lengths"][-1])
+                if _chunk_digest(f.read(state["lengths"][-1])) != chunks[-1]:
+                    return 0, []
+        return offset, list(zip(chunks, state["lengths"]))
+    except (OSError, ValueError, KeyError, TypeError):
+        return 0, []
+
+
+def _write_checkpoint(ckpt, src, st, offset, chunks):
+    tmp = ckpt.with_name(ckpt.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(
+            {
+                "src": os.path.abspath(src),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "offset": offset,
+                "chunks": [c.hex() for c, _ in chunks],
+                "lengths": [n for _, n in chunks],
+            },
+            f,
+        )
+    os.replace(tmp, ckpt)
+
+
+def publish(part, dest):
+    """Give part its final name, failing instead of replacing dest."""
+    try:
+        os.link(part, dest)
+    except OSError as e:
+        if not _unsupported(e):
+            raise
+        # no hardlinks here (exFAT, some network shares): best effort
+        if os.path.lexists(dest):
+            raise FileExistsError(errno.EEXIST, "File exists", str(dest))
+        os.rename(part, dest)
+    else:
+        os.unlink(part)
+
+
+def copy_file(src, dest, progress=None, chunk_size=CHUNK_SIZE, resume=True):
+    """Copy src to dest via a temp file, verified and atomically renamed.
+
+    Bytes stream into a hidden .part file next to dest, hashed chunk by
+    chunk as they go. Once everything is written and fsync'd, and src
+    still has the size and mtime it had at the start, the file is linked
+    into place, so dest is either absent or complete. An existing dest is
+    never replaced (FileExistsError).
+
+    Files of RESUME_MIN_SIZE or more keep a checkpoint (offset plus chunk
+    digests) every CHECKPOINT_BYTES. An interrupted copy leaves its .part
+    behind and the next copy_file to the same dest resumes from the last
+    checkpoint. Smaller files just start over.
+
+    Returns (size, checksum): a BLAKE2 digest over the per-chunk digests,
+    computed from the bytes as they were read.
+    """
+    dest = Path(dest)
+    if os.path.lexists(dest):
+        raise FileExistsError(errno.EEXIST, "File exists", str(dest))
+    part, ckpt = part_paths(dest)
+    st = os.stat(src)
+    size = st.st_size
+    resumable = resume and size >= RESUME_MIN_SIZE
+    offset, chunks = 0, []
+    if resumable and os.path.exists(ckpt):
+        offset, chunks = _read_checkpoint(ckpt, part, src, st)
+
+    fd = os.open(part, os.O_RDWR | os.O_CREAT, 0o644)
+    with open(fd, "r+b") as fdst:
+        if fcntl is not None:
+            try:
+                fcntl.flock(fdst.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                # another copy to the same dest is running right now
+                raise FileExistsError(errno.EEXIST, "Copy in progress", str(dest))
+        try:
+            fdst.truncate(offset)
+            fdst.seek(offset)
+            copied = offset
+            since_checkpoint = 0
+            if progress and copied:
+                progress(copied, size)
+            with open(src, "rb") as fsrc:
+                fsrc.seek(offset)
+                buf = bytearray(min(chunk_size, max(size, 1)))
+                view = memoryview(buf)
+                while True:
+                    n = fsrc.readinto(buf)
+                    if not n:
+                        break
+                    chunks.append((_chunk_digest(view[:n]), n))
+                    fdst.write(view[:n])
+                    copied += n
+                    since_checkpoint += n
+                    if resumable and since_checkpoint >= CHECKPOINT_BYTES:
+                        fdst.flush()
+                        os.fsync(fdst.fileno())
+                        _write_checkpoint(ckpt, src, st, copied, chunks)
+                        since_checkpoint = 0
+                    if progress:
+                        progress(copied, size)
+            fdst.flush()
+            os.fsync(fdst.fileno())
+            now = os.stat(src)
+            if (now.st_size, now.st_mtime_ns) != (size, st.st_mtime_ns) or (
+                copied != size
+            ):
+                raise OSError(errno.EAGAIN, "source changed while copying", str(src))
+            shutil.copystat(src, part)
+            publish(part, dest)
+        except BaseException as e:
+            # keep a big copy's progress, unless there's nothing to resume
+            # into (dest appeared) or src changed under us
+            keep = resumable and not isinstance(e, FileExistsError)
+            keep = keep and not (isinstance(e, OSError) and e.errno == errno.EAGAIN)
+            if not keep:
+                for p in (part, ckpt):
+                    try:
+                        os.unlink(p)
+                    except OSError:
+                        pass
+            raise
+    try:
+        os.unlink(ckpt)
+    except OSError:
+        pass
+    _fsync_dir(dest.parent)
+    checksum = hashlib.blake2b(b"".join(c for c, _ in chunks), digest_size=16)
+    return size, checksum.hexdigest()
+
+
+def _unsupported(e):
+    return isinstance(e, OSError) and e.errno in UNSUPPORTED_ERRNOS
+
+
+_clonefile = None
+
+
+def _macos_clonefile():
+    global _clonefile
+    if _clonefile is None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _clonefile = libc.clonefile
+        _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        _clonefile.restype = ctypes.c_int
+    return _clonefile
+
+
+def reflink_file(src, dest):
+    """Make dest a copy-on-write clone of src (APFS, btrfs, XFS).
+
+    Raises OSError with an errno from UNSUPPORTED_ERRNOS when the
+    filesystem or platform can't clone.
+    """
+    if sys.platform == "darwin":
+        clonefile = _macos_clonefile()
+        if clonefile(os.fsencode(src), os.fsencode(dest), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), str(dest))
+        return
+    if not sys.platform.startswith("linux"):
+        raise OSError(errno.ENOTSUP, "reflink not supported on this platform")
+    with open(src, "rb") as fsrc, open(dest, "xb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            fdst.close()
+            os.unlink(dest)
+            raise
+    shutil.copystat(src, dest)
+
+
+def move_file(src, dest, progress=None):
+    """Move src to dest without ever replacing an existing dest.
+
+    Returns (mode used, checksum): "move" for a rename on the same volume
+    (no checksum), or "copy" when it had to copy across volumes before
+    removing src.
+    """
+    try:
+        # link + unlink is a rename that fails instead of overwriting
+        os.link(src, dest)
+        os.unlink(src)
+        return "move", None
+    except OSError as e:
+        if not _unsupported(e):
+            raise
+        if e.errno != errno.EXDEV:
+            if os.path.lexists(dest):
+                raise FileExistsError(errno.EEXIST, "File exists", str(dest))
+            try:
+                os.rename(src, dest)
+                return "move", None
+            except OSError as e2:
+                if e2.errno != errno.EXDEV:
+                    raise
+    _, checksum = copy_file(src, dest, progress)
+    os.unlink(src)
+    return "copy", checksum
+
+
+@instrument.timed("copy.file")
+def store_file(src, dest, mode="copy", progress=None):
+    """Put src at dest using a storage mode, falling back to a plain copy.
+
+    Returns (size, mode actually used, checksum or None). Only byte copies
+    have a checksum; links and clones share the source's data.
+    """
+    if mode not in STORAGE_MODES:
+        raise ValueError(f"unknown storage mode: {mode}")
+    size = os.path.getsize(src)
+    if mode == "hardlink":
+        try:
+            os.link(src, dest)
+            if progress:
+                progress(size, size)
+            return size, "hardlink", None
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+    elif mode == "reflink":
+        try:
+            reflink_file(src, dest)
+            if progress:
+                progress(size, size)
+            return size, "reflink", None
+        except OSError as e:
+            if not _unsupported(e):
+                raise
+    elif mode == "move":
+        used, checksum = move_file(src, dest, progress)
+        if used == "move" and progress:
+            progress(size, size)
+        return size, used, checksum
+    size, checksum = copy_file(src, dest, progress)
+    return size, "copy", checksum
+
+
+class CopyEngine:
+    """Copies files on a bounded thread pool.
+
+    Callbacks are handed to ``dispatch(fn, *args)`` instead of being called
+    on the worker thread, so a GUI can marshal them onto its own loop.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, dispatch=None):
+        self.workers = max(1, int(workers))
+        self.dispatch = dispatch or _direct
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="fsys-copy"
+        )
+
+    def copy(
+        self,
+        jobs,
+        mode="copy",
+        on_file=None,
+        on_file_progress=None,
+        on_progress=None,
+        on_done=None,
+    ):
+        """Queue (src, dest) pairs and return a CopyBatch right away.
+
+        mode is one of STORAGE_MODES; see store_file for the fallbacks.
+
+        on_file_progress(src, copied, size) -- bytes copied for one file
+        on_progress(batch)                  -- aggregate bytes/files so far
+        on_file(result)                     -- one file finished (CopyResult)
+        on_done(batch)                      -- every file finished
+        """
+        jobs = [(src, dest) for src, dest in jobs]
+        batch = CopyBatch(jobs)
+        for job in jobs:
+            try:
+                batch.sizes[job] = os.path.getsize(job[0])
+            except OSError:
+                batch.sizes[job] = 0
+        batch.bytes_total = sum(batch.sizes.values())
+        if not jobs:
+            if on_done:
+                self.dispatch(on_done, batch)
+            return batch
+        for src, dest in jobs:
+            self._pool.submit(
+                self._run,
+                batch,
+                src,
+                dest,
+                mode,
+                on_file,
+                on_file_progress,
+                on_progress,
+                on_done,
+            )
+        return batch
+
+    def _run(
+        self, batch, src, dest, mode, on_file, on_file_progress, on_progress, on_done
+    ):
+        last = [0]
+
+        def progress(copied, size):
+            with batch._lock:
+                batch.bytes_done += copied - last[0]
+            last[0] = copied
+            if on_file_progress:
+                self.dispatch(on_file_progress, src, copied, size)
+            if on_progress:
+                self.dispatch(on_progress, batch)
+
+        if batch.cancelled:
+            result = CopyResult(src, dest, False, "cancelled")
+        else:
+            try:
+                size, used, checksum = store_file(src, dest, mode, progress)
+                result = CopyResult(
+                    src, dest, True, size=size, mode=used, checksum=checksum
+                )
+            except FileExistsError:
+                result = CopyResult(src, dest, False, "target filename already exists")
+            except OSError as e:
+                result = CopyResult(src, dest, False, e.strerror or str(e))
+            except Exception as e:
+                # anything else fails this file, not the whole batch
+                result = CopyResult(src, dest, False, str(e) or type(e).__name__)
+
+        with batch._lock:
+            if not result.ok:
+                # count what won't be copied so the total still adds up
+                batch.bytes_done += batch.sizes.get((src, dest), 0) - last[0]
+            batch.results.append(result)
+            batch.files_done += 1
+            finished = batch.files_done == batch.files_total
+        try:
+            if on_file:
+                self.dispatch(on_file, result)
+            if on_progress:
+                self.dispatch(on_progress, batch)
+        finally:
+            if finished:
+                # set even if a callback raised, so wait() can't hang
+                batch._finished.set()
+                if on_done:
+                    self.dispatch(on_done, batch)
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,156 @@
+import os
+from pathlib import Path
+
+import instrument
+from configstore import ConfigStore
+
+ROOT_DIR = Path("/Users/brandonwang/Music/Ableton/User Library/Samples/BRANDON STASH")
+CONFIG_FILE = ROOT_DIR / "config.json"
+# hidden, so it never shows up as a sample or a type folder
+STATE_DIR = ROOT_DIR / ".fsys"
+# deleted folders wait here until reclaimed; same volume, so deletes are renames
+TRASH_DIR = ROOT_DIR / ".trash"
+
+# same list the Browse dialog filters on
+AUDIO_EXTENSIONS = (".wav", ".aiff", ".mp3", ".flac", ".ogg")
+
+
+def set_root(path):
+    """Point the library at a different folder (used by the CLI's --root)."""
+    global ROOT_DIR, CONFIG_FILE, STATE_DIR, TRASH_DIR
+    ROOT_DIR = Path(path).expanduser()
+    CONFIG_FILE = ROOT_DIR / "config.json"
+    STATE_DIR = ROOT_DIR / ".fsys"
+    TRASH_DIR = ROOT_DIR / ".trash"
+
+
+_store = None
+
+
+def config_store():
+    global _store
+    if _store is None or _store.path != CONFIG_FILE:
+        _store = ConfigStore(CONFIG_FILE, _replay)
+    return _store
+
+
+def _replay(config, entries):
+    # the catalog's ops are the one implementation of every change
+    from catalog import Catalog
+
+    return Catalog.replay(config, entries)
+
+
+def load_config():
+    return config_store().load(default={"types": [], "artists": {}})
+
+
+def save_config(config):
+    """Rewrite the whole config atomically (bulk changes)."""
+    config_store().compact(config)
+
+
+def iter_samples(folder=None):
+    """Yield every sample file under folder (default: the whole library)."""
+    folder = Path(folder) if folder is not None else ROOT_DIR
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+        for name in filenames:
+            if not name.startswith(".") and name.lower().endswith(AUDIO_EXTENSIONS):
+                yield Path(dirpath) / name
+
+
+def target_dir(type_name, subtype, artist, song):
+    """Return the folder a sample for this selection is saved into."""
+    parts = [p for p in [type_name, subtype, artist, song] if p]
+    return ROOT_DIR.joinpath(*parts)
+
+
+@instrument.timed("naming.build")
+def build_filename(
+    base,
+    subtype="",
+    artist="",
+    song="",
+    bpm=None,
+    key="",
+    prefix_artist=False,
+    prefix_song=False,
+    prefix_bpm=False,
+    prefix_key=False,
+    suffix_og=False,
+    ext="",
+):
+    """Build a sample filename from its base name and the naming options."""
+    base = base.strip()
+    if not base:
+        return ""
+
+    prefix_parts = []
+
+    # always include subtype if present (with the intentional [:-1])
+    if subtype:
+        prefix_parts.append(subtype.replace(" ", "_")[:-1])
+
+    # optional prefixes (BPM / artist / song / key)
+    if prefix_bpm and bpm is not None:
+        prefix_parts.append(str(bpm))
+    if prefix_artist and artist:
+        prefix_parts.append(artist.replace(" ", "_"))
+    if prefix_song and song:
+        prefix_parts.append(song.replace(" ", "_"))
+    if prefix_key and key:
+        prefix_parts.append(key.replace(" ", "_"))
+
+    name = base
+    if prefix_parts:
+        name = "_".join(prefix_parts) + "_" + name
+
+    # optional suffix
+    if suffix_og:
+        name = name + "_og"
+
+    return name + ext
+
+
+def parse_filename(filename, subtype="", artist="", song="", bpms=(), keys=()):
+    """Undo build_filename for a file in a <subtype>/<artist>/<song> folder.
+
+    A BPM or key prefix is only recognized when it is one of bpms / keys
+    (the song's value, plus the one being replaced when it's corrected),
+    so a base name that starts with a number or a note name ("808_boom",
+    "Am_chord") is kept whole. Returns (base, options, ext) where options
+    holds the build_filename flags the name was built with, or None if
+    the name doesn't start with the subtype prefix (so wasn't built by us).
+    """
+    stem, ext = os.path.splitext(filename)
+    options = {
+        "prefix_artist": False,
+        "prefix_song": False,
+        "prefix_bpm": False,
+        "prefix_key": False,
+        "suffix_og": False,
+    }
+    if stem.endswith("_og") and len(stem) > 3:
+        stem = stem[:-3]
+        options["suffix_og"] = True
+    tokens = stem.split("_")
+
+    def take(word):
+        parts = word.replace(" ", "_").split("_")
+        if word and tokens[: len(parts)] == parts and len(tokens) > len(parts):
+            del tokens[: len(parts)]
+            return True
+        return False
+
+    if subtype and not take(subtype[:-1]):
+        return None
+    options["prefix_bpm"] = any(take(str(b)) for b in bpms if b is not None)
+    options["prefix_artist"] = take(artist)
+    options["prefix_song"] = take(song)
+    # longest first, so "C_Minor" wins over a plain "C"
+    for key in sorted({k for k in keys if k}, key=len, reverse=True):
+        if take(key):
+            options["prefix_key"] = True
+            break
+    return "_".join(tokens), options, ext
@@ -0,0 +1,229 @@
+import os
+import time
+from collections import namedtuple
+
+import core
+from copyengine import PART_SUFFIX
+from trash import Trash
+
+# temp files younger than this may belong to a copy or rename in progress
+STALE_AFTER = 24 * 3600
+LEVELS = ("type", "subtype", "artist", "song")
+
+# kind is "orphan" (folder the catalog doesn't know), "missing" (catalog
+# entry with no folder), "stray" (file outside a song folder), "unknown"
+# (non-audio file in a song folder) or "temp" (leftover of an interrupted
+# copy, rename or write); path is library-relative posix; detail says which
+# level or why
+Issue = namedtuple("Issue", "kind path detail")
+
+
+def _is_temp(name):
+    return name.startswith(".") and (
+        name.endswith((PART_SUFFIX, PART_SUFFIX + ".ckpt", ".tmp"))
+        or ".renaming-" in name
+    )
+
+
+def check(catalog, scan, now=None):
+    """Compare the catalog with a LibraryScan snapshot.
+
+    Works entirely from the snapshot, so call scan.rescan() first.
+    Returns a list of Issues, orphans reported at the topmost folder only.
+    """
+    now = time.time() if now is None else now
+    issues = []
+    folders = scan.folders()
+    artists_seen, songs_seen = set(), set()
+    covered = set()  # orphan folders and everything under them
+    for rel in sorted(folders, key=lambda r: (r.count("/"), r)):
+        if not rel:
+            continue
+        parts = rel.split("/")
+        depth = len(parts)
+        if depth == 3:
+            artists_seen.add(parts[2])
+        elif depth == 4:
+            songs_seen.add((parts[2], parts[3]))
+        if depth > 1 and rel.rsplit("/", 1)[0] in covered:
+            covered.add(rel)
+            continue
+        if depth == 1:
+            known = parts[0] in catalog.types
+        elif depth == 2:
+            known = catalog.has_subtype(parts[0], parts[1])
+        elif depth == 3:
+            known = parts[2] in catalog.artists
+        elif depth == 4:
+            known = catalog.get_song(parts[2], parts[3]) is not None
+        else:
+            known = False
+        if not known:
+            covered.add(rel)
+            level = LEVELS[depth - 1] if depth <= 4 else "subfolder"
+            issues.append(Issue("orphan", rel, level))
+
+    for t in catalog.types.values():
+        if t.name not in folders:
+            issues.append(Issue("missing", t.name, "type"))
+            continue
+        for sub in t.subtypes:
+            if f"{t.name}/{sub}" not in folders:
+                issues.append(Issue("missing", f"{t.name}/{sub}", "subtype"))
+    for a in catalog.artists.values():
+        if a.name not in artists_seen:
+            issues.append(Issue("missing", a.name, "artist"))
+            continue
+        for s in a.songs:
+            if (a.name, s) not in songs_seen:
+                issues.append(Issue("missing", f"{a.name}/{s}", "song"))
+
+    top = {core.CONFIG_FILE.name, core.CONFIG_FILE.with_suffix(".journal").name}
+    for rel, name, size, mtime, ino in scan.rows():
+        path = f"{rel}/{name}" if rel else name
+        if _is_temp(name):
+            if now - mtime / 1e9 > STALE_AFTER:
+                issues.append(Issue("temp", path, "interrupted copy or rename"))
+            continue
+        if name.startswith(".") or (not rel and name in top):
+            continue
+        if rel in covered:
+            continue  # goes with its orphan folder
+        if rel.count("/") != 3:
+            issues.append(Issue("stray", path, "not in a song folder"))
+        elif not name.lower().endswith(core.AUDIO_EXTENSIONS):
+            issues.append(Issue("unknown", path, "not an audio file"))
+    return issues
+
+
+def adopt_ops(issues):
+    """Catalog ops that add every orphan folder (and what's under it)."""
+    ops = []
+    for issue in issues:
+        if issue.kind != "orphan" or issue.detail == "subfolder":
+            continue
+        parts = issue.path.split("/")
+        if issue.detail == "type":
+            ops.append({"op": "add_type", "name": parts[0]})
+        elif issue.detail == "subtype":
+            ops.append({"op": "add_subtype", "type_name": parts[0], "name": parts[1]})
+        elif issue.detail == "artist":
+            ops.append({"op": "add_artist", "name": parts[2]})
+        else:
+            ops.append(
+                {
+                    "op": "add_song",
+                    "artist": parts[2],
+                    "song": {"name": parts[3], "bpm": None, "key": ""},
+                }
+            )
+    return ops
+
+
+def _orphan_subtree(scan, issues):
+    """Adopting a folder adopts everything under it: its descendants as orphans."""
+    tops = [i.path for i in issues if i.kind == "orphan" and i.detail != "subfolder"]
+    out = []
+    for rel in sorted(scan.folders(), key=lambda r: (r.count("/"), r)):
+        depth = rel.count("/") + 1 if rel else 0
+        if not 1 <= depth <= 4:
+            continue
+        if any(rel.startswith(top + "/") for top in tops):
+            out.append(Issue("orphan", rel, LEVELS[depth - 1]))
+    return out
+
+
+def prune_ops(catalog, issues):
+    """Delete ops for artists and songs that have no folder anywhere."""
+    ops = []
+    for issue in issues:
+        if issue.kind != "missing":
+            continue
+        if issue.detail == "artist":
+            ops.append({"op": "delete_artist", "name": issue.path})
+        elif issue.detail == "song":
+            artist, name = issue.path.split("/", 1)
+            ops.append({"op": "delete_song", "artist": artist, "name": name})
+    return ops
+
+
+def clean_temp(issues):
+    """Remove stale temp files; a half-renamed sample gets its name back.
+
+    Returns the number of files handled.
+    """
+    done = 0
+    for issue in issues:
+        if issue.kind != "temp":
+            continue
+        path = core.ROOT_DIR / issue.path
+        name = path.name
+        try:
+            if ".renaming-" in name:
+                original = path.with_name(name[1:].rsplit(".renaming-", 1)[0])
+                if os.path.lexists(original):
+                    continue
+                os.rename(path, original)
+            else:
+                os.unlink(path)
+        except OSError:
+            continue
+        done += 1
+    return done
+
+
+def repair(
+    catalog,
+    scan,
+    issues,
+    adopt=False,
+    create=False,
+    clean=False,
+    discard=False,
+    prune=False,
+    trash=None,
+):
+    """Fix issues in bulk. Returns {action: count}.
+
+    adopt adds orphan folders to the catalog in one journal write; create
+    makes missing type/subtype folders; clean handles stale temp files.
+    discard moves orphans that weren't adopted, stray and unknown files
+    to the trash, and prune deletes catalog entries without folders; the
+    two together are one undoable delete.
+    """
+    done = {}
+    if adopt:
+        ops = adopt_ops(issues + _orphan_subtree(scan, issues))
+        catalog.update_many(ops)
+        done["adopted"] = len(ops)
+    if create:
+        n = 0
+        for issue in issues:
+            if issue.kind == "missing" and issue.detail in ("type", "subtype"):
+                paths = [core.ROOT_DIR / issue.path]
+                if issue.detail == "type":
+                    paths += [
+                        core.ROOT_DIR / issue.path / sub
+                        for sub in catalog.types[issue.path].subtypes
+                    ]
+                for p in paths:
+                    p.mkdir(parents=True, exist_ok=True)
+                n += 1
+        done["created"] = n
+    if clean:
+        done["cleaned"] = clean_temp(issues)
+    if discard or prune:
+        paths = []
+        if discard:
+            paths = [
+                core.ROOT_DIR / i.path
+                for i in issues
+                if i.kind in ("stray", "unknown")
+                or (i.kind == "orphan" and not (adopt and i.detail != "subfolder"))
+            ]
+        ops = prune_ops(catalog, issues) if prune else []
+        if paths or ops:
+            (trash or Trash()).delete(catalog, ops, paths)
+        done["trashed"] = len(paths)
+        done["pruned"] = len(ops)
+    return done
@@ -0,0 +1,2522 @@
+import tkinter as tk
+from tkinter import filedialog, font as tkfont
+from tkinter import ttk
+from tkmacosx import Button
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import core
+import ingest
+import instrument
+import renamer
+from catalog import Catalog
+from copyengine import DEFAULT_WORKERS, STORAGE_MODES
+from hashindex import HashIndex
+from metadata import MetadataStore
+from sampleindex import MAX_RESULTS, SampleIndex
+from scanner import LibraryScan
+from search import SearchIndex
+from trash import Trash
+from watcher import DirCache
+
+COPY_WORKERS = DEFAULT_WORKERS
+UNDO_HINT = "⌘Z" if sys.platform == "darwin" else "Ctrl+Z"
+# ms between event loop latency probes, and between overlay refreshes
+LAG_INTERVAL = 50
+PERF_REFRESH = 500
+# spans shown in the F12 overlay, see instrument.py
+PERF_OVERLAY = (
+    ("tk.lag", "loop lag"),
+    ("config.load", "config load"),
+    ("config.save", "config save"),
+    ("config.journal", "journal"),
+    ("dir.list", "listing"),
+    ("dir.scan", "scan"),
+    ("dropdown.filter", "filter"),
+    ("list.draw", "list draw"),
+    ("naming.build", "naming"),
+    ("copy.file", "copy"),
+)
+
+
+def _signed(b):
+    return b - 256 if b > 127 else b
+
+
+class VirtualList(tk.Frame):
+    """Listbox look-alike that only draws the rows currently in view.
+
+    ``source`` can be anything with len() and indexing, so handing it a
+    20k-item list (or a lazy view over one) costs the same as a 10-item one:
+    only the visible rows are ever turned into canvas items.
+    """
+
+    def __init__(
+        self,
+        parent,
+        height=10,
+        font=("Monaco", 13),
+        bg="#161b22",
+        fg="#f0f6fc",
+        selectbackground="#238636",
+        on_select=None,
+        scrollbar=True,
+        thumbnail=None,
+        thumb_width=120,
+    ):
+        super().__init__(parent, bg=bg)
+        self.source = []
+        self.rows = height
+        self.top = 0
+        self.selected = None
+        self.on_select = on_select
+        # thumbnail(value) -> min/max byte pairs (see thumbnails.py) or None
+        self.thumbnail = thumbnail
+        self.thumb_width = thumb_width
+        self.fg = fg
+        self.selectbackground = selectbackground
+        self.row_h = tkfont.Font(font=font).metrics("linespace") + 2
+
+        self.canvas = tk.Canvas(
+            self,
+            height=self.rows * self.row_h,
+            bg=bg,
+            highlightthickness=0,
+            bd=0,
+            takefocus=1,
+        )
+        self.canvas.pack(side=tk.LEFT, fill="x", expand=True)
+        self.vscroll = None
+        if scrollbar:
+            self.vscroll = ttk.Scrollbar(
+                self,
+                orient="vertical",
+                command=self.yview,
+                style="Stash.Vertical.TScrollbar",
+            )
+            self.vscroll.pack(side=tk.RIGHT, fill="y")
+
+        # fixed pool of row items, reused as the view scrolls
+        self.highlight = self.canvas.create_rectangle(
+            0, 0, 0, 0, fill=selectbackground, width=0, state="hidden"
+        )
+        self.items = [
+            self.canvas.create_text(
+                8, i * self.row_h + self.row_h // 2, anchor="w", font=font, fill=fg
+            )
+            for i in range(self.rows + 1)
+        ]
+        self.waves = []
+        if thumbnail is not None:
+            self.waves = [
+                self.canvas.create_polygon(
+                    0, 0, 0, 0, 0, 0, fill="#58a6ff", outline="", state="hidden"
+                )
+                for _ in self.items
+            ]
+
+        self.canvas.bind("<Button-1>", self._on_click)
+        self.canvas.bind("<MouseWheel>", self._on_wheel)
+        self.canvas.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll(3))
+        self.canvas.bind("<Up>", lambda e: self._move(-1))
+        self.canvas.bind("<Down>", lambda e: self._move(1))
+        self.canvas.bind("<Return>", lambda e: self._emit())
+        self.canvas.bind("<Configure>", lambda e: self.redraw())
+
+    def set_source(self, source, keep_view=False):
+        self.source = source
+        if not keep_view:
+            self.top = 0
+        self.selected = None
+        self.redraw()
+
+    def size(self):
+        return len(self.source)
+
+    def get(self, index):
+        return self.source[index]
+
+    def curselection(self):
+        return () if self.selected is None else (self.selected,)
+
+    def selection_set(self, index):
+        if 0 <= index < len(self.source):
+            self.selected = index
+            self.redraw()
+
+    def selection_clear(self):
+        self.selected = None
+        self.redraw()
+
+    def see(self, index):
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.rows:
+            self.top = index - self.rows + 1
+        self.redraw()
+
+    def scroll(self, rows):
+        self.top += rows
+        self.redraw()
+        return "break"
+
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.top = int(float(args[1]) * len(self.source))
+        elif args[0] == "scroll":
+            step = self.rows if args[2] == "pages" else 1
+            self.top += int(args[1]) * step
+        self.redraw()
+
+    @instrument.timed("list.draw")
+    def redraw(self):
+        n = len(self.source)
+        self.top = max(0, min(self.top, n - self.rows))
+        width = self.canvas.winfo_width()
+        for slot, item in enumerate(self.items):
+            i = self.top + slot
+            self.canvas.itemconfigure(
+                item, text=str(self.source[i]) if i < n else "", fill=self.fg
+            )
+        for slot, wave in enumerate(self.waves):
+            i = self.top + slot
+            data = self.thumbnail(self.source[i]) if i < n else None
+            if data:
+                self._draw_wave(wave, slot, data, width)
+            else:
+                self.canvas.itemconfigure(wave, state="hidden")
+        sel = self.selected
+        if sel is not None and self.top <= sel <= self.top + self.rows:
+            y = (sel - self.top) * self.row_h
+            self.canvas.coords(self.highlight, 0, y, width, y + self.row_h)
+            self.canvas.itemconfigure(self.highlight, state="normal")
+        else:
+            self.canvas.itemconfigure(self.highlight, state="hidden")
+        if self.vscroll is not None:
+            if n > self.rows:
+                self.vscroll.set(self.top / n, (self.top + self.rows) / n)
+            else:
+                self.vscroll.set(0, 1)
+
+    def _draw_wave(self, wave, slot, data, width):
+        """Outline of (min, max) pairs: maxima left to right, minima back."""
+        cols = len(data) // 2
+        x0 = width - self.thumb_width - 8
+        step = self.thumb_width / max(1, cols - 1)
+        mid = slot * self.row_h + self.row_h / 2
+        scale = (self.row_h / 2 - 2) / 127
+        lows, highs = data[0::2], data[1::2]
+        top = []
+        bottom = []
+        for c in range(cols):
+            x = x0 + c * step
+            top += (x, mid - _signed(highs[c]) * scale)
+            bottom += (x, mid - _signed(lows[c]) * scale)
+        for c in range(cols - 1, -1, -1):
+            top += bottom[2 * c : 2 * c + 2]
+        self.canvas.coords(wave, *top)
+        self.canvas.itemconfigure(wave, state="normal")
+
+    def _on_click(self, event):
+        self.canvas.focus_set()
+        index = self.top + event.y // self.row_h
+        if index < len(self.source):
+            self.selection_set(index)
+            self._emit()
+
+    def _on_wheel(self, event):
+        if not event.delta:
+            return "break"
+        steps = -event.delta // 120 or (-1 if event.delta > 0 else 1)
+        return self.scroll(steps)
+
+    def _move(self, step):
+        if not self.source:
+            return "break"
+        index = 0 if self.selected is None else self.selected + step
+        index = max(0, min(index, len(self.source) - 1))
+        self.selection_set(index)
+        self.see(index)
+        return "break"
+
+    def _emit(self):
+        if self.on_select and self.selected is not None:
+            self.on_select(self.selected, self.source[self.selected])
+
+
+class SearchableDropdown:
+    def __init__(self, parent, label_text, values, on_select, key=None):
+        self.var = tk.StringVar()
+        self.on_select = on_select
+        self.index = SearchIndex(values)
+        self.all_values = self.index.values
+        self.values_key = key
+
+        frame = tk.Frame(parent, bg="#0d1117")
+        frame.pack(fill="x", pady=10, padx=20)
+
+        tk.Label(
+            frame,
+            text=label_text,
+            font=("Monaco", 14, "bold"),
+            fg="#58a6ff",
+            bg="#0d1117",
+        ).pack(anchor="w", pady=(0, 6))
+
+        input_row = tk.Frame(frame, bg="#0d1117")
+        input_row.pack(fill="x")
+
+        self.entry = tk.Entry(
+            input_row,
+            textvariable=self.var,
+            font=("Monaco", 15),
+            bg="#21262d",
+            fg="#f0f6fc",
+            insertbackground="#58a6ff",
+            relief="flat",
+            bd=8,
+            highlightthickness=2,
+            highlightcolor="#30363d",
+        )
+        self.entry.pack(side=tk.LEFT, fill="x", expand=True)
+        self.entry.bind("<KeyRelease>", self.on_keyrelease)
+        self.entry.bind("<FocusIn>", lambda e: self.show_listbox())
+
+        btn_frame = tk.Frame(input_row, bg="#0d1117")
+        btn_frame.pack(side=tk.RIGHT, padx=(10, 0))
+
+        self.add_btn = Button(
+            btn_frame,
+            text="+",
+            font=("Monaco", 14, "bold"),
+            width=30,
+            height=30,
+            bg="#238636",
+            fg="#ffffff",
+            relief="flat",
+            bd=0,
+            activebackground="#2ea043",
+            activeforeground="#ffffff",
+        )
+        self.add_btn.pack(side=tk.LEFT, padx=3)
+        self.add_btn.bind("<Enter>", lambda e: self.add_btn.config(bg="#2ea043"))
+        self.add_btn.bind("<Leave>", lambda e: self.add_btn.config(bg="#238636"))
+
+        self.del_btn = Button(
+            btn_frame,
+            text="−",
+            font=("Monaco", 14, "bold"),
+            width=30,
+            height=30,
+            bg="#da3633",
+            fg="#ffffff",
+            relief="flat",
+            bd=0,
+            activebackground="#f85149",
+            activeforeground="#ffffff",
+        )
+        self.del_btn.pack(side=tk.LEFT)
+        self.del_btn.bind("<Enter>", lambda e: self.del_btn.config(bg="#f85149"))
+        self.del_btn.bind("<Leave>", lambda e: self.del_btn.config(bg="#da3633"))
+
+        self.rename_btn = Button(
+            btn_frame,
+            text="✎",
+            font=("Monaco", 14, "bold"),
+            width=30,
+            height=30,
+            bg="#21262d",
+            fg="#f0f6fc",
+            relief="flat",
+            bd=0,
+            activebackground="#30363d",
+            activeforeground="#ffffff",
+        )
+        self.rename_btn.pack(side=tk.LEFT, padx=(3, 0))
+
+        self.listbox = VirtualList(
+            frame,
+            font=("Monaco", 13),
+            bg="#161b22",
+            fg="#f0f6fc",
+            selectbackground="#238636",
+            height=10,
+            on_select=self.on_listbox_select,
+        )
+        self.listbox.pack(fill="x", pady=(6, 0))
+        self.listbox.canvas.bind("<FocusOut>", lambda e: self.hide_listbox())
+        self.listbox.pack_forget()
+
+        self.update_list(self.all_values)
+
+        self.add_cmd = lambda: None
+        self.delete_cmd = lambda: None
+        self.rename_cmd = lambda: None
+        self.add_btn.config(command=self.add_cmd)
+        self.del_btn.config(command=self.delete_cmd)
+        self.rename_btn.config(command=self.rename_cmd)
+
+    def update_list(self, values):
+        self.listbox.set_source(values)
+
+    def show_listbox(self):
+        if not self.listbox.winfo_ismapped():
+            self.listbox.pack(fill="x", pady=(6, 0))
+
+    def hide_listbox(self):
+        self.listbox.pack_forget()
+
+    def on_keyrelease(self, event):
+        if event.keysym in ("Up", "Down", "Return", "Tab"):
+            return
+        typed = self.var.get()
+        filtered = self.index.query(typed) if typed else self.all_values
+        self.update_list(filtered)
+        if filtered:
+            self.show_listbox()
+            self.listbox.selection_set(0)
+            self.listbox.see(0)
+
+    def on_listbox_select(self, index, value):
+        self.var.set(value)
+        self.update_list(self.all_values)
+        self.hide_listbox()
+        if self.on_select:
+            self.on_select()
+
+    def get(self):
+        return self.var.get()
+
+    def set(self, value):
+        self.var.set(value)
+        self.update_list(self.all_values)
+
+    def set_values(self, values, key=None):
+        """Replace the choices. Passing the same non-None key as last time
+        means the inputs haven't changed, so the index isn't rebuilt."""
+        if key is not None and key == self.values_key:
+            return
+        self.values_key = key
+        self.index = SearchIndex(values)
+        self.all_values = self.index.values
+        self.update_list(self.all_values)
+
+
+class UiQueue:
+    """Runs callbacks posted from worker threads on the Tk thread via after()."""
+
+    def __init__(self, widget, interval=30):
+        self.widget = widget
+        self.interval = interval
+        self.queue = queue.Queue()
+        self.widget.after(self.interval, self.drain)
+
+    def post(self, fn, *args):
+        self.queue.put((fn, args))
+
+    def drain(self):
+        try:
+            while True:
+                try:
+                    fn, args = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    fn(*args)
+                except Exception:
+                    # reported like any Tk callback error; the rest still run
+                    self.widget.report_callback_exception(*sys.exc_info())
+        finally:
+            self.widget.after(self.interval, self.drain)
+
+
+class App(tk.Tk):
+    def __init__(self, sources=()):
+        super().__init__()
+        self.title("sample fsys")
+        self.geometry("1100x1010")
+        self.configure(bg="#0d1117")
+
+        # ttk style (for scrollbar)
+        self.style = ttk.Style(self)
+        try:
+            self.style.theme_use("clam")
+        except tk.TclError:
+            pass
+        self.style.configure(
+            "Stash.Vertical.TScrollbar",
+            background="#21262d",
+            troughcolor="#0d1117",
+            bordercolor="#0d1117",
+            arrowcolor="#8b949e",
+        )
+
+        self.style.map(
+            "Stash.Vertical.TScrollbar",
+            background=[
+                ("disabled", "#21262d"),
+                ("pressed", "#21262d"),
+                ("active", "#21262d"),
+                ("!disabled", "#21262d"),
+            ],
+            arrowcolor=[
+                ("disabled", "#8b949e"),
+                ("pressed", "#8b949e"),
+                ("active", "#8b949e"),
+                ("!disabled", "#8b949e"),
+            ],
+            bordercolor=[
+                ("disabled", "#0d1117"),
+                ("pressed", "#0d1117"),
+                ("active", "#0d1117"),
+                ("!disabled", "#0d1117"),
+            ],
+        )
+
+        self.catalog = Catalog.load()
+        # staging queue: files waiting to be saved, each with the sample
+        # name it'll get (derived from the source file, editable)
+        self.files = []
+        self.file_names = {}
+        self.queue_sel = None
+        self.trash = Trash()
+        # a delete interrupted by a crash is finished, not left half-done
+        self.trash.recover(self.catalog)
+        mod = "Command" if sys.platform == "darwin" else "Control"
+        self.bind(f"<{mod}-z>", self.undo_delete)
+
+        self._dirty = set()
+        self._refresh_job = None
+        self._ready = None
+
+        self.hash_index = HashIndex()
+        self.metadata = MetadataStore()
+        self.ui_queue = UiQueue(self)
+        self.dir_cache = DirCache(
+            on_change=self.on_folder_changed, dispatch=self.ui_queue.post
+        )
+        self.search_index = SampleIndex(self.catalog)
+        self._search_job = None
+        renamer.recover_renames(self.on_sample_renamed)
+        # a crash mid-move is finished before the catalog is shown
+        renamer.recover_moves(self.catalog, self.on_node_moved, self.on_sample_renamed)
+        # watching, reclaiming and the search catch-up wait for the window
+        self.after_idle(self.start_background)
+        # waveforms for the existing-files list, loaded with the first one
+        # shown; one worker so the visible folder's files are done in order
+        self._thumbs = None
+        self.thumb_worker = ThreadPoolExecutor(max_workers=1)
+        self.thumb_folder = None
+        self.thumb_gen = 0
+        # plans and duplicate checks for saves, one queue at a time
+        self.ingest_worker = ThreadPoolExecutor(max_workers=1)
+
+        # sample name var created early so we can always read it
+        self.name_var = tk.StringVar()
+        # copy / hardlink / reflink / move, see copyengine.store_file
+        self.storage_mode = tk.StringVar(value="copy")
+        # levels / silence / tempo on save, see analysis.py (needs numpy)
+        self.analyze_on_save = tk.BooleanVar(value=False)
+        # WAV/AIFF conversion on save, see convert.py (needs numpy)
+        self.convert_rate = tk.StringVar(value="keep")
+        self.convert_bits = tk.StringVar(value="keep")
+        self.convert_normalize = tk.StringVar(value="off")
+        self.convert_trim = tk.BooleanVar(value=False)
+
+        # everything passed on the command line is staged: files, folders,
+        # globs and manifests, as for the import command
+        if sources:
+            sources = list(ingest.expand_sources(sources))
+            self.after(200, lambda: self.stage(sources))
+
+        header = tk.Frame(self, bg="#0d1117")
+        header.pack(pady=40)
+        tk.Label(
+            header,
+            text="sample fsys",
+            font=("Menlo", 48, "bold"),
+            fg="#58a6ff",
+            bg="#0d1117",
+        ).pack()
+        self.status = tk.Label(
+            header,
+            text="Ready",
+            font=("Monaco", 14),
+            fg="#8b949e",
+            bg="#0d1117",
+        )
+        self.status.pack(pady=8)
+        # F12: timings overlay; Shift+F12: record a trace to .fsys/traces
+        self.perf_label = tk.Label(
+            header,
+            text="",
+            font=("Monaco", 11),
+            fg="#8b949e",
+            bg="#0d1117",
+            justify="left",
+        )
+        self.perf_job = None
+        self.lag_job = None
+        self.bind("<F12>", self.toggle_perf_overlay)
+        self.bind("<Shift-F12>", self.toggle_trace)
+
+        controls = tk.Frame(self, bg="#0d1117")
+        controls.pack(pady=10)
+        Button(
+            controls,
+            text="Browse Files",
+            command=self.browse,
+            font=("Monaco", 13, "bold"),
+            bg="#238636",
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=12,
+            activebackground="#2ea043",
+        ).pack(side=tk.LEFT, padx=15)
+        Button(
+            controls,
+            text="Clear Files",
+            command=self.clear_files_only,
+            font=("Monaco", 13, "bold"),
+            bg="#6e7681",
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=12,
+        ).pack(side=tk.LEFT, padx=15)
+        Button(
+            controls,
+            text="Clear All",
+            command=self.clear_all_fields,
+            font=("Monaco", 13, "bold"),
+            bg="#da3633",
+            fg="white",
+            relief="flat",
+            padx=20,
+            pady=12,
+            activebackground="#f85149",
+        ).pack(side=tk.LEFT, padx=15)
+
+        self.file_label = tk.Label(
+            self,
+            text="No file selected",
+            font=("Monaco", 16),
+            fg="#8b949e",
+            bg="#0d1117",
+        )
+        self.file_label.pack(pady=20)
+
+        # ─────────────────────────────────────────
+        # Scrollable middle form WITH BORDER
+        # ─────────────────────────────────────────
+        self.scroll_outer = tk.Frame(self, bg="#30363d")
+        self.scroll_outer.pack(fill="both", expand=True, padx=100)
+
+        self.scroll_container = tk.Frame(self.scroll_outer, bg="#0d1117")
+        self.scroll_container.pack(fill="both", expand=True, padx=2, pady=2)
+
+        self.canvas = tk.Canvas(
+            self.scroll_container,
+            bg="#0d1117",
+            highlightthickness=0,
+            bd=0,
+        )
+        self.canvas.pack(side="left", fill="both", expand=True)
+
+        self.vscroll = ttk.Scrollbar(
+            self.scroll_container,
+            orient="vertical",
+            command=self.canvas.yview,
+            style="Stash.Vertical.TScrollbar",
+        )
+        self.vscroll.pack(side="right", fill="y")
+
+        self.canvas.configure(yscrollcommand=self.vscroll.set)
+
+        self.form = tk.Frame(self.canvas, bg="#0d1117")
+        self.form_window = self.canvas.create_window(
+            (0, 0), window=self.form, anchor="nw"
+        )
+
+        self.form.bind(
+            "<Configure>",
+            lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")),
+        )
+        self.canvas.bind(
+            "<Configure>",
+            lambda e: self.canvas.itemconfig(self.form_window, width=e.width),
+        )
+
+        self.canvas.bind_all("<MouseWheel>", self._on_mousewheel)
+
+        # global search over every sample, above the drill-down
+        search_frame = tk.Frame(self.form, bg="#0d1117")
+        search_frame.pack(fill="x", pady=10, padx=20)
+        tk.Label(
+            search_frame,
+            text="Search library:",
+            font=("Monaco", 14, "bold"),
+            fg="#58a6ff",
+            bg="#0d1117",
+        ).pack(anchor="w", pady=(0, 6))
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(
+            search_frame,
+            textvariable=self.search_var,
+            font=("Monaco", 15),
+            bg="#21262d",
+            fg="#f0f6fc",
+            insertbackground="#58a6ff",
+            relief="flat",
+            bd=8,
+            highlightthickness=2,
+            highlightcolor="#30363d",
+        )
+        search_entry.pack(fill="x")
+        search_entry.bind("<KeyRelease>", lambda e: self.schedule_search())
+        self.search_count = tk.Label(
+            search_frame, font=("Monaco", 12), fg="#8b949e", bg="#0d1117"
+        )
+        self.search_results = VirtualList(
+            search_frame,
+            font=("Monaco", 12),
+            height=8,
+            on_select=self.on_search_select,
+        )
+        self.search_hits = []
+
+        # 1. Type
+        self.type_dd = SearchableDropdown(
+            self.form,
+            "1. Type:",
+            self.catalog.type_names(),
+            self.on_type_selected,
+        )
+        self.type_dd.add_cmd = lambda: self.add_item("type")
+        self.type_dd.delete_cmd = lambda: self.delete_item("type")
+        self.type_dd.add_btn.config(command=self.type_dd.add_cmd)
+        self.type_dd.del_btn.config(command=self.type_dd.delete_cmd)
+        self.type_dd.rename_cmd = lambda: self.rename_item("type")
+        self.type_dd.rename_btn.config(command=self.type_dd.rename_cmd)
+
+        self.subtype_section = tk.Frame(self.form, bg="#0d1117")
+        self.artist_section = tk.Frame(self.form, bg="#0d1117")
+        self.song_section = tk.Frame(self.form, bg="#0d1117")
+
+        # existing files section
+        self.existing_files_section = tk.Frame(self.form, bg="#0d1117")
+        self.existing_files_listbox = None
+
+        self.sample_name_section = tk.Frame(self.form, bg="#0d1117")
+        self.prefix_section = tk.Frame(self.form, bg="#0d1117")
+
+        # filename preview label (below scroll area, above save button), hidden initially
+        self.filename_preview_label = tk.Label(
+            self,
+            text="Filename preview:",
+            font=("Monaco", 13),
+            fg="#58a6ff",
+            bg="#0d1117",
+        )
+        # not packed yet — only when constraints are met
+
+        # SAVE button starts grey/disabled, turns green when ready
+        self.save_btn = Button(
+            self,
+            text="save to fsys",
+            font=("Menlo", 32, "bold"),
+            bg="#30363d",
+            fg="#8b949e",
+            relief="flat",
+            state="disabled",
+            command=self.save,
+            height=60,
+            width=400,
+            activebackground="#30363d",
+        )
+        self.save_btn.pack(pady=60)
+
+        self.update_status()
+        self.refresh_from_config()
+        self.update_save_state()
+
+    def _on_mousewheel(self, event):
+        # Only scroll if content taller than viewport
+        bbox = self.canvas.bbox("all")
+        if not bbox:
+            return
+        content_h = bbox[3] - bbox[1]
+        view_h = self.canvas.winfo_height()
+        if content_h <= view_h:
+            return
+        if event.delta:
+            self.canvas.yview_scroll(int(-event.delta / 120), "units")
+
+    def log(self, text, color="#58a6ff"):
+        self.status.config(text=text, fg=color)
+        self.update_idletasks()
+
+    def get_current_target_dir(self):
+        """Return the folder for the current type/subtype/artist/song selection."""
+        tname = self.type_dd.get()
+        subtype = (
+            getattr(self, "subtype_dd", None).get()
+            if hasattr(self, "subtype_dd")
+            else ""
+        )
+        artist = (
+            getattr(self, "artist_dd", None).get() if hasattr(self, "artist_dd") else ""
+        )
+        song = getattr(self, "song_dd", None).get() if hasattr(self, "song_dd") else ""
+        parts = [p for p in [tname, subtype, artist, song] if p]
+        if not parts:
+            return None
+        return core.ROOT_DIR.joinpath(*parts)
+
+    def show_existing_files(self):
+        """Ensure the 'existing files' section is visible and populated."""
+        if self.existing_files_listbox is None:
+            tk.Label(
+                self.existing_files_section,
+                text="Existing samples in this folder:",
+                font=("Monaco", 13, "bold"),
+                fg="#8b949e",
+                bg="#0d1117",
+            ).pack(anchor="w", padx=20, pady=(10, 6))
+
+            self.existing_files_listbox = VirtualList(
+                self.existing_files_section,
+                font=("Monaco", 12),
+                bg="#161b22",
+                fg="#f0f6fc",
+                selectbackground="#238636",
+                height=6,
+                thumbnail=self.file_thumbnail,
+            )
+            self.existing_files_listbox.pack(fill="x", padx=20, pady=(0, 6))
+            Button(
+                self.existing_files_section,
+                text="rename to match",
+                font=("Monaco", 12),
+                bg="#21262d",
+                fg="#f0f6fc",
+                relief="flat",
+                command=self.rename_existing,
+                height=28,
+                width=160,
+            ).pack(anchor="e", padx=20, pady=(0, 10))
+
+        self.schedule_refresh("files")
+        self.existing_files_section.pack(fill="x")
+
+    def update_existing_files(self):
+        """Refresh the contents of the existing files listbox."""
+        if not self.existing_files_listbox:
+            return
+        folder = self.get_current_target_dir()
+        files = self.dir_cache.listing(folder) if folder else None
+        self.fill_existing_files(folder, files)
+
+    def fill_existing_files(self, folder, files, keep_view=False):
+        self.thumb_folder = folder
+        self.thumb_gen += 1
+        if files:
+            gen = self.thumb_gen
+            # cache lookups stat every file, so they stay off the Tk thread
+            self.thumb_worker.submit(
+                self.load_thumbnails,
+                [folder / name for name in files],
+                lambda: gen != self.thumb_gen,
+            )
+        if files is None:
+            files = ["(folder does not exist yet)"]
+        elif not files:
+            files = ["(no files yet)"]
+        self.existing_files_listbox.set_source(files, keep_view=keep_view)
+
+    def load_thumbnails(self, paths, cancelled):
+        """Worker thread: show the cached thumbnails, then compute the rest."""
+        if cancelled():
+            return
+        missing = self.thumbs.load(paths)
+        if len(missing) < len(paths):
+            self.ui_queue.post(self.on_thumbnail, paths[0])
+        self.thumbs.compute(
+            missing, lambda p: self.ui_queue.post(self.on_thumbnail, p), cancelled
+        )
+
+    def file_thumbnail(self, name):
+        # the cache is opened by the thumbnail worker, never on the Tk thread
+        if self.thumb_folder is None or self._thumbs is None:
+            return None
+        return self._thumbs.get(self.thumb_folder / name)
+
+    def on_thumbnail(self, path):
+        if self.existing_files_listbox and path.parent == self.thumb_folder:
+            self.existing_files_listbox.redraw()
+
+    def on_folder_changed(self, folder, files):
+        """A watched folder changed on disk (from us or anything else)."""
+        if not self.existing_files_listbox:
+            return
+        if not self.existing_files_section.winfo_ismapped():
+            return
+        if folder == self.get_current_target_dir():
+            self.fill_existing_files(folder, files, keep_view=True)
+
+    def rename_existing(self):
+        """Rename this folder's samples to the current naming options."""
+        tname = self.type_dd.get()
+        subtype = self.subtype_dd.get() if hasattr(self, "subtype_dd") else ""
+        artist = self.artist_dd.get() if hasattr(self, "artist_dd") else ""
+        song = self.song_dd.get() if hasattr(self, "song_dd") else ""
+        if not (tname and subtype and artist and song):
+            return
+        # before the prefix checkboxes exist, keep each file's own options
+        naming = self.naming_options() if hasattr(self, "prefix_artist") else None
+        plan = renamer.plan_renames(
+            self.catalog, [(tname, subtype, artist, song)], naming
+        )
+        renames = [(src, dest) for status, src, dest, _ in plan if status == "rename"]
+        collisions = len(plan) - len(renames)
+        if not plan:
+            self.log("All samples already match the naming options", "#8b949e")
+            return
+
+        win = tk.Toplevel(self)
+        win.title("Rename Samples")
+        win.geometry("560x240")
+        win.configure(bg="#161b22")
+        win.transient(self)
+        win.grab_set()
+        text = f"Rename {len(renames)} sample(s) to match?"
+        if collisions:
+            text += f"\n{collisions} would collide and will be skipped."
+        tk.Label(
+            win,
+            text=text,
+            font=("Monaco", 14),
+            fg="#f0f6fc",
+            bg="#161b22",
+        ).pack(pady=40)
+
+        def yes():
+            win.destroy()
+            failed = renamer.apply_renames(renames, self.on_sample_renamed)
+            done = len(renames) - len(failed)
+            if failed or collisions:
+                self.log(
+                    f"Renamed {done}, skipped {collisions + len(failed)}", "#ffa657"
+                )
+            else:
+                self.log(f"Renamed {done} sample(s)", "#58a6ff")
+            self.schedule_refresh("files")
+
+        Button(
+            win,
+            text="Rename",
+            bg="#238636",
+            fg="white",
+            font=("Monaco", 14),
+            command=yes,
+            relief="flat",
+            width=150,
+            height=40,
+            state="normal" if renames else "disabled",
+        ).pack(side=tk.LEFT, padx=(60, 0), pady=20)
+        Button(
+            win,
+            text="Cancel",
+            command=win.destroy,
+            font=("Monaco", 14),
+            width=150,
+            height=40,
+        ).pack(side=tk.RIGHT, padx=(0, 60), pady=20)
+
+    def schedule_search(self):
+        """Search once typing pauses, not on every keystroke."""
+        if self._search_job is not None:
+            self.after_cancel(self._search_job)
+        self._search_job = self.after(150, self.run_search)
+
+    def run_search(self):
+        self._search_job = None
+        text = self.search_var.get().strip()
+        if not text:
+            self.search_hits = []
+            self.search_count.pack_forget()
+            self.search_results.pack_forget()
+            return
+        self.search_hits = self.search_index.search(text)
+        n = len(self.search_hits)
+        if n >= MAX_RESULTS:
+            label = f"first {n} matches — add words to narrow it down"
+        else:
+            label = f"{n} match{'es' if n != 1 else ''}"
+        self.search_count.config(text=label)
+        self.search_count.pack(anchor="w", pady=(6, 0))
+        self.search_results.set_source(
+            [p.relative_to(core.ROOT_DIR).as_posix() for p in self.search_hits]
+        )
+        self.search_results.pack(fill="x", pady=(6, 0))
+
+    def on_search_select(self, index, value):
+        """Open the song folder a search result lives in."""
+        parts = self.search_hits[index].relative_to(core.ROOT_DIR).parts
+        if len(parts) < 5:
+            self.log(f"{value} isn't in a song folder", "#ffa657")
+            return
+        type_name, subtype, artist, song = parts[:4]
+        self.type_dd.set(type_name)
+        self.on_type_selected()
+        self.subtype_dd.set(subtype)
+        self.on_subtype_selected()
+        self.artist_dd.set(artist)
+        self.on_artist_selected()
+        self.song_dd.set(song)
+        self.on_song_selected()
+        self.log(f"{parts[-1]}: {type_name} / {subtype} / {artist} / {song}")
+
+    def hide_existing_files(self):
+        self.existing_files_section.pack_forget()
+        if self.existing_files_listbox:
+            self.existing_files_listbox.set_source([])
+
+    def refresh_from_config(self):
+        """Keep all dropdowns in sync with self.catalog + current selections."""
+        rev = self.catalog.rev
+        # Types
+        self.type_dd.set_values(self.catalog.type_names(), key=rev["types"])
+
+        # Subtypes (depend on selected type)
+        if hasattr(self, "subtype_dd"):
+            tname = self.type_dd.get()
+            self.subtype_dd.set_values(
+                self.catalog.subtype_names(tname), key=(rev["types"], tname)
+            )
+
+        # Artists
+        if hasattr(self, "artist_dd"):
+            self.artist_dd.set_values(self.catalog.artist_names(), key=rev["artists"])
+
+        # Songs (depend on selected artist)
+        if hasattr(self, "song_dd"):
+            aname = self.artist_dd.get() if hasattr(self, "artist_dd") else ""
+            self.song_dd.set_values(
+                self.catalog.song_names(aname), key=(rev["artists"], aname)
+            )
+
+    def change_config(self, op, **fields):
+        """Apply one catalog op, then let the refresh pass pick it up."""
+        self.catalog.update(op, **fields)
+        self.schedule_refresh("dropdowns")
+
+    def delete_nodes(self, ops, paths=()):
+        """Apply delete ops and trash their folders as one undoable step."""
+        tx = self.trash.delete(self.catalog, ops, paths)
+        for item in tx.items:
+            path = core.ROOT_DIR / item["path"]
+            self.hash_index.remove_tree(path)
+            self.search_index.remove_tree(path)
+            self.dir_cache.forget(path)
+        self.trash.start_reclaim()
+        self.schedule_refresh()
+        return tx
+
+    def undo_delete(self, event=None):
+        if isinstance(event, tk.Event) and isinstance(event.widget, tk.Entry):
+            return None  # leave text editing alone
+        tx, restored = self.trash.undo(self.catalog)
+        if tx is None:
+            self.log("Nothing to undo", "#8b949e")
+            return "break"
+        for path in restored:
+            if path.relative_to(core.ROOT_DIR).as_posix() not in {
+                item["path"] for item in tx.items
+            }:
+                self.log(f"Restored next to a newer folder: {path.name}", "#ffa657")
+        threading.Thread(target=self.reindex, args=(restored,), daemon=True).start()
+        self.log(f"Undid delete of {len(tx.ops)} item(s)", "#58a6ff")
+        self.schedule_refresh()
+        return "break"
+
+    def reindex(self, folders):
+        """Worker thread: put samples under folders back in the indexes."""
+        for folder in folders:
+            for path in core.iter_samples(folder):
+                try:
+                    self.hash_index.add(path)
+                except OSError:
+                    pass
+            self.search_index.reindex_tree(folder)
+
+    def reindex_search(self, folders):
+        """Worker thread: re-read folders into the search index."""
+        for folder in folders:
+            self.search_index.reindex_tree(folder)
+
+    def start_background(self):
+        """Housekeeping that can wait until the window is up."""
+        self.trash.start_reclaim()
+        self.dir_cache.start()
+        # catch the search index up with changes made outside the app
+        threading.Thread(target=self.sync_search, daemon=True).start()
+        # FSYS_TRACE may have started a trace before the window existed
+        self.update_lag_probe()
+
+    # -- instrumentation --
+
+    def toggle_perf_overlay(self, event=None):
+        if self.perf_job is None:
+            instrument.enable()
+            self.perf_label.pack(after=self.status)
+            self.update_perf_overlay()
+        else:
+            self.after_cancel(self.perf_job)
+            self.perf_job = None
+            self.perf_label.pack_forget()
+            instrument.disable()
+        self.update_lag_probe()
+
+    def update_perf_overlay(self):
+        """Last and recent peak time (ms) and call count per span."""
+        stats = instrument.stats()
+        cells = []
+        for name, label in PERF_OVERLAY:
+            if name in stats:
+                count, last, peak, _ = stats[name]
+                cells.append(f"{label} {last * 1000:.1f}/{peak * 1000:.1f} ×{count}")
+        trace = instrument.tracing()
+        if trace:
+            cells.append(f"● {Path(trace).name}")
+        rows = ["   ".join(cells[i : i + 4]) for i in range(0, len(cells), 4)]
+        self.perf_label.config(text="\n".join(rows) or "no timings yet")
+        self.perf_job = self.after(PERF_REFRESH, self.update_perf_overlay)
+
+    def toggle_trace(self, event=None):
+        path = instrument.stop_trace()
+        if path:
+            self.log(f"Trace saved: {path}")
+        else:
+            path = core.STATE_DIR / "traces" / time.strftime("%Y%m%d-%H%M%S.jsonl")
+            instrument.start_trace(str(path))
+            self.log(f"Recording a trace to {path.name} (Shift+F12 stops)")
+        self.update_lag_probe()
+
+    def update_lag_probe(self):
+        """Keep the event loop latency probe running while anything collects."""
+        if instrument.enabled and self.lag_job is None:
+            due = time.perf_counter_ns() + LAG_INTERVAL * 1_000_000
+            self.lag_job = self.after(LAG_INTERVAL, self.probe_lag, due)
+        elif not instrument.enabled and self.lag_job is not None:
+            self.after_cancel(self.lag_job)
+            self.lag_job = None
+
+    def probe_lag(self, due):
+        """A timer fires late by however long the loop was kept busy; the
+        lateness is recorded as a "tk.lag" span starting when it was due."""
+        now = time.perf_counter_ns()
+        instrument.record("tk.lag", due, max(due, now))
+        due = now + LAG_INTERVAL * 1_000_000
+        self.lag_job = self.after(LAG_INTERVAL, self.probe_lag, due)
+
+    @property
+    def thumbs(self):
+        if self._thumbs is None:
+            # numpy comes in with it; not needed until a song is open
+            from thumbnails import ThumbnailCache
+
+            self._thumbs = ThumbnailCache()
+        return self._thumbs
+
+    def sync_search(self):
+        """Worker thread: bring the search index in line with disk."""
+        scan = LibraryScan()
+        scan.rescan()
+        self.search_index.sync(scan)
+        scan.close()
+
+    def schedule_refresh(self, *parts):
+        """Mark parts of the UI dirty and redraw them in one after_idle pass.
+
+        parts: "dropdowns", "files", "save" (all three if none given).
+        """
+        self._dirty.update(parts or ("dropdowns", "files", "save"))
+        if self._refresh_job is None:
+            self._refresh_job = self.after_idle(self.run_refresh)
+
+    def run_refresh(self):
+        self._refresh_job = None
+        dirty, self._dirty = self._dirty, set()
+        if "dropdowns" in dirty:
+            self.refresh_from_config()
+        # existing files, if we have a song
+        if "files" in dirty and hasattr(self, "song_dd") and self.song_dd.get():
+            self.update_existing_files()
+        if "save" in dirty:
+            self.update_save_state()
+
+    # central logic: decide if SAVE should be enabled + green
+    def update_save_state(self):
+        type_ok = bool(self.type_dd.get())
+        subtype_ok = (
+            bool(getattr(self, "subtype_dd", None).get())
+            if hasattr(self, "subtype_dd")
+            else False
+        )
+        artist_ok = (
+            bool(getattr(self, "artist_dd", None).get())
+            if hasattr(self, "artist_dd")
+            else False
+        )
+        song_ok = (
+            bool(getattr(self, "song_dd", None).get())
+            if hasattr(self, "song_dd")
+            else False
+        )
+        staged = self.staged()
+        files_ok = bool(staged)
+        name_ok = files_ok and all(name for _, name in staged)
+
+        ready = all([type_ok, subtype_ok, artist_ok, song_ok, name_ok, files_ok])
+        # the button is only restyled when readiness flips; the preview
+        # below follows every change
+        if ready != self._ready:
+            self._ready = ready
+            if ready:
+                self.save_btn.config(
+                    state="normal",
+                    bg="#238636",
+                    fg="white",
+                    activebackground="#2ea043",
+                )
+            else:
+                self.save_btn.config(
+                    state="disabled",
+                    bg="#30363d",
+                    fg="#8b949e",
+                    activebackground="#30363d",
+                )
+
+        # handle filename preview visibility + content
+        if ready:
+            if not self.filename_preview_label.winfo_ismapped():
+                # ensure it sits above the save button
+                self.filename_preview_label.pack(pady=(45, 0), before=self.save_btn)
+            self.update_filename_preview()
+        else:
+            if self.filename_preview_label.winfo_ismapped():
+                self.filename_preview_label.pack_forget()
+            self.update_queue_rows()
+
+    def update_status(self):
+        n = len(self.files)
+        if n:
+            text = "1 file ready" if n == 1 else f"{n} files ready"
+            self.file_label.config(text=text, fg="#58a6ff")
+        else:
+            self.file_label.config(text="No file selected", fg="#8b949e")
+        if hasattr(self, "queue_frame"):
+            self.show_name_fields()
+
+    def browse(self):
+        paths = filedialog.askopenfilenames(
+            filetypes=[("Audio", "*.wav *.aiff *.mp3 *.flac *.ogg")]
+        )
+        self.stage((Path(p), Path(p).stem) for p in paths)
+
+    def stage(self, sources):
+        """Add (source, sample name) pairs to the staging queue."""
+        added = ignored = 0
+        for src, name in sources:
+            src = Path(src)
+            if src in self.file_names:
+                continue
+            if not src.is_file() or src.suffix.lower() not in core.AUDIO_EXTENSIONS:
+                ignored += 1
+                continue
+            if len(self.files) == 1:
+                # leaving single-file mode: keep the name typed for it
+                typed = self.name_var.get().strip()
+                if typed:
+                    self.file_names[self.files[0]] = typed
+            self.files.append(src)
+            self.file_names[src] = name
+            added += 1
+        if not added and not ignored:
+            return
+        if len(self.files) == 1 and not self.name_var.get().strip():
+            self.name_var.set(self.file_names[self.files[0]])
+        msg = f"Loaded {added} file{'s' if added != 1 else ''}"
+        if ignored:
+            msg += f" ({ignored} not audio or not found)"
+        self.log(msg, "#58a6ff" if added else "#ffa657")
+        self.update_status()
+        self.schedule_refresh("save")
+
+    def staged(self):
+        """[(source, sample name)] for the queue; one file uses the name field."""
+        if len(self.files) == 1:
+            return [(self.files[0], self.name_var.get().strip())]
+        return [(f, self.file_names[f].strip()) for f in self.files]
+
+    def reset_name(self):
+        """Name field back to the staged file's own name (or empty)."""
+        self.name_var.set(self.file_names[self.files[0]] if self.files else "")
+
+    def clear_files_only(self):
+        self.files = []
+        self.file_names = {}
+        self.queue_sel = None
+        self.update_status()
+        self.log("Files cleared — selections kept", "#8b949e")
+        self.schedule_refresh("save")
+
+    def clear_all_fields(self):
+        self.files = []
+        self.file_names = {}
+        self.queue_sel = None
+        self.type_dd.set("")
+        for sec in [
+            self.subtype_section,
+            self.artist_section,
+            self.song_section,
+            self.existing_files_section,
+            self.sample_name_section,
+            self.prefix_section,
+        ]:
+            sec.pack_forget()
+        if hasattr(self, "subtype_dd"):
+            self.subtype_dd.set("")
+        if hasattr(self, "artist_dd"):
+            self.artist_dd.set("")
+        if hasattr(self, "song_dd"):
+            self.song_dd.set("")
+        self.reset_name()
+        self.hide_existing_files()
+        self.log("All cleared", "#8b949e")
+        self.update_status()
+        self.schedule_refresh("save")
+
+    def on_type_selected(self):
+        # clear downstream UI
+        for sec in [
+            self.subtype_section,
+            self.artist_section,
+            self.song_section,
+            self.existing_files_section,
+            self.sample_name_section,
+            self.prefix_section,
+        ]:
+            sec.pack_forget()
+        self.hide_existing_files()
+        # clear dependent dropdown values
+        if hasattr(self, "subtype_dd"):
+            self.subtype_dd.set("")
+        if hasattr(self, "artist_dd"):
+            self.artist_dd.set("")
+        if hasattr(self, "song_dd"):
+            self.song_dd.set("")
+        self.reset_name()
+        if self.type_dd.get():
+            self.show_subtype()
+        self.schedule_refresh()
+
+    def show_subtype(self):
+        if not self.subtype_section.winfo_children():
+            self.subtype_dd = SearchableDropdown(
+                self.subtype_section, "2. Subtype:", [], self.on_subtype_selected
+            )
+            self.subtype_dd.add_cmd = lambda: self.add_item("subtype")
+            self.subtype_dd.delete_cmd = lambda: self.delete_item("subtype")
+            self.subtype_dd.add_btn.config(command=self.subtype_dd.add_cmd)
+            self.subtype_dd.del_btn.config(command=self.subtype_dd.delete_cmd)
+            self.subtype_dd.rename_cmd = lambda: self.rename_item("subtype")
+            self.subtype_dd.rename_btn.config(command=self.subtype_dd.rename_cmd)
+        t = self.type_dd.get()
+        self.subtype_dd.set_values(
+            self.catalog.subtype_names(t), key=(self.catalog.rev["types"], t)
+        )
+        self.subtype_section.pack(fill="x")
+        self.schedule_refresh("save")
+
+    def on_subtype_selected(self):
+        for sec in [
+            self.artist_section,
+            self.song_section,
+            self.existing_files_section,
+            self.sample_name_section,
+            self.prefix_section,
+        ]:
+            sec.pack_forget()
+        self.hide_existing_files()
+        if hasattr(self, "artist_dd"):
+            self.artist_dd.set("")
+        if hasattr(self, "song_dd"):
+            self.song_dd.set("")
+        self.reset_name()
+        self.show_artist()
+        self.schedule_refresh()
+
+    def show_artist(self):
+        if not self.artist_section.winfo_children():
+            self.artist_dd = SearchableDropdown(
+                self.artist_section,
+                "3. Artist:",
+                self.catalog.artist_names(),
+                self.on_artist_selected,
+                key=self.catalog.rev["artists"],
+            )
+            self.artist_dd.add_cmd = lambda: self.add_item("artist")
+            self.artist_dd.delete_cmd = lambda: self.delete_item("artist")
+            self.artist_dd.add_btn.config(command=self.artist_dd.add_cmd)
+            self.artist_dd.del_btn.config(command=self.artist_dd.delete_cmd)
+            self.artist_dd.rename_cmd = lambda: self.rename_item("artist")
+            self.artist_dd.rename_btn.config(command=self.artist_dd.rename_cmd)
+        self.artist_section.pack(fill="x")
+        self.schedule_refresh("save")
+
+    def on_artist_selected(self):
+        for sec in [
+            self.song_section,
+            self.existing_files_section,
+            self.sample_name_section,
+            self.prefix_section,
+        ]:
+            sec.pack_forget()
+        self.hide_existing_files()
+        # clear song selection when artist changes
+        if hasattr(self, "song_dd"):
+            self.song_dd.set("")
+        self.reset_name()
+        if self.artist_dd.get():
+            self.show_song()
+        self.schedule_refresh()
+
+    def show_song(self):
+        if not self.song_section.winfo_children():
+            self.song_dd = SearchableDropdown(
+                self.song_section, "4. Song:", [], self.on_song_selected
+            )
+            self.song_dd.add_cmd = lambda: self.add_item("song")
+            self.song_dd.delete_cmd = lambda: self.delete_item("song")
+            self.song_dd.add_btn.config(command=self.song_dd.add_cmd)
+            self.song_dd.del_btn.config(command=self.song_dd.delete_cmd)
+            self.song_dd.rename_cmd = lambda: self.rename_item("song")
+            self.song_dd.rename_btn.config(command=self.song_dd.rename_cmd)
+        a = self.artist_dd.get()
+        self.song_dd.set_values(
+            self.catalog.song_names(a), key=(self.catalog.rev["artists"], a)
+        )
+        self.song_section.pack(fill="x")
+        self.schedule_refresh("save")
+
+    def on_song_selected(self):
+        for sec in [
+            self.existing_files_section,
+            self.sample_name_section,
+            self.prefix_section,
+        ]:
+            sec.pack_forget()
+        self.hide_existing_files()
+        if self.song_dd.get():
+            self.show_existing_files()
+            self.show_sample_name()
+        self.schedule_refresh()
+
+    def show_sample_name(self):
+        if not self.sample_name_section.winfo_children():
+            tk.Label(
+                self.sample_name_section,
+                text="Sample Name:",
+                font=("Monaco", 15, "bold"),
+                fg="#58a6ff",
+                bg="#0d1117",
+            ).pack(fill="x", pady=(0, 20))
+
+            self.name_entry = tk.Entry(
+                self.sample_name_section,
+                textvariable=self.name_var,
+                font=("Monaco", 15),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+                relief="flat",
+                bd=8,
+                width=60,
+            )
+
+            self.name_var.trace_add(
+                "write", lambda *args: self.schedule_refresh("save")
+            )
+
+            # several files staged: one name each, picked from a list
+            self.queue_frame = tk.Frame(self.sample_name_section, bg="#0d1117")
+            self.queue_label = tk.Label(
+                self.queue_frame,
+                font=("Monaco", 12),
+                fg="#8b949e",
+                bg="#0d1117",
+            )
+            self.queue_label.pack(anchor="w")
+            self.queue_list = VirtualList(
+                self.queue_frame,
+                font=("Monaco", 12),
+                height=8,
+                on_select=self.on_queue_select,
+            )
+            self.queue_list.pack(fill="x", pady=(6, 10))
+            row = tk.Frame(self.queue_frame, bg="#0d1117")
+            row.pack(fill="x")
+            self.queue_name_var = tk.StringVar()
+            tk.Entry(
+                row,
+                textvariable=self.queue_name_var,
+                font=("Monaco", 15),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+                relief="flat",
+                bd=8,
+                width=45,
+            ).pack(side=tk.LEFT, fill="x", expand=True)
+            Button(
+                row,
+                text="Remove",
+                command=self.unstage_selected,
+                font=("Monaco", 13),
+                bg="#6e7681",
+                fg="white",
+                relief="flat",
+                padx=12,
+                pady=6,
+            ).pack(side=tk.LEFT, padx=(10, 0))
+            self.queue_name_var.trace_add("write", self.on_queue_name)
+
+        self.show_name_fields()
+        self.sample_name_section.pack(fill="x", pady=25)
+
+        if not self.prefix_section.winfo_children():
+            # defaults
+            self.prefix_song = tk.BooleanVar(value=True)
+            self.prefix_bpm = tk.BooleanVar(value=False)
+            self.prefix_artist = tk.BooleanVar(value=True)
+            self.prefix_key = tk.BooleanVar(value=False)
+            self.suffix_og = tk.BooleanVar(value=True)
+
+            # row 1: up to 3 checkboxes
+            row1 = tk.Frame(self.prefix_section, bg="#0d1117")
+            row1.pack(pady=(10, 5))
+            # row 2: remaining
+            row2 = tk.Frame(self.prefix_section, bg="#0d1117")
+            row2.pack(pady=(0, 10))
+
+            tk.Checkbutton(
+                row1,
+                text="Prefix: Artist Name",
+                variable=self.prefix_artist,
+                command=self.update_filename_preview,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#0d1117",
+                selectcolor="#21262d",
+            ).pack(side=tk.LEFT, padx=15)
+
+            tk.Checkbutton(
+                row1,
+                text="Prefix: Song Name",
+                variable=self.prefix_song,
+                command=self.update_filename_preview,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#0d1117",
+                selectcolor="#21262d",
+            ).pack(side=tk.LEFT, padx=15)
+
+            tk.Checkbutton(
+                row1,
+                text="Prefix: BPM",
+                variable=self.prefix_bpm,
+                command=self.update_filename_preview,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#0d1117",
+                selectcolor="#21262d",
+            ).pack(side=tk.LEFT, padx=15)
+
+            tk.Checkbutton(
+                row2,
+                text="Prefix: Key",
+                variable=self.prefix_key,
+                command=self.update_filename_preview,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#0d1117",
+                selectcolor="#21262d",
+            ).pack(side=tk.LEFT, padx=15)
+
+            tk.Checkbutton(
+                row2,
+                text="Suffix: og",
+                variable=self.suffix_og,
+                command=self.update_filename_preview,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#0d1117",
+                selectcolor="#21262d",
+            ).pack(side=tk.LEFT, padx=15)
+
+            # row 3: how the file gets into the library
+            row3 = tk.Frame(self.prefix_section, bg="#0d1117")
+            row3.pack(pady=(0, 10))
+            tk.Label(
+                row3,
+                text="Storage:",
+                font=("Monaco", 13),
+                fg="#8b949e",
+                bg="#0d1117",
+            ).pack(side=tk.LEFT, padx=(15, 0))
+            for mode in STORAGE_MODES:
+                tk.Radiobutton(
+                    row3,
+                    text=mode,
+                    value=mode,
+                    variable=self.storage_mode,
+                    font=("Monaco", 13),
+                    fg="#f0f6fc",
+                    bg="#0d1117",
+                    selectcolor="#21262d",
+                ).pack(side=tk.LEFT, padx=15)
+            if ingest.numpy_available():
+                tk.Checkbutton(
+                    row3,
+                    text="Analyse",
+                    variable=self.analyze_on_save,
+                    font=("Monaco", 13),
+                    fg="#f0f6fc",
+                    bg="#0d1117",
+                    selectcolor="#21262d",
+                ).pack(side=tk.LEFT, padx=15)
+
+                # row 4: what WAV/AIFF files are converted to on the way in
+                row4 = tk.Frame(self.prefix_section, bg="#0d1117")
+                row4.pack(pady=(0, 10))
+                tk.Label(
+                    row4,
+                    text="Convert:",
+                    font=("Monaco", 13),
+                    fg="#8b949e",
+                    bg="#0d1117",
+                ).pack(side=tk.LEFT, padx=(15, 0))
+                for var, choices in [
+                    (self.convert_rate, ["keep", *map(str, ingest.RATES)]),
+                    (self.convert_bits, ["keep", "16", "24", "32f"]),
+                    (self.convert_normalize, ["off", *ingest.NORMALIZE]),
+                ]:
+                    menu = tk.OptionMenu(row4, var, *choices)
+                    menu.config(
+                        font=("Monaco", 13),
+                        bg="#21262d",
+                        fg="#f0f6fc",
+                        activebackground="#30363d",
+                        highlightthickness=0,
+                        relief="flat",
+                    )
+                    menu.pack(side=tk.LEFT, padx=(15, 0))
+                tk.Checkbutton(
+                    row4,
+                    text="Trim silence",
+                    variable=self.convert_trim,
+                    font=("Monaco", 13),
+                    fg="#f0f6fc",
+                    bg="#0d1117",
+                    selectcolor="#21262d",
+                ).pack(side=tk.LEFT, padx=15)
+
+        self.prefix_section.pack(pady=(0, 25))
+        self.schedule_refresh("save")
+
+    def add_item(self, kind):
+        win = tk.Toplevel(self)
+        win.title(f"Add {kind.capitalize()}")
+        win.geometry("500x400" if kind != "song" else "500x540")
+        win.configure(bg="#161b22")
+        win.transient(self)
+        win.grab_set()
+
+        if kind == "song":
+            if not getattr(self, "artist_dd", None) or not self.artist_dd.get():
+                self.log("Select artist first!", "#f85149")
+                win.destroy()
+                return
+            tk.Label(
+                win,
+                text="New Song + BPM + Key",
+                font=("Monaco", 20, "bold"),
+                fg="#58a6ff",
+                bg="#161b22",
+            ).pack(pady=30)
+            tk.Label(
+                win,
+                text="Song name:",
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#161b22",
+            ).pack()
+            song_e = tk.Entry(
+                win,
+                width=50,
+                font=("Monaco", 14),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+            )
+            song_e.pack(pady=8, padx=80)
+            song_e.focus()
+
+            tk.Label(
+                win,
+                text="BPM:",
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#161b22",
+            ).pack()
+            bpm_e = tk.Entry(
+                win,
+                width=20,
+                font=("Monaco", 14),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+            )
+            bpm_e.pack(pady=8)
+
+            tk.Label(
+                win,
+                text="Key (e.g. C# Minor):",
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#161b22",
+            ).pack()
+            key_e = tk.Entry(
+                win,
+                width=30,
+                font=("Monaco", 14),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+            )
+            key_e.pack(pady=8)
+
+            def save_song():
+                song = song_e.get().strip()
+                bpm_text = bpm_e.get().strip()
+                key = key_e.get().strip()
+
+                if not song:
+                    self.log("Song name required", "#f85149")
+                    return
+
+                try:
+                    bpm = int(bpm_text)
+                    if bpm <= 0 or bpm > 400:
+                        raise ValueError
+                except Exception:
+                    self.log("Invalid BPM (1–400)", "#f85149")
+                    return
+
+                if not key:
+                    self.log("Key required", "#f85149")
+                    return
+
+                artist = self.artist_dd.get()
+                if self.catalog.get_song(artist, song) is not None:
+                    self.log("Song exists", "#ffa657")
+                    return
+
+                self.change_config(
+                    "add_song",
+                    artist=artist,
+                    song={"name": song, "bpm": bpm, "key": key},
+                )
+                self.show_song()
+                self.song_dd.set(song)
+                self.log(f"Added: {song} ({bpm} BPM, {key})", "#58a6ff")
+                win.destroy()
+                self.on_song_selected()
+
+            Button(
+                win,
+                text="Add Song",
+                bg="#238636",
+                fg="white",
+                font=("Monaco", 16, "bold"),
+                command=save_song,
+                relief="flat",
+                padx=30,
+                pady=12,
+            ).pack(pady=30)
+        else:
+            tk.Label(
+                win,
+                text=f"New {kind.capitalize()}:",
+                font=("Monaco", 20, "bold"),
+                fg="#58a6ff",
+                bg="#161b22",
+            ).pack(pady=50)
+            e = tk.Entry(
+                win,
+                width=50,
+                font=("Monaco", 14),
+                bg="#21262d",
+                fg="#f0f6fc",
+                insertbackground="#58a6ff",
+            )
+            e.pack(pady=15, padx=80)
+            e.focus()
+
+            def ok():
+                v = e.get().strip()
+                if not v:
+                    return
+                if kind == "type" and v not in self.catalog.types:
+                    self.change_config("add_type", name=v)
+                    self.type_dd.set(v)
+                    self.on_type_selected()
+                elif kind == "subtype" and self.type_dd.get():
+                    tname = self.type_dd.get()
+                    if tname in self.catalog.types and not self.catalog.has_subtype(
+                        tname, v
+                    ):
+                        self.change_config("add_subtype", type_name=tname, name=v)
+                        self.show_subtype()
+                        self.subtype_dd.set(v)
+                        self.on_subtype_selected()
+                elif kind == "artist" and v not in self.catalog.artists:
+                    self.change_config("add_artist", name=v)
+                    self.show_artist()
+                    self.artist_dd.set(v)
+                    self.on_artist_selected()
+                self.log(f"Added {kind}: {v}", "#58a6ff")
+                win.destroy()
+                self.schedule_refresh("save")
+
+            Button(
+                win,
+                text="Add",
+                bg="#238636",
+                fg="white",
+                font=("Monaco", 16),
+                command=ok,
+                relief="flat",
+                padx=30,
+                pady=12,
+            ).pack(pady=30)
+
+    def delete_item(self, kind):
+        dd = getattr(self, f"{kind}_dd", None)
+        if not dd or not dd.get():
+            return
+        value = dd.get()
+
+        if kind == "artist":
+            win = tk.Toplevel(self)
+            win.title("Delete Artist")
+            win.geometry("480x200")
+            win.configure(bg="#161b22")
+            win.transient(self)
+            win.grab_set()
+            tk.Label(
+                win,
+                text=f"Delete artist '{value}'?\nAll songs will be removed.",
+                font=("Monaco", 14),
+                fg="#f0f6fc",
+                bg="#161b22",
+            ).pack(pady=40)
+
+            def yes_artist():
+                self.delete_nodes([{"op": "delete_artist", "name": value}])
+                if hasattr(self, "artist_dd"):
+                    self.artist_dd.set("")
+                if hasattr(self, "song_dd"):
+                    self.song_dd.set("")
+                self.reset_name()
+                for sec in [
+                    self.song_section,
+                    self.existing_files_section,
+                    self.sample_name_section,
+                    self.prefix_section,
+                ]:
+                    sec.pack_forget()
+                self.hide_existing_files()
+                self.log(f"Deleted artist: {value} ({UNDO_HINT} to undo)", "#ffa657")
+                win.destroy()
+
+            Button(
+                win,
+                text="Delete",
+                bg="#da3633",
+                fg="white",
+                font=("Monaco", 14),
+                command=yes_artist,
+                relief="flat",
+                width=150,
+                height=40,
+            ).pack(side=tk.LEFT, padx=(60, 0), pady=20)
+            Button(
+                win,
+                text="Cancel",
+                command=win.destroy,
+                font=("Monaco", 14),
+                width=150,
+                height=40,
+            ).pack(side=tk.RIGHT, padx=(0, 60), pady=20)
+            return
+
+        delete_files = tk.BooleanVar()
+        win = tk.Toplevel(self)
+        win.title(f"Delete {kind.capitalize()}")
+        win.geometry("520x260")
+        win.configure(bg="#161b22")
+        win.transient(self)
+        win.grab_set()
+        tk.Label(
+            win,
+            text=f"Delete '{value}'?",
+            font=("Monaco", 16),
+            fg="#f0f6fc",
+            bg="#161b22",
+        ).pack(pady=40)
+        tk.Checkbutton(
+            win,
+            text="Also delete all files/folders on disk",
+            variable=delete_files,
+            font=("Monaco", 13),
+            fg="#f0f6fc",
+            bg="#161b22",
+            selectcolor="#21262d",
+        ).pack(pady=15)
+
+        def yes_other():
+            if kind == "type":
+                op = {"op": "delete_type", "name": value}
+                paths = [core.ROOT_DIR / value]
+                self.type_dd.set("")
+                if hasattr(self, "subtype_dd"):
+                    self.subtype_dd.set("")
+                if hasattr(self, "artist_dd"):
+                    self.artist_dd.set("")
+                if hasattr(self, "song_dd"):
+                    self.song_dd.set("")
+                for sec in [
+                    self.subtype_section,
+                    self.artist_section,
+                    self.song_section,
+                    self.existing_files_section,
+                    self.sample_name_section,
+                    self.prefix_section,
+                ]:
+                    sec.pack_forget()
+                self.hide_existing_files()
+            elif kind == "subtype":
+                op = {
+                    "op": "delete_subtype",
+                    "type_name": self.type_dd.get(),
+                    "name": value,
+                }
+                paths = [core.ROOT_DIR / self.type_dd.get() / value]
+                if hasattr(self, "subtype_dd"):
+                    self.subtype_dd.set("")
+                if hasattr(self, "artist_dd"):
+                    self.artist_dd.set("")
+                if hasattr(self, "song_dd"):
+                    self.song_dd.set("")
+                for sec in [
+                    self.artist_section,
+                    self.song_section,
+                    self.existing_files_section,
+                    self.sample_name_section,
+                    self.prefix_section,
+                ]:
+                    sec.pack_forget()
+                self.hide_existing_files()
+            elif kind == "song":
+                artist = self.artist_dd.get()
+                op = {"op": "delete_song", "artist": artist, "name": value}
+                # the song has a folder under every type/subtype it was used in
+                paths = self.catalog.song_dirs(artist, value)
+                if hasattr(self, "song_dd"):
+                    self.song_dd.set("")
+                self.reset_name()
+                for sec in [
+                    self.existing_files_section,
+                    self.sample_name_section,
+                    self.prefix_section,
+                ]:
+                    sec.pack_forget()
+                self.hide_existing_files()
+
+            # folders are renamed into the trash, so this is instant
+            self.delete_nodes([op], paths if delete_files.get() else [])
+            self.log(f"Deleted {kind}: {value} ({UNDO_HINT} to undo)", "#ffa657")
+            win.destroy()
+
+        Button(
+            win,
+            text="Delete",
+            bg="#da3633",
+            fg="white",
+            font=("Monaco", 14),
+            command=yes_other,
+            relief="flat",
+            width=150,
+            height=40,
+        ).pack(side=tk.LEFT, padx=(60, 0), pady=20)
+        Button(
+            win,
+            text="Cancel",
+            command=win.destroy,
+            font=("Monaco", 14),
+            width=150,
+            height=40,
+        ).pack(side=tk.RIGHT, padx=(0, 60), pady=20)
+
+    def rename_item(self, kind):
+        """Rename (or, for subtypes and songs, re-parent) the selected node."""
+        dd = getattr(self, f"{kind}_dd", None)
+        if not dd or not dd.get():
+            return
+        value = dd.get()
+        parent_kind = {"subtype": "type", "song": "artist"}.get(kind)
+        if parent_kind:
+            parent = getattr(self, f"{parent_kind}_dd").get()
+            parents = (
+                self.catalog.type_names()
+                if parent_kind == "type"
+                else self.catalog.artist_names()
+            )
+
+        win = tk.Toplevel(self)
+        win.title(f"Rename {kind.capitalize()}")
+        win.geometry("520x400" if parent_kind else "520x320")
+        win.configure(bg="#161b22")
+        win.transient(self)
+        win.grab_set()
+        tk.Label(
+            win,
+            text=f"Rename {kind} '{value}' to:",
+            font=("Monaco", 16),
+            fg="#f0f6fc",
+            bg="#161b22",
+        ).pack(pady=(40, 10))
+        e = tk.Entry(
+            win,
+            width=40,
+            font=("Monaco", 14),
+            bg="#21262d",
+            fg="#f0f6fc",
+            insertbackground="#58a6ff",
+        )
+        e.insert(0, value)
+        e.pack(pady=8, padx=60)
+        e.focus()
+        e.select_range(0, tk.END)
+
+        parent_var = tk.StringVar(value=parent if parent_kind else "")
+        if parent_kind:
+            tk.Label(
+                win,
+                text=f"Under {parent_kind}:",
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#161b22",
+            ).pack(pady=(10, 0))
+            menu = tk.OptionMenu(win, parent_var, *parents)
+            menu.config(
+                font=("Monaco", 13),
+                bg="#21262d",
+                fg="#f0f6fc",
+                activebackground="#30363d",
+                highlightthickness=0,
+                relief="flat",
+            )
+            menu.pack(pady=6)
+        rename_files = tk.BooleanVar(value=kind != "type")
+        if kind != "type":
+            tk.Checkbutton(
+                win,
+                text="Also rename samples named after it",
+                variable=rename_files,
+                font=("Monaco", 13),
+                fg="#f0f6fc",
+                bg="#161b22",
+                selectcolor="#21262d",
+            ).pack(pady=10)
+
+        def ok():
+            new_name = e.get().strip()
+            if kind == "type":
+                fields = {"name": value, "new_name": new_name}
+            elif kind == "subtype":
+                fields = {
+                    "type_name": parent,
+                    "name": value,
+                    "new_name": new_name,
+                    "new_type": parent_var.get(),
+                }
+            elif kind == "artist":
+                fields = {"name": value, "new_name": new_name}
+            else:
+                fields = {
+                    "artist": parent,
+                    "name": value,
+                    "new_name": new_name,
+                    "new_artist": parent_var.get(),
+                }
+            if new_name == value and parent_var.get() == (
+                parent if parent_kind else ""
+            ):
+                win.destroy()
+                return
+            moved = []
+
+            def on_moved(src, dest):
+                self.on_node_moved(src, dest)
+                moved.append(dest)
+
+            try:
+                skipped = renamer.move_node(
+                    self.catalog,
+                    f"rename_{kind}",
+                    fields,
+                    rename_files=rename_files.get(),
+                    on_moved=on_moved,
+                    on_renamed=self.on_sample_renamed,
+                )
+            except ValueError as err:
+                self.log(str(err).capitalize(), "#f85149")
+                return
+            except OSError as err:
+                name = Path(err.filename or "").name
+                self.log(f"Nothing moved: {err.strerror}: {name}", "#f85149")
+                return
+            win.destroy()
+            threading.Thread(
+                target=self.reindex_search, args=(moved,), daemon=True
+            ).start()
+            if parent_kind:
+                getattr(self, f"{parent_kind}_dd").set(parent_var.get())
+            dd.set(new_name)
+            if skipped:
+                self.log(
+                    f"Renamed {kind} to {new_name}; {len(skipped)} sample(s)"
+                    " kept their names (name taken)",
+                    "#ffa657",
+                )
+            else:
+                self.log(f"Renamed {kind}: {value} → {new_name}", "#58a6ff")
+            self.schedule_refresh()
+
+        Button(
+            win,
+            text="Rename",
+            bg="#238636",
+            fg="white",
+            font=("Monaco", 14),
+            command=ok,
+            relief="flat",
+            width=150,
+            height=40,
+        ).pack(side=tk.LEFT, padx=(60, 0), pady=20)
+        Button(
+            win,
+            text="Cancel",
+            command=win.destroy,
+            font=("Monaco", 14),
+            width=150,
+            height=40,
+        ).pack(side=tk.RIGHT, padx=(0, 60), pady=20)
+        e.bind("<Return>", lambda event: ok())
+
+    def on_node_moved(self, src, dest):
+        self.hash_index.rename_tree(src, dest)
+        # re-added by reindex once the catalog has the new names
+        self.search_index.remove_tree(src)
+        self.dir_cache.forget(src)
+
+    def on_sample_renamed(self, src, dest):
+        self.hash_index.rename(src, dest)
+        self.search_index.rename(src, dest)
+
+    # ------- filename building & preview -------
+
+    def build_filename(self, include_extension=True):
+        """File name for the first staged file."""
+        staged = self.staged()
+        name = staged[0][1] if staged else self.name_var.get()
+        ext = ""
+        if include_extension and self.files:
+            ext = self.files[0].suffix
+        return core.build_filename(name, **self.naming(), ext=ext)
+
+    def show_name_fields(self):
+        """One name entry for a single file, the queue list for several."""
+        if len(self.files) > 1:
+            self.name_entry.pack_forget()
+            self.queue_label.config(
+                text=f"{len(self.files)} files, named after their source files"
+                " — pick one to rename it"
+            )
+            self.queue_frame.pack(fill="x", padx=20)
+            self.update_queue_rows()
+        else:
+            self.queue_frame.pack_forget()
+            self.name_entry.pack()
+
+    def update_queue_rows(self):
+        if not hasattr(self, "queue_frame") or not self.queue_frame.winfo_manager():
+            return
+        naming = self.naming()
+        rows = [
+            f"{core.build_filename(self.file_names[f], **naming, ext=f.suffix)}"
+            f"  ←  {f.name}"
+            for f in self.files
+        ]
+        if rows != self.queue_list.source:
+            self.queue_list.set_source(rows, keep_view=True)
+            if self.queue_sel is not None:
+                self.queue_list.selection_set(self.queue_sel)
+
+    def on_queue_select(self, index, value):
+        self.queue_sel = index
+        self.queue_name_var.set(self.file_names[self.files[index]])
+
+    def on_queue_name(self, *args):
+        if self.queue_sel is None or self.queue_sel >= len(self.files):
+            return
+        self.file_names[self.files[self.queue_sel]] = self.queue_name_var.get()
+        self.schedule_refresh("save")
+
+    def unstage_selected(self):
+        if self.queue_sel is None or self.queue_sel >= len(self.files):
+            return
+        src = self.files.pop(self.queue_sel)
+        del self.file_names[src]
+        self.queue_sel = None
+        self.queue_name_var.set("")
+        if len(self.files) == 1:
+            self.reset_name()
+        self.update_status()
+        self.schedule_refresh("save")
+
+    def naming(self):
+        """core.build_filename arguments for the selected song, minus the name."""
+        subtype = self.subtype_dd.get() if hasattr(self, "subtype_dd") else ""
+        artist = self.artist_dd.get() if hasattr(self, "artist_dd") else ""
+        song_name = self.song_dd.get() if hasattr(self, "song_dd") else ""
+        bpm = key = None
+        if artist and song_name:
+            song_info = self.catalog.get_song(artist, song_name)
+            if song_info is not None:
+                bpm, key = song_info.bpm, song_info.key
+        return dict(
+            subtype=subtype,
+            artist=artist,
+            song=song_name,
+            bpm=bpm,
+            key=key,
+            **self.naming_options(),
+        )
+
+    def naming_options(self):
+        """Current state of the prefix/suffix checkboxes (all off until shown)."""
+        return {
+            opt: getattr(self, opt).get() if hasattr(self, opt) else False
+            for opt in [
+                "prefix_artist",
+                "prefix_song",
+                "prefix_bpm",
+                "prefix_key",
+                "suffix_og",
+            ]
+        }
+
+    def update_filename_preview(self):
+        filename = self.build_filename(include_extension=True)
+        if filename:
+            text, fg = f"Filename preview: {filename}", "#58a6ff"
+            if len(self.files) > 1:
+                text += f" (+{len(self.files) - 1} more)"
+        else:
+            text, fg = "Filename preview:", "#8b949e"
+        if self.filename_preview_label.cget("text") != text:
+            self.filename_preview_label.config(text=text, fg=fg)
+        self.update_queue_rows()
+
+    # -------------- save --------------
+
+    def save(self):
+        staged = self.staged()
+        if not staged:
+            self.log("No file selected!", "#f85149")
+            self.schedule_refresh("save")
+            return
+        if not all(
+            [
+                self.type_dd.get(),
+                (
+                    getattr(self, "subtype_dd", None).get()
+                    if hasattr(self, "subtype_dd")
+                    else ""
+                ),
+                (
+                    getattr(self, "artist_dd", None).get()
+                    if hasattr(self, "artist_dd")
+                    else ""
+                ),
+                (
+                    getattr(self, "song_dd", None).get()
+                    if hasattr(self, "song_dd")
+                    else ""
+                ),
+            ]
+        ) or not all(name for _, name in staged):
+            self.log("Fill all fields!", "#f85149")
+            self.schedule_refresh("save")
+            return
+
+        song_name = self.song_dd.get()
+        artist = self.artist_dd.get()
+        if self.catalog.get_song(artist, song_name) is None:
+            self.log("Song not found", "#f85149")
+            return
+
+        target = core.target_dir(
+            self.type_dd.get(), self.subtype_dd.get(), artist, song_name
+        )
+        target.mkdir(parents=True, exist_ok=True)
+
+        # the queue is handed over whole; the form is free for the next one
+        self.ingest_worker.submit(
+            self.plan_ingest,
+            staged,
+            target,
+            self.naming(),
+            self.storage_mode.get(),
+            self.convert_settings(),
+        )
+        self.files = []
+        self.file_names = {}
+        self.queue_sel = None
+        self.update_status()
+        self.log(f"Checking {len(staged)} file(s)…", "#8b949e")
+        self.schedule_refresh("save")
+
+    def convert_settings(self):
+        rate, bits = self.convert_rate.get(), self.convert_bits.get()
+        normalize = self.convert_normalize.get()
+        return ingest.Settings(
+            rate=None if rate == "keep" else int(rate),
+            bits=None if bits == "keep" else int(bits.rstrip("f")),
+            normalize=None if normalize == "off" else normalize,
+            trim=self.convert_trim.get(),
+        )
+
+    def plan_ingest(self, staged, target, naming, mode, settings):
+        """Worker thread: plan the queue with ingest.prepare.
+
+        Collisions with the folder and within the queue are skipped; files
+        whose audio is already in the library are set aside for one
+        question on the UI thread.
+        """
+
+        def progress(done, total):
+            if total > 1:
+                self.ui_queue.post(
+                    self.log, f"Checking {done}/{total} for duplicates…", "#8b949e"
+                )
+
+        prepared = ingest.prepare(
+            staged, target, naming, self.hash_index, settings, progress
+        )
+        self.ui_queue.post(self.on_ingest_planned, prepared, mode, settings)
+
+    def on_ingest_planned(self, prepared, mode, settings):
+        skipped = [(src, r) for status, src, _, r in prepared.rows if status != "save"]
+        if prepared.dups:
+            self.ask_duplicate(prepared, mode, settings)
+        elif prepared.jobs:
+            self.start_save(prepared, mode, "copy", settings)
+        elif len(skipped) == 1:
+            self.log(f"File not saved — {skipped[0][1]}", "#ffa657")
+        elif skipped:
+            src, reason = skipped[0]
+            self.log(
+                f"{len(skipped)} files not saved — {src.name}: {reason}, …", "#ffa657"
+            )
+
+    def start_save(self, prepared, mode, duplicates, settings):
+        """Store a prepared queue with ingest.store, as the import command
+        does, on the ingest worker; results come back via self.ui_queue."""
+        self.ingest_worker.submit(
+            self.store_ingest, prepared, mode, duplicates, settings
+        )
+        self.log(f"Saving {len(prepared.jobs)} file(s) → {prepared.target.name}…")
+
+    def store_ingest(self, prepared, mode, duplicates, settings):
+        """Worker thread: copy/link/convert, then index what was saved."""
+
+        def progress(done, total):
+            self.ui_queue.post(self.log, f"Saving {done}/{total} file(s)…", "#8b949e")
+
+        try:
+            results = ingest.store(
+                prepared,
+                mode,
+                duplicates,
+                settings,
+                COPY_WORKERS,
+                self.hash_index,
+                progress,
+            )
+        except Exception as e:
+            self.ui_queue.post(self.log, f"Save failed — {e}", "#f85149")
+            return
+        saved = [r.dest for r in results.values() if r.ok]
+        self.search_index.add(saved)
+        skipped = sum(status != "save" for status, *_ in prepared.rows)
+        if duplicates == "skip":
+            skipped += len(prepared.dups)
+        self.ui_queue.post(self.on_save_done, results, prepared.target, mode, skipped)
+
+    def ask_duplicate(self, prepared, mode, settings):
+        """One question for every staged file whose audio is already filed."""
+        dups = list(prepared.dups.values())
+        others = len(prepared.jobs) > len(dups)
+        win = tk.Toplevel(self)
+        win.title("Duplicate Sample")
+        win.geometry("560x240")
+        win.configure(bg="#161b22")
+        win.transient(self)
+        win.grab_set()
+        first = dups[0].relative_to(core.ROOT_DIR)
+        if len(dups) == 1:
+            text = f"This sample is already in the library:\n{first}"
+        else:
+            text = (
+                f"{len(dups)} of these samples are already in the library,"
+                f" like:\n{first}"
+            )
+        tk.Label(
+            win,
+            text=text,
+            font=("Monaco", 13),
+            fg="#f0f6fc",
+            bg="#161b22",
+            wraplength=500,
+        ).pack(pady=40)
+
+        def answer(duplicates):
+            win.destroy()
+            if duplicates == "skip" and not others:
+                self.log("Nothing saved", "#8b949e")
+            else:
+                self.start_save(prepared, mode, duplicates, settings)
+
+        win.protocol("WM_DELETE_WINDOW", lambda: answer("skip"))
+        Button(
+            win,
+            text="Link",
+            bg="#238636",
+            fg="white",
+            font=("Monaco", 14),
+            command=lambda: answer("link"),
+            relief="flat",
+            width=140,
+            height=40,
+        ).pack(side=tk.LEFT, padx=(30, 0), pady=20)
+        Button(
+            win,
+            text="Copy anyway",
+            command=lambda: answer("copy"),
+            font=("Monaco", 14),
+            width=140,
+            height=40,
+        ).pack(side=tk.LEFT, padx=20, pady=20)
+        Button(
+            win,
+            text="Skip them" if others else "Cancel",
+            command=lambda: answer("skip"),
+            font=("Monaco", 14),
+            width=140,
+            height=40,
+        ).pack(side=tk.RIGHT, padx=(0, 30), pady=20)
+
+    def on_save_done(self, results, target, mode, skipped=0):
+        ok = [r for r in results.values() if r.ok]
+        failed = [r for r in results.values() if not r.ok]
+        for r in ok:
+            # don't wait for the watcher to show our own files
+            self.dir_cache.add(r.dest)
+        if len(failed) == 1:
+            self.log(f"File not saved — {failed[0].error}", "#ffa657")
+        elif failed:
+            r = failed[0]
+            self.log(
+                f"{len(failed)} files not saved — {r.dest.name}: {r.error}, …",
+                "#ffa657",
+            )
+        else:
+            n = len(ok)
+            plural = "s" if n != 1 else ""
+            msg = f"SAVED {n} file{plural} → {target.name}"
+            converted = sum(r.mode == "convert" for r in ok)
+            if converted:
+                msg += f" ({converted} converted)"
+            if any(r.mode not in (mode, "hardlink", "convert") for r in ok):
+                msg += f" ({mode} unsupported here, copied)"
+            if skipped:
+                msg += f", {skipped} skipped"
+            self.log(msg, "#58a6ff")
+        if ok:
+            song = None
+            if self.analyze_on_save.get():
+                # the form may have moved on since the queue was handed over
+                song = self.catalog.get_song(target.parent.name, target.name)
+            threading.Thread(
+                target=self.inspect_saved,
+                args=([r.dest for r in ok], self.analyze_on_save.get(), song),
+                daemon=True,
+            ).start()
+        # picks up a target folder this save just created
+        self.schedule_refresh("files")
+
+    def inspect_saved(self, paths, analyze, song):
+        """Worker thread: read headers (and optionally analyse) new samples.
+
+        If the song has a BPM, samples whose tempo estimate disagrees get
+        a warning in the log.
+        """
+        saved = self.hash_index.full_digests(paths)
+        self.metadata.extract(list(saved), saved)
+        if not analyze:
+            return
+        import analysis
+
+        analysis.analyze_many(self.metadata, saved)
+        if song is None or not song.bpm:
+            return
+        for path, digest in saved.items():
+            tempo = (self.metadata.get(digest) or {}).get("tempo")
+            if tempo and not analysis.tempo_matches(tempo, song.bpm):
+                self.ui_queue.post(
+                    self.log,
+                    f"{path.name} sounds like {tempo:g} BPM, song is {song.bpm}",
+                    "#ffa657",
+                )
@@ -0,0 +1,300 @@
+import filecmp
+import hashlib
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import core
+
+# bytes hashed from the start, middle and end of a file
+SAMPLE_SIZE = 64 * 1024
+
+
+def fast_hash(path):
+    """BLAKE2 over the file size plus three 64 KiB chunks.
+
+    Small files are hashed whole. Equal hashes are only a strong hint, so
+    anything acting on a match should confirm it with same_content().
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, "little"))
+        if size <= 3 * SAMPLE_SIZE:
+            h.update(f.read())
+        else:
+            for offset in (0, size // 2 - SAMPLE_SIZE // 2, size - SAMPLE_SIZE):
+                f.seek(offset)
+                h.update(f.read(SAMPLE_SIZE))
+    return h.hexdigest()
+
+
+def full_hash(path):
+    """BLAKE2 over the whole file, for data keyed by content (metadata,
+    analysis) where a fast_hash match can't be confirmed per use. Longer
+    than a fast_hash, so the two never mix up."""
+    h = hashlib.blake2b(digest_size=20)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def same_content(a, b):
+    """True if a and b are the same inode or byte-identical files."""
+    try:
+        if os.path.samefile(a, b):
+            return True
+    except OSError:
+        return False
+    return filecmp.cmp(a, b, shallow=False)
+
+
+class HashIndex:
+    """Persistent content hash -> library path index under core.STATE_DIR.
+
+    Paths are stored relative to the library root, so moving the whole
+    library doesn't invalidate the index. A file's full_hash is added on
+    demand by full_digests() and dropped whenever its row is rewritten.
+    """
+
+    def __init__(self, path=None):
+        self.root = core.ROOT_DIR
+        self.path = Path(path) if path else core.STATE_DIR / "hashes.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY, digest TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime REAL NOT NULL)"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS files_digest ON files(digest)")
+        have = {r[1] for r in self.db.execute("PRAGMA table_info(files)")}
+        if "full" not in have:
+            self.db.execute("ALTER TABLE files ADD COLUMN full TEXT")
+        self.db.commit()
+
+    def _rel(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def close(self):
+        self.db.close()
+
+    def add(self, path, digest=None):
+        """Record (or refresh) one library file."""
+        st = os.stat(path)
+        digest = digest or fast_hash(path)
+        with self._lock, self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files (path, digest, size, mtime)"
+                " VALUES (?, ?, ?, ?)",
+                (self._rel(path), digest, st.st_size, st.st_mtime),
+            )
+        return digest
+
+    def remove(self, path):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM files WHERE path = ?", (self._rel(path),))
+
+    def rename(self, old, new):
+        """Follow a library file to its new name."""
+        with self._lock, self.db:
+            # a stale row for new (deleted behind our back) is replaced
+            self.db.execute(
+                "UPDATE OR REPLACE files SET path = ? WHERE path = ?",
+                (self._rel(new), self._rel(old)),
+            )
+
+    def rename_tree(self, old, new):
+        """Follow every file under folder old to folder new."""
+        rel, new_rel = self._rel(old), self._rel(new)
+        prefix = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock, self.db:
+            self.db.execute(
+                "UPDATE OR REPLACE files SET path = ? || substr(path, ?)"
+                " WHERE path LIKE ? ESCAPE '\\' AND substr(path, 1, ?) = ?",
+                # LIKE ignores ASCII case, so check the prefix exactly too
+                (new_rel, len(rel) + 1, prefix + "/%", len(rel) + 1, rel + "/"),
+            )
+
+    def remove_tree(self, folder):
+        """Forget every file under folder, e.g. after it was deleted."""
+        rel = self._rel(folder)
+        prefix = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        with self._lock, self.db:
+            self.db.execute(
+                "DELETE FROM files WHERE path = ? OR path LIKE ? ESCAPE '\\'",
+                (rel, prefix + "/%"),
+            )
+
+    def find(self, digest):
+        """Library paths recorded under digest."""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT path FROM files WHERE digest = ?", (digest,)
+            ).fetchall()
+        return [self.root / r[0] for r in rows]
+
+    def digests(self):
+        """{library path: digest} for everything in the index."""
+        with self._lock:
+            rows = self.db.execute("SELECT path, digest FROM files").fetchall()
+        return {self.root / path: digest for path, digest in rows}
+
+    def find_duplicate(self, src, digest=None):
+        """Return (library path identical to src or None, digest of src)."""
+        digest = digest or fast_hash(src)
+        for p in self.find(digest):
+            if p.exists() and same_content(src, p):
+                return p, digest
+        return None, digest
+
+    def refresh(self, workers=8, progress=None):
+        """Bring the index in line with disk.
+
+        Files whose size and mtime are unchanged aren't re-hashed; entries
+        for files that are gone are dropped. Returns (hashed, removed).
+        """
+        with self._lock:
+            known = {
+                path: (size, mtime)
+                for path, size, mtime in self.db.execute(
+                    "SELECT path, size, mtime FROM files"
+                )
+            }
+        stale = []
+        seen = set()
+        for p in core.iter_samples(self.root):
+            rel = self._rel(p)
+            seen.add(rel)
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            if known.get(rel) != (st.st_size, st.st_mtime):
+                stale.append(p)
+
+        def hash_one(p):
+            try:
+                return p, fast_hash(p), p.stat()
+            except OSError:
+                return p, None, None
+
+        rows = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for i, (p, digest, st) in enumerate(pool.map(hash_one, stale), 1):
+                if digest is not None:
+                    rows.append((self._rel(p), digest, st.st_size, st.st_mtime))
+                if progress:
+                    progress(i, len(stale))
+
+        gone = [(rel,) for rel in known if rel not in seen]
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO files (path, digest, size, mtime)"
+                " VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self.db.executemany("DELETE FROM files WHERE path = ?", gone)
+        return len(rows), len(gone)
+
+    def full_digests(self, paths=None, workers=8):
+        """{path: full_hash} for library paths (default: every indexed file).
+
+        Hashes are stored with the file's row and reused while its size and
+        mtime match; paths the index doesn't know are hashed but not
+        stored. Unreadable files are left out.
+        """
+        sql = "SELECT path, full, size, mtime FROM files"
+        with self._lock:
+            if paths is None:
+                rows = self.db.execute(sql).fetchall()
+            else:
+                rows = [
+                    row
+                    for p in paths
+                    for row in self.db.execute(sql + " WHERE path = ?", (self._rel(p),))
+                ]
+        known = {
+            self.root / path: (full, size, mtime) for path, full, size, mtime in rows
+        }
+        paths = list(known) if paths is None else [Path(p) for p in paths]
+        out = {p: known[p][0] for p in paths if p in known and known[p][0]}
+
+        def hash_one(p):
+            try:
+                return p, full_hash(p), p.stat()
+            except OSError:
+                return p, None, None
+
+        todo = [p for p in paths if p not in out]
+        stored = []
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for p, digest, st in pool.map(hash_one, todo):
+                if digest is None:
+                    continue
+                out[p] = digest
+                if p in known and known[p][1:] == (st.st_size, st.st_mtime):
+                    stored.append((digest, self._rel(p)))
+        with self._lock, self.db:
+            self.db.executemany("UPDATE files SET full = ? WHERE path = ?", stored)
+        return out
+
+    def duplicate_groups(self):
+        """Yield lists of library paths that share identical content.
+
+        Files that are already hardlinks of each other aren't reported.
+        """
+        with self._lock:
+            digests = [
+                r[0]
+                for r in self.db.execute(
+                    "SELECT digest FROM files GROUP BY digest HAVING COUNT(*) > 1"
+                )
+            ]
+        for digest in digests:
+            remaining = [p for p in self.find(digest) if p.exists()]
+            while len(remaining) > 1:
+                first, rest = remaining[0], remaining[1:]
+                group, remaining = [first], []
+                for p in rest:
+                    if same_content(first, p):
+                        if not os.path.samefile(first, p):
+                            group.append(p)
+                    else:
+                        remaining.append(p)
+                if len(group) > 1:
+                    yield group
+
+
+def collapse(group):
+    """Replace every file in group after the first with a hardlink to it.
+
+    Each swap is atomic (link to a temp name, then os.replace), so a crash
+    never leaves a sample missing; a temp name left by such a crash is
+    replaced. Returns (bytes reclaimed, [(path, reason)] for files that
+    couldn't be swapped).
+    """
+    keep = group[0]
+    reclaimed = 0
+    skipped = []
+    for p in group[1:]:
+        tmp = p.with_name(f".{p.name}.dedupe")
+        try:
+            try:
+                os.link(keep, tmp)
+            except FileExistsError:
+                os.unlink(tmp)  # left by an interrupted run
+                os.link(keep, tmp)
+            size = p.stat().st_size
+            os.replace(tmp, p)
+        except OSError as e:
+            skipped.append((p, e.strerror or str(e)))
+            continue
+        reclaimed += size
+    return reclaimed, skipped
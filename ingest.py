@@ -0,0 +1,216 @@
+import csv
+import glob
+import importlib.util
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+import core
+from copyengine import CopyEngine, DEFAULT_WORKERS
+
+# Saving samples without the GUI: the import command and the app's save
+# queue both plan and store through here.
+
+MANIFEST_EXTENSIONS = (".csv", ".txt")
+# rate in Hz and bits (16, 24, or 32 for float) of the output, None keeps
+# the source's; normalize is None, "peak" or "loudness", with level the
+# target in dBFS (peak) or dB RMS (loudness), None for the default; trim
+# cuts leading silence. See convert.py.
+Settings = namedtuple(
+    "Settings",
+    "rate bits normalize level trim",
+    defaults=(None, None, None, None, False),
+)
+RATES = (44100, 48000, 88200, 96000)
+# bits -> (bytes per sample, float)
+FORMATS = {16: (2, False), 24: (3, False), 32: (4, True)}
+NORMALIZE = ("peak", "loudness")
+DEFAULT_LEVELS = {"peak": -1.0, "loudness": -16.0}
+
+# rows: plan_import's (status, src, dest, reason) for every source;
+# jobs: (src, dest) for each row to save; dups: {dest: library file with
+# the same audio}; digests: {dest: source content hash}; converting:
+# sources the conversion settings change
+Prepared = namedtuple("Prepared", "target rows jobs dups digests converting")
+
+
+def numpy_available():
+    """Whether analysis and conversion can run, without importing numpy."""
+    return importlib.util.find_spec("numpy") is not None
+
+
+def active(settings):
+    return settings is not None and any(
+        (settings.rate, settings.bits, settings.normalize, settings.trim)
+    )
+
+
+def read_manifest(path):
+    """Yield (source, sample name) pairs from a CSV manifest.
+
+    The manifest either has a header with a ``path`` column (and optionally a
+    ``name`` column), or is a plain list of paths, one per row.
+    """
+    with open(path, newline="") as f:
+        rows = [row for row in csv.reader(f) if row and row[0].strip()]
+    if not rows:
+        return
+    header = [c.strip().lower() for c in rows[0]]
+    if "path" in header:
+        path_col = header.index("path")
+        name_col = header.index("name") if "name" in header else None
+        rows = rows[1:]
+    else:
+        path_col, name_col = 0, 1
+    for row in rows:
+        src = Path(row[path_col].strip()).expanduser()
+        name = ""
+        if name_col is not None and name_col < len(row):
+            name = row[name_col].strip()
+        yield src, name or src.stem
+
+
+def expand_sources(args):
+    """Turn manifests, globs, folders and plain paths into (source, name) pairs."""
+    for arg in args:
+        p = Path(arg).expanduser()
+        if p.is_file() and p.suffix.lower() in MANIFEST_EXTENSIONS:
+            yield from read_manifest(p)
+        elif p.is_dir():
+            for f in sorted(p.rglob("*")):
+                if f.is_file() and f.suffix.lower() in core.AUDIO_EXTENSIONS:
+                    yield f, f.stem
+        elif p.exists():
+            yield p, p.stem
+        else:
+            matches = sorted(glob.glob(str(p), recursive=True))
+            if not matches:
+                # keep it so it shows up as skipped in the report
+                yield p, p.stem
+            for m in matches:
+                yield Path(m), Path(m).stem
+
+
+def plan_import(sources, target, naming):
+    """Decide what happens to each source before anything is written.
+
+    Returns a list of (status, src, dest, reason) where status is one of
+    "save", "skip" or "collision".
+    """
+    plan = []
+    claimed = set()
+    for src, name in sources:
+        if not src.is_file():
+            plan.append(("skip", src, None, "not found"))
+            continue
+        if src.suffix.lower() not in core.AUDIO_EXTENSIONS:
+            plan.append(("skip", src, None, "not an audio file"))
+            continue
+        name_no_ext = core.build_filename(name, **naming)
+        if not name_no_ext:
+            plan.append(("skip", src, None, "invalid name"))
+            continue
+        dest = target / (name_no_ext + src.suffix)
+        if dest in claimed:
+            plan.append(("collision", src, dest, "same name as another file in run"))
+        elif dest.exists():
+            plan.append(("collision", src, dest, "target filename already exists"))
+        else:
+            claimed.add(dest)
+            plan.append(("save", src, dest, ""))
+    return plan
+
+
+def prepare(sources, target, naming, index=None, settings=None, progress=None):
+    """Plan a save of (source, sample name) pairs into target.
+
+    With a HashIndex, every file to save is hashed and checked against
+    the library; progress(done, total) is called after each. Nothing is
+    written.
+    """
+    rows = plan_import(sources, target, naming)
+    jobs = [(src, dest) for status, src, dest, _ in rows if status == "save"]
+    dups, digests = {}, {}
+    if index is not None:
+        for i, (src, dest) in enumerate(jobs, 1):
+            try:
+                dup, digests[dest] = index.find_duplicate(src)
+            except OSError:
+                dup = None
+            if dup is not None:
+                dups[dest] = dup
+            if progress:
+                progress(i, len(jobs))
+    converting = set()
+    if active(settings):
+        # numpy comes in with convert, and only if something is converted
+        from convert import needed
+
+        converting = {src for src, _ in jobs if needed(src, settings)}
+    return Prepared(target, rows, jobs, dups, digests, converting)
+
+
+def store(
+    prepared,
+    mode="copy",
+    duplicates="copy",
+    settings=None,
+    workers=DEFAULT_WORKERS,
+    index=None,
+    progress=None,
+):
+    """Carry out a prepared save and wait for it.
+
+    duplicates is "copy" (store them like the rest), "link" (hardlink the
+    library file) or "skip". progress(done, total) is called from worker
+    threads as each file finishes. Returns {dest: CopyResult}; saved files
+    are added to index if one is given.
+    """
+    jobs = prepared.jobs
+    links = []
+    if duplicates != "copy":
+        jobs = [job for job in jobs if job[1] not in prepared.dups]
+        if duplicates == "link":
+            links = [(dup, dest) for dest, dup in prepared.dups.items()]
+    converting = [job for job in jobs if job[0] in prepared.converting]
+    jobs = [job for job in jobs if job[0] not in prepared.converting]
+    results = {}
+    if not (jobs or links or converting):
+        return results
+    prepared.target.mkdir(parents=True, exist_ok=True)
+    total = len(jobs) + len(links) + len(converting)
+    done = [0]
+    lock = threading.Lock()
+
+    def finished(result):
+        if progress:
+            with lock:
+                done[0] += 1
+                n = done[0]
+            progress(n, total)
+
+    engine = CopyEngine(workers=workers)
+    batches = [
+        engine.copy(jobs, mode=mode, on_file=finished),
+        engine.copy(links, "hardlink", on_file=finished),
+    ]
+    if converting:
+        from convert import convert_many
+
+        for r in convert_many(converting, settings):
+            results[r.dest] = r
+            finished(r)
+    for batch in batches:
+        batch.wait()
+        results.update((r.dest, r) for r in batch.results)
+    engine.shutdown()
+    if index is not None:
+        for r in results.values():
+            if r.ok:
+                # converted audio hashes differently from its source
+                digest = None if r.mode == "convert" else prepared.digests.get(r.dest)
+                try:
+                    index.add(r.dest, digest)
+                except OSError:
+                    pass  # already gone again; the next refresh settles it
+    return results
@@ -0,0 +1,229 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# durations kept per span name for the overlay's recent peak
+RECENT = 50
+
+# read first by every probe; while it's False a probe costs one call and
+# this check
+enabled = False
+_users = 0
+_lock = threading.Lock()
+_stats = {}
+_trace = None
+_threads = set()
+
+
+class Stat:
+    """Running totals for one span name, in nanoseconds."""
+
+    __slots__ = ("count", "total", "last", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.last = 0
+        self.recent = deque(maxlen=RECENT)
+
+    def add(self, ns):
+        self.count += 1
+        self.total += ns
+        self.last = ns
+        self.recent.append(ns)
+
+
+def enable():
+    """Start collecting; pairs with disable(), so the overlay and a trace
+    file can each turn instrumentation on independently."""
+    global enabled, _users
+    with _lock:
+        _users += 1
+        enabled = True
+
+
+def disable():
+    global enabled, _users
+    with _lock:
+        _users = max(0, _users - 1)
+        enabled = _users > 0
+
+
+def record(name, start, end, args=None):
+    """Account a span that ran from start to end (perf_counter_ns)."""
+    ns = end - start
+    with _lock:
+        stat = _stats.get(name)
+        if stat is None:
+            stat = _stats[name] = Stat()
+        stat.add(ns)
+        if _trace is not None:
+            _write(name, start, ns, args)
+
+
+def _write(name, start, ns, args):
+    # Chrome trace event format ("complete" events), one per line
+    tid = threading.get_ident()
+    if tid not in _threads:
+        _threads.add(tid)
+        meta = {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"name": threading.current_thread().name},
+        }
+        _trace.write(json.dumps(meta) + "\n")
+    event = {
+        "name": name,
+        "cat": name.split(".", 1)[0],
+        "ph": "X",
+        "ts": start / 1000,
+        "dur": ns / 1000,
+        "pid": os.getpid(),
+        "tid": tid,
+    }
+    if args:
+        event["args"] = args
+    _trace.write(json.dumps(event, default=str) + "\n")
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, self.start, time.perf_counter_ns(), self.args)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name, **args):
+    """with span("dir.list", folder=...): time a block (no-op when off)."""
+    if not enabled:
+        return _NO_SPAN
+    return _Span(name, args)
+
+
+def timed(name):
+    """Decorator: time every call of the function as span name."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def timed_fn(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, start, time.perf_counter_ns())
+
+        return timed_fn
+
+    return wrap
+
+
+def stats():
+    """{name: (count, last seconds, recent peak seconds, mean seconds)}."""
+    with _lock:
+        return {
+            name: (s.count, s.last / 1e9, max(s.recent) / 1e9, s.total / s.count / 1e9)
+            for name, s in _stats.items()
+        }
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+# -- trace files --
+
+
+def tracing():
+    """Path of the trace file being written, or None."""
+    return _trace.name if _trace is not None else None
+
+
+def start_trace(path):
+    """Append every span to path as JSON lines until stop_trace()."""
+    global _trace
+    stop_trace()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with _lock:
+        _trace = open(path, "a")
+        _threads.clear()
+    enable()
+    return path
+
+
+def stop_trace():
+    global _trace
+    with _lock:
+        trace, _trace = _trace, None
+    if trace is None:
+        return None
+    trace.close()
+    disable()
+    return trace.name
+
+
+atexit.register(stop_trace)
+
+
+def read_trace(path):
+    """The events of a JSON-lines trace; a torn last line is skipped."""
+    events = []
+    with open(path) as f:
+        for line in f:
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                break
+    return events
+
+
+def summarize(events):
+    """[(name, count, total seconds, max seconds)], largest total first."""
+    totals = {}
+    for e in events:
+        if e.get("ph") != "X":
+            continue
+        count, total, peak = totals.get(e["name"], (0, 0.0, 0.0))
+        dur = e["dur"] / 1e6
+        totals[e["name"]] = (count + 1, total + dur, max(peak, dur))
+    rows = [(name, *t) for name, t in totals.items()]
+    return sorted(rows, key=lambda r: -r[2])
+
+
+def write_chrome(events, path):
+    """Write events as a Chrome/Perfetto trace (also loads in speedscope)."""
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+if os.environ.get("FSYS_TRACE"):
+    start_trace(os.environ["FSYS_TRACE"])
@@ -0,0 +1,332 @@
+import os
+import sqlite3
+import struct
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import core
+from hashindex import full_hash
+
+# (column, sqlite type) stored per content hash
+FIELDS = (
+    ("duration", "REAL"),
+    ("sample_rate", "INTEGER"),
+    ("bit_depth", "INTEGER"),
+    ("channels", "INTEGER"),
+    ("bpm", "REAL"),
+    ("key", "TEXT"),
+    # filled in by analysis.py
+    ("peak_db", "REAL"),
+    ("rms_db", "REAL"),
+    ("start", "REAL"),
+    ("end", "REAL"),
+    ("tempo", "REAL"),
+)
+# below this many files, spawning worker processes costs more than it saves
+POOL_THRESHOLD = 16
+DEFAULT_WORKERS = os.cpu_count() or 4
+
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+# Apple Loops 'basc' scale types
+SCALES = {1: " Minor", 2: " Major"}
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def _chunks(f, end, order):
+    """Yield (id, offset, size) for the chunks between f.tell() and end."""
+    header = struct.Struct(order + "4sI")
+    pos = f.tell()
+    while pos + 8 <= end:
+        f.seek(pos)
+        cid, size = header.unpack(f.read(8))
+        yield cid, pos + 8, size
+        pos += 8 + size + (size & 1)
+
+
+def _extended(raw):
+    """80-bit IEEE 754 extended float (AIFF sample rate) to float."""
+    exp, mant = struct.unpack(">HQ", raw)
+    sign = -1 if exp & 0x8000 else 1
+    exp &= 0x7FFF
+    if exp == 0 and mant == 0:
+        return 0.0
+    return sign * mant * 2.0 ** (exp - 16383 - 63)
+
+
+def _read_wav(f, size, pcm):
+    meta = {}
+    frames = None
+    for cid, offset, length in _chunks(f, size + 8, "<"):
+        f.seek(offset)
+        if cid == b"fmt ":
+            tag, channels, rate, _, align, bits = struct.unpack("<HHIIHH", f.read(16))
+            if tag == WAVE_FORMAT_EXTENSIBLE and length >= 26:
+                # cbSize, the bits actually used per container, channel mask,
+                # then the real format tag as the start of a GUID
+                _, valid, _, tag = struct.unpack("<HHIH", f.read(10))
+                bits = valid or bits
+            meta.update(channels=channels, sample_rate=rate, bit_depth=bits)
+            pcm.update(
+                channels=channels,
+                width=align // channels if channels else 0,
+                float=tag == WAVE_FORMAT_IEEE_FLOAT,
+                # 8-bit WAV is the one unsigned format
+                unsigned=align == channels,
+                order="<",
+                supported=tag in (WAVE_FORMAT_PCM, WAVE_FORMAT_IEEE_FLOAT),
+            )
+        elif cid == b"data":
+            frames = length
+            pcm["offset"] = offset
+        elif cid == b"acid" and length >= 24:
+            flags, root, _, _, beats, _, _, tempo = struct.unpack(
+                "<IHHfIHHf", f.read(24)
+            )
+            if tempo > 0:
+                meta["bpm"] = round(tempo, 2)
+            if flags & 0x02:
+                meta["key"] = NOTE_NAMES[root % 12]
+        elif cid == b"smpl" and length >= 36 and "key" not in meta:
+            unity = struct.unpack("<9I", f.read(36))[3]
+            if unity:
+                meta["key"] = NOTE_NAMES[unity % 12]
+    align = pcm.get("width", 0) * pcm.get("channels", 0)
+    if frames is not None and align and meta.get("sample_rate"):
+        pcm["frames"] = frames // align
+        meta["duration"] = pcm["frames"] / meta["sample_rate"]
+    return meta
+
+
+def _read_aiff(f, size, pcm):
+    meta = {}
+    beats = None
+    for cid, offset, length in _chunks(f, size + 8, ">"):
+        f.seek(offset)
+        if cid == b"COMM":
+            channels, frames, bits = struct.unpack(">hIh", f.read(8))
+            rate = _extended(f.read(10))
+            # AIFC adds a compression type; plain AIFF is big-endian PCM
+            comp = f.read(4) if length >= 22 else b"NONE"
+            meta.update(channels=channels, sample_rate=int(rate), bit_depth=bits)
+            if rate:
+                meta["duration"] = frames / rate
+            pcm.update(
+                channels=channels,
+                frames=frames,
+                width=(bits + 7) // 8,
+                float=comp.lower() in (b"fl32", b"fl64"),
+                order="<" if comp == b"sowt" else ">",
+                supported=comp.lower() in (b"none", b"twos", b"sowt", b"fl32", b"fl64"),
+            )
+        elif cid == b"SSND":
+            data_offset = struct.unpack(">I", f.read(4))[0]
+            pcm["offset"] = offset + 8 + data_offset
+        elif cid == b"basc" and length >= 12:
+            _, beats, root, scale = struct.unpack(">IIHH", f.read(12))
+            if root:
+                meta["key"] = NOTE_NAMES[root % 12] + SCALES.get(scale, "")
+    # Apple Loops store a beat count, not a tempo
+    if beats and meta.get("duration"):
+        meta["bpm"] = round(beats * 60 / meta["duration"], 2)
+    return meta
+
+
+def read_header(path):
+    """Return (metadata, pcm layout) for a WAV/AIFF file, or (None, None).
+
+    Only the chunk headers (plus fmt/COMM and the tempo/key chunks) are
+    read, never the audio itself. The layout says where the samples are
+    (offset, frames, channels, width in bytes, float, byte order) so they
+    can be memory-mapped; "supported" is False for compressed data.
+    """
+    pcm = {}
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if len(head) < 12:
+                return None, None
+            riff, size, form = struct.unpack("<4sI4s", head)
+            if riff == b"RIFF" and form == b"WAVE":
+                return _read_wav(f, size, pcm), pcm
+            size = struct.unpack(">I", head[4:8])[0]
+            if riff == b"FORM" and form in (b"AIFF", b"AIFC"):
+                return _read_aiff(f, size, pcm), pcm
+    except (OSError, struct.error):
+        pass
+    return None, None
+
+
+def read_metadata(path):
+    """Header fields of a WAV/AIFF file, or None if it isn't one we can read."""
+    return read_header(path)[0]
+
+
+def _extract(job):
+    """Worker entry point: (path, digest or None) -> (path, digest, meta)."""
+    path, digest = job
+    try:
+        digest = digest or full_hash(path)
+    except OSError:
+        return path, None, None
+    return path, digest, read_metadata(path)
+
+
+class MetadataStore:
+    """Extracted metadata keyed by full content hash (hashindex.full_hash).
+
+    Lives in the hash index database, so it can be joined against library
+    paths and filtered in SQL. The same sample filed twice is read once;
+    files that only share a fast_hash each get their own row.
+    """
+
+    def __init__(self, path=None):
+        self.root = core.ROOT_DIR
+        self.path = Path(path) if path else core.STATE_DIR / "hashes.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS metadata (digest TEXT PRIMARY KEY)")
+        have = {r[1] for r in self.db.execute("PRAGMA table_info(metadata)")}
+        for name, kind in FIELDS:
+            if name not in have:
+                self.db.execute(f"ALTER TABLE metadata ADD COLUMN {name} {kind}")
+        # files a stage (e.g. "analysis") couldn't read, as of size/mtime
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS failures ("
+            " digest TEXT NOT NULL, stage TEXT NOT NULL,"
+            " size INTEGER NOT NULL, mtime REAL NOT NULL,"
+            " PRIMARY KEY (digest, stage))"
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def get(self, digest):
+        cols = ", ".join(name for name, _ in FIELDS)
+        with self._lock:
+            row = self.db.execute(
+                f"SELECT {cols} FROM metadata WHERE digest = ?", (digest,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {name: v for (name, _), v in zip(FIELDS, row) if v is not None}
+
+    def put_many(self, rows):
+        """Store (digest, meta) pairs, merging into what's already there.
+
+        Fields missing from meta keep their stored value; keys not in
+        FIELDS are ignored.
+        """
+        names = [name for name, _ in FIELDS]
+        values = [(d, *(m.get(n) for n in names)) for d, m in rows]
+        marks = ", ".join("?" * (len(names) + 1))
+        merge = ", ".join(f"{n} = COALESCE(excluded.{n}, {n})" for n in names)
+        with self._lock, self.db:
+            self.db.executemany(
+                f"INSERT INTO metadata (digest, {', '.join(names)})"
+                f" VALUES ({marks}) ON CONFLICT (digest) DO UPDATE SET {merge}",
+                values,
+            )
+
+    def known(self, digests, field=None):
+        """The digests that already have a row (with field set, if given)."""
+        sql = "SELECT digest FROM metadata"
+        if field is not None:
+            sql += f" WHERE {field} IS NOT NULL"
+        with self._lock:
+            return {r[0] for r in self.db.execute(sql) if r[0] in digests}
+
+    def mark_failed(self, stage, rows):
+        """Remember (digest, size, mtime) files that stage couldn't read."""
+        with self._lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO failures VALUES (?, ?, ?, ?)",
+                [(d, stage, size, mtime) for d, size, mtime in rows],
+            )
+
+    def failed(self, stage):
+        """{digest: (size, mtime)} of files stage failed on."""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT digest, size, mtime FROM failures WHERE stage = ?", (stage,)
+            ).fetchall()
+        return {d: (size, mtime) for d, size, mtime in rows}
+
+    def extract(self, paths, digests=None, workers=DEFAULT_WORKERS, progress=None):
+        """Read metadata for paths whose content isn't in the store yet.
+
+        digests maps path -> known full content hash (from
+        HashIndex.full_digests) so those files aren't re-hashed. Large
+        batches fan out over a process pool. Returns the number of files
+        read.
+        """
+        digests = digests or {}
+        done = self.known({d for d in digests.values() if d})
+        jobs = []
+        for p in paths:
+            digest = digests.get(p)
+            if digest is None or digest not in done:
+                jobs.append((str(p), digest))
+        if not jobs:
+            return 0
+        pool = None
+        if len(jobs) >= POOL_THRESHOLD and workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers)
+            results = pool.map(_extract, jobs, chunksize=32)
+        else:
+            results = map(_extract, jobs)
+        rows = []
+        try:
+            for i, (_, digest, meta) in enumerate(results, 1):
+                if digest:
+                    # store unreadable formats too, so they aren't retried
+                    rows.append((digest, meta or {}))
+                if progress:
+                    progress(i, len(jobs))
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.put_many(rows)
+        return len(jobs)
+
+    def find(self, bpm=None, key=None, min_duration=None, max_duration=None):
+        """Library paths (via the hash index) whose metadata matches.
+
+        bpm is a (low, high) pair. key matches case-insensitively on the
+        whole tonic, so "C#" finds "C#" and "C# Minor" but "C" doesn't
+        find "C#". Returns [(path, meta)].
+        """
+        where, args = [], []
+        if bpm is not None:
+            where.append("m.bpm BETWEEN ? AND ?")
+            args.extend(bpm)
+        if key:
+            # stored keys are "<tonic>" or "<tonic> <scale>", single-spaced
+            key = " ".join(key.split())
+            escaped = key.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            where.append("(m.key = ? COLLATE NOCASE OR m.key LIKE ? ESCAPE '\\')")
+            args.extend([key, escaped + " %"])
+        if min_duration is not None:
+            where.append("m.duration >= ?")
+            args.append(min_duration)
+        if max_duration is not None:
+            where.append("m.duration <= ?")
+            args.append(max_duration)
+        cols = ", ".join("m." + name for name, _ in FIELDS)
+        sql = f"SELECT f.path, {cols} FROM files f JOIN metadata m ON m.digest = f.full"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        with self._lock:
+            rows = self.db.execute(sql + " ORDER BY f.path", args).fetchall()
+        return [
+            (
+                self.root / r[0],
+                {n: v for (n, _), v in zip(FIELDS, r[1:]) if v is not None},
+            )
+            for r in rows
+        ]
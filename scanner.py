@@ -0,0 +1,192 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path, PurePosixPath
+
+import core
+import instrument
+
+# a folder modified this close to the scan may change again within the same
+# mtime tick, so it isn't trusted on the next rescan (same trick as git's
+# "racily clean" index entries)
+RACY_WINDOW_NS = 2 * 10**9
+# folders stat'ed/listed at once; scandir releases the GIL, and on network
+# volumes and cold caches the latency overlaps
+SCAN_WORKERS = 8
+
+ScanEntry = namedtuple("ScanEntry", "path size mtime ino")
+
+
+def _parent(rel):
+    return str(PurePosixPath(rel).parent) if "/" in rel else ""
+
+
+def _join(rel, name):
+    return f"{rel}/{name}" if rel else name
+
+
+class LibraryScan:
+    """Snapshot of every file in the library: path, size, mtime, inode.
+
+    Kept in STATE_DIR/scan.db next to the hash index. rescan() stats every
+    known folder but only lists the ones whose mtime changed since the last
+    pass; adding, removing or renaming an entry always bumps its folder's
+    mtime, so that's enough to find new and deleted files. A file rewritten
+    in place doesn't touch its folder, so its size/mtime can lag until a
+    full rescan.
+
+    Hidden folders (.fsys, .trash) are skipped. Hidden files are recorded
+    so leftovers like interrupted copies can be found, but files() leaves
+    them out unless asked. Paths are stored relative to the library root,
+    like HashIndex.
+    """
+
+    def __init__(self, path=None):
+        self.root = core.ROOT_DIR
+        self.path = Path(path) if path else core.STATE_DIR / "scan.db"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime INTEGER)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " dir TEXT NOT NULL, name TEXT NOT NULL, size INTEGER NOT NULL,"
+            " mtime INTEGER NOT NULL, ino INTEGER NOT NULL,"
+            " PRIMARY KEY (dir, name)) WITHOUT ROWID"
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+    @instrument.timed("dir.scan")
+    def _visit(self, rel, known, full):
+        """Stat one folder and list it if it changed.
+
+        Returns (mtime, files or None if unchanged, subfolders), or None
+        if the folder is gone.
+        """
+        folder = self.root / rel if rel else self.root
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return None
+        if not full and known.get(rel) == mtime:
+            return mtime, None, None
+        files, subdirs = [], []
+        try:
+            with os.scandir(folder) as it:
+                for e in it:
+                    try:
+                        if e.is_dir(follow_symlinks=False):
+                            if not e.name.startswith("."):
+                                subdirs.append(_join(rel, e.name))
+                        elif e.is_file():
+                            st = e.stat()
+                            files.append(
+                                (e.name, st.st_size, st.st_mtime_ns, st.st_ino)
+                            )
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return mtime, files, subdirs
+
+    def rescan(self, full=False, workers=SCAN_WORKERS):
+        """Bring the snapshot up to date. Returns (folders listed, folders seen).
+
+        The tree is walked a level at a time, each level's folders visited
+        on a thread pool.
+        """
+        with self._lock:
+            known = dict(self.db.execute("SELECT path, mtime FROM dirs"))
+        children = defaultdict(list)
+        for rel in known:
+            if rel:
+                children[_parent(rel)].append(rel)
+
+        started = time.time_ns()
+        listed = []  # (rel, mtime, [(name, size, mtime, ino)])
+        seen = set()
+        level = [""]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while level:
+                results = pool.map(lambda rel: self._visit(rel, known, full), level)
+                next_level = []
+                for rel, result in zip(level, results):
+                    if result is None:
+                        continue
+                    mtime, files, subdirs = result
+                    seen.add(rel)
+                    if files is None:
+                        next_level.extend(children[rel])
+                        continue
+                    next_level.extend(subdirs)
+                    if mtime >= started - RACY_WINDOW_NS:
+                        mtime = -1
+                    listed.append((rel, mtime, files))
+                level = next_level
+
+        gone = [(rel,) for rel in known if rel not in seen]
+        with self._lock, self.db:
+            for rel, mtime, files in listed:
+                self.db.execute("DELETE FROM files WHERE dir = ?", (rel,))
+                self.db.executemany(
+                    "INSERT INTO files VALUES (?, ?, ?, ?, ?)",
+                    [(rel, *f) for f in files],
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO dirs VALUES (?, ?)", (rel, mtime)
+                )
+            self.db.executemany("DELETE FROM files WHERE dir = ?", gone)
+            self.db.executemany("DELETE FROM dirs WHERE path = ?", gone)
+        return len(listed), len(seen)
+
+    # -- reading the snapshot --
+
+    def folders(self):
+        """Set of library folders (relative posix paths, "" is the root)."""
+        with self._lock:
+            return {r[0] for r in self.db.execute("SELECT path FROM dirs")}
+
+    def has_folder(self, folder):
+        rel = Path(folder).relative_to(self.root).as_posix()
+        rel = "" if rel == "." else rel
+        with self._lock:
+            row = self.db.execute(
+                "SELECT 1 FROM dirs WHERE path = ?", (rel,)
+            ).fetchone()
+        return row is not None
+
+    def rows(self):
+        """(dir, name, size, mtime, ino) for every file, hidden ones included.
+
+        dir is relative to the library root; cheaper than files() when
+        only names are needed.
+        """
+        with self._lock:
+            return self.db.execute(
+                "SELECT dir, name, size, mtime, ino FROM files"
+            ).fetchall()
+
+    def files(self, audio_only=True, hidden=False):
+        """Yield a ScanEntry for every file in the snapshot."""
+        for rel, name, size, mtime, ino in self.rows():
+            if not hidden and name.startswith("."):
+                continue
+            if audio_only and not name.lower().endswith(core.AUDIO_EXTENSIONS):
+                continue
+            yield ScanEntry(self.root / rel / name, size, mtime, ino)
+
+    def count(self):
+        with self._lock:
+            files = self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+            dirs = self.db.execute("SELECT COUNT(*) FROM dirs").fetchone()[0]
+        return files, dirs
@@ -0,0 +1,159 @@
+import heapq
+import re
+from bisect import bisect_left
+
+import instrument
+
+MAX_RESULTS = 100
+SEPARATORS = " _-.()[]"
+
+
+class SearchIndex:
+    """Ranked prefix/substring/fuzzy matching over a fixed list of strings.
+
+    Results are ranked exact > prefix > word prefix > substring > fuzzy
+    (characters in order), alphabetically within each tier. Prefix tiers
+    come straight out of sorted lists with bisect; the n-gram postings for
+    substring and fuzzy matching are only built on first use. When the user
+    keeps typing, the previous query's matches are narrowed down instead of
+    going back to the index.
+    """
+
+    def __init__(self, values):
+        self.values = sorted(values, key=str.lower)
+        self.keys = [v.lower() for v in self.values]
+        self._words = None
+        self._grams = None
+        self._last = None  # (query, substring ids, fuzzy ids or None)
+
+    def __len__(self):
+        return len(self.values)
+
+    # -- lazily built structures --
+
+    def _word_starts(self):
+        """Sorted (rest of key from a word start, id), skipping position 0."""
+        if self._words is None:
+            words = []
+            for i, k in enumerate(self.keys):
+                for pos in range(1, len(k)):
+                    if k[pos - 1] in SEPARATORS and k[pos] not in SEPARATORS:
+                        words.append((k[pos:], i))
+            words.sort()
+            self._words = words
+        return self._words
+
+    def _postings(self):
+        """n-gram (1..3 chars) -> set of ids containing it."""
+        if self._grams is None:
+            grams = {}
+            for i, k in enumerate(self.keys):
+                seen = set()
+                for n in (1, 2, 3):
+                    for pos in range(len(k) - n + 1):
+                        seen.add(k[pos : pos + n])
+                for g in seen:
+                    ids = grams.get(g)
+                    if ids is None:
+                        grams[g] = {i}
+                    else:
+                        ids.add(i)
+            self._grams = grams
+        return self._grams
+
+    def _containing(self, grams):
+        postings = self._postings()
+        sets = []
+        for g in grams:
+            ids = postings.get(g)
+            if not ids:
+                return set()
+            sets.append(ids)
+        sets.sort(key=len)
+        return sets[0].intersection(*sets[1:])
+
+    def _substring_ids(self, q):
+        last = self._last
+        if last is not None and last[0] in q:
+            pool = last[1]
+        else:
+            n = min(3, len(q))
+            pool = self._containing({q[i : i + n] for i in range(len(q) - n + 1)})
+        keys = self.keys
+        return {i for i in pool if q in keys[i]}
+
+    def _fuzzy_ids(self, q):
+        last = self._last
+        if last is not None and last[2] is not None and q.startswith(last[0]):
+            pool = last[2] | last[1]
+        else:
+            pool = self._containing(set(q))
+        keys = self.keys
+        search = re.compile(".*?".join(map(re.escape, q)), re.S).search
+        return {i for i in pool if search(keys[i])}
+
+    # -- querying --
+
+    @instrument.timed("dropdown.filter")
+    def query(self, text, limit=MAX_RESULTS):
+        """Return up to limit values matching text, best first."""
+        q = text.lower()
+        if not q:
+            return self.values[:limit]
+        keys = self.keys
+        picked = []
+        taken = set()
+
+        # exact + prefix: one contiguous run of the sorted keys, exact first
+        lo = bisect_left(keys, q)
+        hi = bisect_left(keys, q + "\U0010ffff", lo)
+        picked.extend(range(lo, min(hi, lo + limit)))
+        taken.update(picked)
+        if len(picked) >= limit:
+            self._last = None
+            return [self.values[i] for i in picked]
+
+        # word prefix, e.g. "ki" -> "Big Kick"
+        words = self._word_starts()
+        pos = bisect_left(words, (q,))
+        word_ids = []
+        while pos < len(words) and words[pos][0].startswith(q):
+            i = words[pos][1]
+            if i not in taken:
+                word_ids.append(i)
+                taken.add(i)
+            pos += 1
+        word_ids.sort()
+        picked.extend(word_ids[: limit - len(picked)])
+
+        substring = self._substring_ids(q)
+        if len(picked) < limit:
+            rest = [i for i in substring if i not in taken]
+            picked.extend(
+                heapq.nsmallest(
+                    limit - len(picked), rest, key=lambda i: (keys[i].find(q), i)
+                )
+            )
+            taken.update(rest)
+
+        fuzzy = None
+        if len(picked) < limit and len(q) > 1:
+            fuzzy = self._fuzzy_ids(q)
+            rest = [i for i in fuzzy if i not in taken]
+            picked.extend(
+                heapq.nsmallest(
+                    limit - len(picked), rest, key=lambda i: (_span(keys[i], q), i)
+                )
+            )
+
+        self._last = (q, substring, fuzzy)
+        return [self.values[i] for i in picked]
+
+
+def _span(key, q):
+    """Length of the shortest-from-first-char window holding q in order."""
+    start = key.find(q[0])
+    pos = start
+    for c in q[1:]:
+        pos = key.find(c, pos + 1)
+    return pos - start
@@ -0,0 +1,34 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# the modules live flat in the repo root
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import core  # noqa: E402
+from catalog import Catalog  # noqa: E402
+
+
+@pytest.fixture
+def library(tmp_path):
+    """An empty library in tmp_path; ROOT_DIR is put back afterwards."""
+    previous = core.ROOT_DIR
+    core.set_root(tmp_path)
+    yield tmp_path
+    core.set_root(previous)
+
+
+@pytest.fixture
+def song_folder(library):
+    """Drums/Kicks/X/Y, a song at 120 BPM in C Minor; returns (catalog, folder)."""
+    catalog = Catalog(
+        {
+            "types": [{"name": "Drums", "subtypes": ["Kicks"]}],
+            "artists": {"X": {"songs": [{"name": "Y", "bpm": 120, "key": "C Minor"}]}},
+        }
+    )
+    core.save_config(catalog.to_config())
+    folder = core.target_dir("Drums", "Kicks", "X", "Y")
+    folder.mkdir(parents=True)
+    return catalog, folder
@@ -0,0 +1,22 @@
+import os
+
+import pytest
+
+import analysis
+from hashindex import HashIndex
+from metadata import MetadataStore
+
+pytest.importorskip("numpy")
+
+
+def test_undecodable_files_are_skipped_until_they_change(library):
+    bad = library / "bad.wav"
+    bad.write_bytes(b"RIFF\x04\x00\x00\x00WAVE")
+    index, store = HashIndex(), MetadataStore()
+    index.add(bad)
+    digests = index.full_digests()
+    assert analysis.analyze_many(store, digests, workers=1) == 1
+    assert analysis.analyze_many(store, digests, workers=1) == 0
+    st = bad.stat()
+    os.utime(bad, (st.st_atime, st.st_mtime + 10))
+    assert analysis.analyze_many(store, digests, workers=1) == 1
@@ -0,0 +1,12 @@
+import bench
+
+
+def test_startup_skips_gui_probes_without_their_dependencies(monkeypatch):
+    monkeypatch.setattr(bench, "missing_gui_deps", lambda: ["tkmacosx"])
+    monkeypatch.setattr(bench, "_probe", lambda name, root: (0.01, []))
+    rows = {name: problem for name, _, _, problem in bench.startup(runs=1)}
+    assert rows == {
+        "cli": "",
+        "gui import": "skipped: tkmacosx not installed",
+        "gui window": "skipped: tkmacosx not installed",
+    }
@@ -0,0 +1,125 @@
+import core
+from catalog import Catalog
+
+# every op, including ones that collide or name something missing
+OPS = [
+    {"op": "add_type", "name": "Drums"},
+    {"op": "add_type", "name": "Synth"},
+    {"op": "add_type", "name": "Drums"},
+    {"op": "add_subtype", "type_name": "Drums", "name": "Kicks"},
+    {"op": "add_subtype", "type_name": "Drums", "name": "Snares"},
+    {"op": "add_subtype", "type_name": "Nope", "name": "Kicks"},
+    {"op": "rename_subtype", "type_name": "Drums", "name": "Snares", "new_name": "Sn"},
+    {
+        "op": "rename_subtype",
+        "type_name": "Drums",
+        "name": "Sn",
+        "new_name": "Pads",
+        "new_type": "Synth",
+    },
+    {"op": "rename_type", "name": "Synth", "new_name": "Drums"},
+    {"op": "rename_type", "name": "Synth", "new_name": "Keys"},
+    {"op": "add_type", "name": "Fx"},
+    {"op": "add_subtype", "type_name": "Fx", "name": "Risers"},
+    {"op": "delete_subtype", "type_name": "Fx", "name": "Risers"},
+    {"op": "delete_type", "name": "Fx"},
+    {"op": "add_artist", "name": "X"},
+    {"op": "add_song", "artist": "X", "song": {"name": "Y", "bpm": 120, "key": ""}},
+    {"op": "add_song", "artist": "Z", "song": {"name": "W", "bpm": None, "key": "A"}},
+    {"op": "add_song", "artist": "X", "song": {"name": "Y", "bpm": 90, "key": ""}},
+    {"op": "update_song", "artist": "X", "song": {"name": "Y", "bpm": 128, "key": "C"}},
+    {"op": "update_song", "artist": "X", "song": {"name": "Q", "bpm": 1, "key": ""}},
+    {"op": "add_song", "artist": "X", "song": {"name": "V", "bpm": 70, "key": ""}},
+    {"op": "rename_song", "artist": "X", "name": "Y", "new_name": "V"},
+    {"op": "rename_song", "artist": "X", "name": "Y", "new_name": "Y2"},
+    {
+        "op": "rename_song",
+        "artist": "X",
+        "name": "V",
+        "new_name": "V",
+        "new_artist": "Z",
+    },
+    {"op": "rename_artist", "name": "Z", "new_name": "X"},
+    {"op": "rename_artist", "name": "Z", "new_name": "Z2"},
+    {"op": "add_artist", "name": "Gone"},
+    {"op": "delete_song", "artist": "X", "name": "Y2"},
+    {"op": "delete_artist", "name": "Gone"},
+]
+
+
+def test_reloaded_catalog_matches_the_edited_one(library):
+    catalog = Catalog.load()
+    for entry in OPS[:10]:
+        catalog.update(**entry)
+    catalog.update_many(OPS[10:])
+    core.config_store().close()
+    assert Catalog.load().to_config() == catalog.to_config()
+
+
+def test_replay_applies_every_op():
+    config = Catalog.replay(None, OPS)
+    assert config["types"] == [
+        {"name": "Drums", "subtypes": ["Kicks"]},
+        {"name": "Keys", "subtypes": ["Pads"]},
+    ]
+    assert config["artists"] == {
+        "X": {"songs": []},
+        "Z2": {
+            "songs": [
+                {"name": "W", "bpm": None, "key": "A"},
+                {"name": "V", "bpm": 70, "key": ""},
+            ]
+        },
+    }
+
+
+def test_sorted_views_are_cached_until_their_part_changes():
+    catalog = Catalog(Catalog.replay(None, OPS[:5]))
+    types = catalog.type_names()
+    assert types == ["Drums", "Synth"] and catalog.type_names() is types
+    assert catalog.subtype_names("Drums") == ["Kicks", "Snares"]
+    rev = dict(catalog.rev)
+    catalog._add_subtype("Drums", "Claps")
+    assert catalog.subtype_names("Drums") == ["Claps", "Kicks", "Snares"]
+    assert catalog.type_names() is types
+    catalog._rename_type("Synth", "keys")
+    assert catalog.type_names() == ["Drums", "keys"]
+    assert catalog.rev == {"types": rev["types"] + 2, "artists": rev["artists"]}
+    catalog._add_song("a", {"name": "s", "bpm": 90})
+    assert catalog.artist_names() == ["a"] and catalog.song_names("a") == ["s"]
+    assert catalog.get_song("a", "s").key == "" and not catalog.has_subtype("keys", "x")
+    assert catalog.song_names("nobody") == [] and catalog.subtype_names("no") == []
+
+
+def test_inverse_undoes_deletes(library):
+    catalog = Catalog.load()
+    catalog.update_many(OPS[:5] + OPS[14:18])
+    before = catalog.to_config()
+    deletes = [
+        {"op": "delete_subtype", "type_name": "Drums", "name": "Kicks"},
+        {"op": "delete_type", "name": "Drums"},
+        {"op": "delete_song", "artist": "X", "name": "Y"},
+        {"op": "delete_artist", "name": "Z"},
+    ]
+    undo = []
+    for entry in deletes:
+        fields = dict(entry)
+        undo = catalog.inverse(fields.pop("op"), **fields) + undo
+        catalog.update(**entry)
+    assert catalog.type_names() == ["Synth"] and catalog.artist_names() == ["X"]
+    catalog.update_many(undo)
+    after = catalog.to_config()
+    assert sorted(t["name"] for t in after["types"]) == ["Drums", "Synth"]
+    assert {t["name"]: set(t["subtypes"]) for t in after["types"]} == {
+        t["name"]: set(t["subtypes"]) for t in before["types"]
+    }
+    assert after["artists"] == before["artists"]
+    assert catalog.inverse("delete_type", name="nope") == []
+
+
+def test_song_dirs_cover_every_subtype(library):
+    catalog = Catalog(Catalog.replay(None, OPS[:5]))
+    assert catalog.song_dirs("X", "Y") == [
+        core.target_dir("Drums", "Kicks", "X", "Y"),
+        core.target_dir("Drums", "Snares", "X", "Y"),
+    ]
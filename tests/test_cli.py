@@ -0,0 +1,32 @@
+import json
+
+import pytest
+
+import cli
+import core
+import renamer
+from hashindex import HashIndex
+
+
+def interrupted_artist_move(folder):
+    """A journaled rename of artist X to Z that crashed before moving."""
+    journal = {
+        "entry": {"op": "rename_artist", "name": "X", "new_name": "Z"},
+        "moves": [["Drums/Kicks/X", "Drums/Kicks/Z"]],
+        "rename_files": False,
+    }
+    core.STATE_DIR.mkdir(parents=True, exist_ok=True)
+    (core.STATE_DIR / renamer.MOVE_JOURNAL).write_text(json.dumps(journal))
+
+
+@pytest.mark.parametrize("command", [["fsck", "--quiet"], ["rename"]])
+def test_recovered_moves_update_the_hash_index(song_folder, command, capsys):
+    _, folder = song_folder
+    sample = folder / "Kick_boom.wav"
+    sample.write_bytes(b"RIFF")
+    HashIndex().add(sample, "d1")
+    interrupted_artist_move(folder)
+    cli.main(command + ["--root", str(core.ROOT_DIR)])
+    moved = core.target_dir("Drums", "Kicks", "Z", "Y") / "Kick_boom.wav"
+    assert moved.exists()
+    assert HashIndex().digests() == {moved: "d1"}
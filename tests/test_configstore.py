@@ -0,0 +1,90 @@
+import json
+
+import configstore
+from catalog import Catalog
+from configstore import ConfigStore
+
+EMPTY = {"types": [], "artists": {}}
+
+
+def store_at(tmp_path):
+    return ConfigStore(tmp_path / "config.json", Catalog.replay)
+
+
+def edited(tmp_path, *entries):
+    """A store that has journaled entries on top of an empty snapshot."""
+    store = store_at(tmp_path)
+    config = store.load(EMPTY)
+    for entry in entries:
+        config = Catalog.replay(config, [entry])
+        store.record(entry, lambda: config)
+    store.close()
+    return config
+
+
+def journal_lines(tmp_path):
+    return (tmp_path / "config.journal").read_text().splitlines()
+
+
+def test_load_replays_the_journal(tmp_path):
+    config = edited(
+        tmp_path,
+        {"op": "add_type", "name": "Drums"},
+        {"op": "add_subtype", "type_name": "Drums", "name": "Kicks"},
+    )
+    assert len(journal_lines(tmp_path)) == 3  # base + two changes
+    store = store_at(tmp_path)
+    assert store.load(EMPTY) == config
+    assert store.pending == 2
+    assert json.loads((tmp_path / "config.json").read_text()) == EMPTY
+
+
+def test_torn_last_line_is_dropped_and_compacted(tmp_path):
+    edited(
+        tmp_path,
+        {"op": "add_type", "name": "Drums"},
+        {"op": "add_type", "name": "Synth"},
+    )
+    journal = tmp_path / "config.journal"
+    journal.write_text(journal.read_text()[:-8])
+    store = store_at(tmp_path)
+    config = store.load(EMPTY)
+    assert config == {"types": [{"name": "Drums", "subtypes": []}], "artists": {}}
+    assert json.loads((tmp_path / "config.json").read_text()) == config
+    assert journal.read_text() == "" and store.pending == 0
+
+
+def test_compacts_every_compact_every_changes(tmp_path, monkeypatch):
+    monkeypatch.setattr(configstore, "COMPACT_EVERY", 3)
+    config = edited(tmp_path, *({"op": "add_type", "name": n} for n in "abcd"))
+    assert json.loads((tmp_path / "config.json").read_text())["types"] == [
+        {"name": n, "subtypes": []} for n in "abc"
+    ]
+    assert len(journal_lines(tmp_path)) == 2  # base + "d"
+    assert store_at(tmp_path).load(EMPTY) == config
+
+
+def test_record_many_journals_a_batch(tmp_path):
+    store = store_at(tmp_path)
+    store.load(EMPTY)
+    entries = [
+        {"op": "add_artist", "name": "X"},
+        {"op": "add_song", "artist": "X", "song": {"name": "Y", "bpm": 1, "key": ""}},
+    ]
+    store.record_many(entries, lambda: None)
+    store.close()
+    assert len(journal_lines(tmp_path)) == 3
+    assert store_at(tmp_path).load(EMPTY) == Catalog.replay(EMPTY, entries)
+
+
+def test_a_compaction_cut_short_is_not_replayed_again(tmp_path):
+    config = edited(
+        tmp_path,
+        {"op": "add_type", "name": "Synth"},
+        {"op": "rename_type", "name": "Synth", "new_name": "Keys"},
+    )
+    # the new snapshot landed, the journal truncate didn't
+    configstore.write_atomic(tmp_path / "config.json", json.dumps(config))
+    store = store_at(tmp_path)
+    assert store.load(EMPTY) == config
+    assert (tmp_path / "config.journal").read_text() == ""
@@ -0,0 +1,145 @@
+import wave
+
+import pytest
+
+import convert
+import ingest
+from analysis import load_pcm, to_float
+from ingest import FORMATS, Settings
+
+np = pytest.importorskip("numpy")
+
+
+def write_audio(path, x, rate, container="wav", bits=16):
+    """Write float frames x (frames, channels) as a WAV or AIFF file."""
+    fmt = FORMATS[bits]
+    order = "<" if container == "wav" else ">"
+    data = convert._encode(np.asarray(x, np.float32), fmt, order)
+    header = convert._header(container, x.shape[1], rate, fmt, len(x), b"")
+    path.write_bytes(header + data + b"\0" * (len(data) & 1))
+    return path
+
+
+def read_audio(path):
+    raw, pcm, rate = load_pcm(path)
+    return to_float(raw[:], pcm), pcm, rate
+
+
+def sine(freq, rate, seconds, amp=0.5, channels=2):
+    t = np.arange(int(rate * seconds)) / rate
+    return np.repeat((amp * np.sin(2 * np.pi * freq * t))[:, None], channels, 1)
+
+
+def test_resample_keeps_length_and_pitch(tmp_path):
+    src = write_audio(tmp_path / "a.wav", sine(1000, 44100, 1.0), 44100)
+    dest = tmp_path / "b.wav"
+    convert.convert_file(src, dest, Settings(rate=48000))
+    y, pcm, rate = read_audio(dest)
+    assert rate == 48000 and len(y) == 48000 and pcm["channels"] == 2
+    expected = sine(1000, 48000, 1.0)
+    # away from the edges, where the filter runs into the zero padding
+    middle = slice(1000, -1000)
+    assert np.abs(y[middle] - expected[middle]).max() < 2e-3
+
+
+def test_downsample_matches_the_ideal_signal(tmp_path):
+    src = write_audio(tmp_path / "a.wav", sine(440, 96000, 0.5), 96000, bits=24)
+    dest = tmp_path / "b.wav"
+    convert.convert_file(src, dest, Settings(rate=44100))
+    y, _, rate = read_audio(dest)
+    assert rate == 44100 and len(y) == 22050
+    expected = sine(440, 44100, 0.5)
+    assert np.abs(y[500:-500] - expected[500:-500]).max() < 2e-3
+
+
+@pytest.mark.parametrize("container", ["wav", "aiff"])
+@pytest.mark.parametrize("bits", [16, 24, 32])
+def test_bit_depth_and_header_round_trip(tmp_path, container, bits):
+    x = sine(220, 44100, 0.2, amp=0.8)
+    src = write_audio(tmp_path / "a", x, 44100, container, bits=16)
+    dest = tmp_path / "b"
+    size = convert.convert_file(src, dest, Settings(bits=bits))
+    assert size == dest.stat().st_size
+    y, pcm, rate = read_audio(dest)
+    assert (pcm["width"], pcm["float"]) == FORMATS[bits]
+    assert rate == 44100 and len(y) == len(x)
+    # widening 16-bit audio is exact
+    assert np.array_equal(y, to_float(load_pcm(src)[0][:], load_pcm(src)[1]))
+    if container == "wav" and bits != 32:
+        with wave.open(str(dest)) as w:
+            assert w.getsampwidth() * 8 == bits and w.getnframes() == len(x)
+
+
+def test_gain_for():
+    assert convert.gain_for(Settings(), 0.5, 0.1) == 1.0
+    peak = convert.gain_for(Settings(normalize="peak", level=-6.0), 0.25, 0.1)
+    assert peak == pytest.approx(10 ** (-6 / 20) / 0.25)
+    loud = Settings(normalize="loudness", level=-16.0)
+    assert convert.gain_for(loud, 0.2, 0.05) == pytest.approx(10 ** (-16 / 20) / 0.05)
+    # a quiet RMS with a loud peak is held back by the peak ceiling
+    assert convert.gain_for(loud, 0.9, 0.01) == pytest.approx(
+        10 ** (convert.PEAK_CEILING / 20) / 0.9
+    )
+    assert convert.gain_for(Settings(normalize="peak"), 0.0, 0.0) == 1.0
+
+
+@pytest.mark.parametrize("mode", ["peak", "loudness"])
+def test_normalize_hits_the_level(tmp_path, mode):
+    src = write_audio(tmp_path / "a.wav", sine(1000, 44100, 0.5, amp=0.1), 44100)
+    dest = tmp_path / "b.wav"
+    convert.convert_file(src, dest, Settings(normalize=mode))
+    y, _, _ = read_audio(dest)
+    peak = 20 * np.log10(np.abs(y).max())
+    if mode == "peak":
+        assert peak == pytest.approx(ingest.DEFAULT_LEVELS["peak"], abs=0.01)
+    else:
+        # -16 dB RMS would need a peak of -13 dBFS; a sine gets there
+        rms = 20 * np.log10(np.sqrt(np.mean(np.square(y, dtype=np.float64))))
+        assert rms == pytest.approx(ingest.DEFAULT_LEVELS["loudness"], abs=0.05)
+        assert peak <= convert.PEAK_CEILING
+
+
+def test_trim_keeps_a_short_pad_before_the_sound(tmp_path):
+    rate = 44100
+    x = np.concatenate([np.zeros((rate // 2, 2)), sine(1000, rate, 0.25)])
+    x[rate // 2] = 0.5  # the sine starts at 0; make the onset exact
+    src = write_audio(tmp_path / "a.wav", x, rate)
+    dest = tmp_path / "b.wav"
+    convert.convert_file(src, dest, Settings(trim=True))
+    y, _, _ = read_audio(dest)
+    pad = int(convert.TRIM_PAD * rate)
+    assert len(y) == len(x) - (rate // 2 - pad)
+    assert not y[:pad].any() and y[pad].any()
+
+
+def test_trim_leaves_silence_alone(tmp_path):
+    src = write_audio(tmp_path / "a.wav", np.zeros((1000, 1)), 44100)
+    dest = tmp_path / "b.wav"
+    convert.convert_file(src, dest, Settings(trim=True))
+    assert len(read_audio(dest)[0]) == 1000
+
+
+def test_pool_matches_serial(tmp_path, monkeypatch):
+    settings = Settings(rate=48000, bits=24, normalize="peak")
+    sources = [
+        write_audio(tmp_path / f"{i}.wav", sine(200 + 50 * i, 44100, 0.1), 44100)
+        for i in range(4)
+    ]
+    (tmp_path / "serial").mkdir()
+    (tmp_path / "pool").mkdir()
+    serial = list(
+        convert.convert_many(
+            [(s, tmp_path / "serial" / s.name) for s in sources], settings, workers=1
+        )
+    )
+    monkeypatch.setattr(convert, "POOL_THRESHOLD", 2)
+    pooled = list(
+        convert.convert_many(
+            [(s, tmp_path / "pool" / s.name) for s in sources], settings, workers=2
+        )
+    )
+    assert [r.ok for r in serial] == [r.ok for r in pooled] == [True] * 4
+    assert [r.size for r in serial] == [r.size for r in pooled]
+    for s in sources:
+        serial_bytes = (tmp_path / "serial" / s.name).read_bytes()
+        assert serial_bytes == (tmp_path / "pool" / s.name).read_bytes()
@@ -0,0 +1,160 @@
+import errno
+import hashlib
+import os
+
+import pytest
+
+import copyengine
+from copyengine import CopyEngine, copy_file, part_paths
+
+
+class Interrupted(Exception):
+    pass
+
+
+def checksum(data, chunk):
+    digests = b"".join(
+        hashlib.blake2b(data[i : i + chunk], digest_size=16).digest()
+        for i in range(0, len(data), chunk)
+    )
+    return hashlib.blake2b(digests, digest_size=16).hexdigest()
+
+
+@pytest.fixture
+def resumable(monkeypatch):
+    # checkpoint every 1 KiB of anything 1 KiB or bigger
+    monkeypatch.setattr(copyengine, "RESUME_MIN_SIZE", 1024)
+    monkeypatch.setattr(copyengine, "CHECKPOINT_BYTES", 1024)
+
+
+def interrupt_at(limit):
+    def progress(copied, size):
+        if copied >= limit:
+            raise Interrupted
+
+    return progress
+
+
+def test_interrupted_copy_resumes_from_its_checkpoint(tmp_path, resumable):
+    data = os.urandom(10_000)
+    src, dest = tmp_path / "big.wav", tmp_path / "out" / "big.wav"
+    src.write_bytes(data)
+    dest.parent.mkdir()
+    part, ckpt = part_paths(dest)
+    with pytest.raises(Interrupted):
+        copy_file(src, dest, interrupt_at(5000), chunk_size=256)
+    assert part.exists() and ckpt.exists() and not dest.exists()
+
+    seen = []
+    size, digest = copy_file(src, dest, lambda *p: seen.append(p), chunk_size=256)
+    # picked up at the checkpoint written just before the interruption
+    assert seen[0] == (5120, len(data))
+    assert dest.read_bytes() == data
+    assert (size, digest) == (len(data), checksum(data, 256))
+    assert not part.exists() and not ckpt.exists()
+
+
+def test_resume_starts_over_when_the_part_file_was_damaged(tmp_path, resumable):
+    data = os.urandom(4096)
+    src, dest = tmp_path / "big.wav", tmp_path / "copy.wav"
+    src.write_bytes(data)
+    with pytest.raises(Interrupted):
+        copy_file(src, dest, interrupt_at(3000), chunk_size=256)
+    part, _ = part_paths(dest)
+    with open(part, "r+b") as f:
+        f.seek(3072 - 256)
+        f.write(b"\0" * 256)
+    seen = []
+    copy_file(src, dest, lambda *p: seen.append(p), chunk_size=256)
+    assert seen[0][0] == 256 and dest.read_bytes() == data
+
+
+def test_small_interrupted_copy_leaves_nothing_behind(tmp_path):
+    src, dest = tmp_path / "a.wav", tmp_path / "b.wav"
+    src.write_bytes(os.urandom(4096))
+    with pytest.raises(Interrupted):
+        copy_file(src, dest, interrupt_at(1000), chunk_size=256)
+    assert not any(p.exists() for p in (dest, *part_paths(dest)))
+
+
+def test_copy_never_replaces_dest(tmp_path):
+    src, dest = tmp_path / "a.wav", tmp_path / "b.wav"
+    src.write_bytes(b"RIFF")
+    dest.write_bytes(b"mine")
+    with pytest.raises(FileExistsError):
+        copy_file(src, dest)
+    assert dest.read_bytes() == b"mine"
+    assert not part_paths(dest)[0].exists()
+
+
+def test_publish_falls_back_to_rename_without_hardlinks(tmp_path, monkeypatch):
+    src, dest = tmp_path / "a.wav", tmp_path / "b.wav"
+    src.write_bytes(b"RIFF" * 100)
+
+    def no_links(src, dest):
+        raise OSError(errno.EPERM, "Operation not permitted")
+
+    monkeypatch.setattr(copyengine.os, "link", no_links)
+    assert copy_file(src, dest) == (400, checksum(b"RIFF" * 100, 400))
+    assert dest.read_bytes() == b"RIFF" * 100
+    assert not part_paths(dest)[0].exists()
+
+
+def test_unexpected_error_fails_the_file_not_the_batch(tmp_path, monkeypatch):
+    src = tmp_path / "a.wav"
+    src.write_bytes(b"RIFF")
+
+    def broken(src, dest, mode="copy", progress=None):
+        raise ValueError("bad WAV header")
+
+    monkeypatch.setattr(copyengine, "store_file", broken)
+    done = []
+    engine = CopyEngine(workers=1)
+    batch = engine.copy([(src, tmp_path / "b.wav")], on_done=done.append)
+    assert batch.wait(timeout=5)
+    engine.shutdown()
+    assert [r.error for r in batch.failed] == ["bad WAV header"]
+    assert done == [batch]
+
+
+def test_raising_callback_still_finishes_the_batch(tmp_path):
+    src = tmp_path / "a.wav"
+    src.write_bytes(b"RIFF")
+
+    def on_file(result):
+        raise RuntimeError("callback bug")
+
+    done = []
+    engine = CopyEngine(workers=1)
+    batch = engine.copy(
+        [(src, tmp_path / "b.wav")], on_file=on_file, on_done=done.append
+    )
+    assert batch.wait(timeout=5)
+    engine.shutdown()
+    assert len(batch.ok) == 1 and done == [batch]
+
+
+def test_move_across_volumes_reports_the_copy(tmp_path, monkeypatch):
+    src = tmp_path / "a.wav"
+    src.write_bytes(b"RIFF")
+    monkeypatch.setattr(copyengine, "move_file", lambda *a: ("copy", "digest"))
+    assert copyengine.store_file(src, tmp_path / "b.wav", "move") == (
+        4,
+        "copy",
+        "digest",
+    )
+
+
+def test_source_changing_mid_copy_fails_and_cleans_up(tmp_path, resumable):
+    src, dest = tmp_path / "a.wav", tmp_path / "b.wav"
+    src.write_bytes(os.urandom(4096))
+
+    def grow(copied, size):
+        if copied == 256:
+            with open(src, "ab") as f:
+                f.write(b"more")
+
+    with pytest.raises(OSError) as e:
+        copy_file(src, dest, grow, chunk_size=256)
+    assert e.value.errno == errno.EAGAIN
+    assert not any(p.exists() for p in (dest, *part_paths(dest)))
@@ -0,0 +1,108 @@
+import os
+import time
+
+import core
+import fsck
+from catalog import Catalog
+from scanner import LibraryScan
+from trash import Trash
+
+OLD = time.time() - 2 * fsck.STALE_AFTER
+
+
+def write(path, data=b"RIFF", mtime=None):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def messy_library(song_folder):
+    """One issue of every kind around the Drums/Kicks/X/Y song folder."""
+    catalog, folder = song_folder
+    root = core.ROOT_DIR
+    write(folder / "Kick.wav")
+    write(root / "Synth" / "Pads" / "X" / "Y" / "Pad.wav")  # orphan type
+    write(root / "Drums" / "Kicks" / "Other" / "Song" / "a.wav")  # orphan artist
+    write(folder / "extra" / "b.wav")  # orphan subfolder
+    catalog.update_many(
+        [
+            {"op": "add_type", "name": "Fx"},
+            {"op": "add_subtype", "type_name": "Fx", "name": "Risers"},
+            {"op": "add_subtype", "type_name": "Drums", "name": "Snares"},
+            {"op": "add_song", "artist": "Gone", "song": {"name": "S"}},
+            {"op": "add_song", "artist": "X", "song": {"name": "Z"}},
+        ]
+    )
+    write(root / "Drums" / "loose.wav")  # stray
+    write(folder / "notes.txt")  # unknown
+    write(folder / ".c.wav.part", mtime=OLD)  # temp
+    write(folder / ".d.wav.renaming-0", mtime=OLD)  # temp
+    write(folder / ".e.wav.part")  # a copy still running
+    scan = LibraryScan()
+    scan.rescan()
+    return catalog, folder, scan
+
+
+def test_check_reports_every_kind(song_folder):
+    catalog, folder, scan = messy_library(song_folder)
+    issues = fsck.check(catalog, scan)
+    assert sorted(issues) == sorted(
+        [
+            ("orphan", "Synth", "type"),
+            ("orphan", "Drums/Kicks/Other", "artist"),
+            ("orphan", "Drums/Kicks/X/Y/extra", "subfolder"),
+            ("missing", "Fx", "type"),
+            ("missing", "Drums/Snares", "subtype"),
+            ("missing", "Gone", "artist"),
+            ("missing", "X/Z", "song"),
+            ("stray", "Drums/loose.wav", "not in a song folder"),
+            ("unknown", "Drums/Kicks/X/Y/notes.txt", "not an audio file"),
+            ("temp", "Drums/Kicks/X/Y/.c.wav.part", "interrupted copy or rename"),
+            (
+                "temp",
+                "Drums/Kicks/X/Y/.d.wav.renaming-0",
+                "interrupted copy or rename",
+            ),
+        ]
+    )
+
+
+def test_repair_adopts_creates_and_cleans(song_folder):
+    catalog, folder, scan = messy_library(song_folder)
+    issues = fsck.check(catalog, scan)
+    done = fsck.repair(catalog, scan, issues, adopt=True, create=True, clean=True)
+    assert done == {"adopted": 6, "created": 2, "cleaned": 2}
+    assert catalog.has_subtype("Synth", "Pads")
+    assert catalog.get_song("Other", "Song") is not None
+    assert (core.ROOT_DIR / "Fx" / "Risers").is_dir()
+    assert (folder / "d.wav").exists() and not (folder / ".c.wav.part").exists()
+    assert (folder / ".e.wav.part").exists()
+    # the adoption was journaled
+    assert Catalog.load().get_song("Other", "Song") is not None
+    scan.rescan()
+    left = fsck.check(Catalog.load(), scan)
+    assert {i.kind for i in left} == {"orphan", "missing", "stray", "unknown"}
+    assert [i.path for i in left if i.kind == "orphan"] == ["Drums/Kicks/X/Y/extra"]
+
+
+def test_repair_discards_and_prunes_as_one_undoable_delete(song_folder):
+    catalog, folder, scan = messy_library(song_folder)
+    issues = fsck.check(catalog, scan)
+    done = fsck.repair(catalog, scan, issues, discard=True, prune=True)
+    assert done == {"trashed": 5, "pruned": 2}
+    assert not (core.ROOT_DIR / "Synth").exists()
+    assert not (folder / "notes.txt").exists() and (folder / "Kick.wav").exists()
+    assert catalog.get_song("X", "Z") is None and "Gone" not in catalog.artists
+    scan.rescan()
+    left = fsck.check(catalog, scan)
+    assert sorted(i.path for i in left) == [
+        "Drums/Kicks/X/Y/.c.wav.part",
+        "Drums/Kicks/X/Y/.d.wav.renaming-0",
+        "Drums/Snares",
+        "Fx",
+    ]
+    tx, restored = Trash().undo(catalog)
+    assert len(restored) == 5 and (core.ROOT_DIR / "Drums" / "loose.wav").exists()
+    assert catalog.get_song("X", "Z") is not None and "Gone" in catalog.artists
@@ -0,0 +1,151 @@
+import pytest
+
+# tkinter and tkmacosx are only needed to import the module, not to run
+# these tests; they never create a window
+gui = pytest.importorskip("gui")
+
+
+class FakeWidget:
+    def __init__(self):
+        self.timers = []
+        self.errors = []
+
+    def after(self, ms, fn, *args):
+        self.timers.append(fn)
+
+    def report_callback_exception(self, exc, value, tb):
+        self.errors.append(value)
+
+
+def test_ui_queue_survives_a_raising_callback():
+    widget = FakeWidget()
+    ui = gui.UiQueue(widget)
+    ran = []
+
+    def broken():
+        raise ValueError("boom")
+
+    ui.post(broken)
+    ui.post(ran.append, 1)
+    ui.drain()
+    assert ran == [1]
+    assert [str(e) for e in widget.errors] == ["boom"]
+    # re-armed: the initial timer plus the one set by drain
+    assert widget.timers == [ui.drain, ui.drain]
+
+
+class FakeThumbs:
+    def __init__(self, cached):
+        self.cached = cached
+        self.computed = []
+
+    def load(self, paths):
+        return [p for p in paths if p not in self.cached]
+
+    def compute(self, paths, on_ready, cancelled):
+        for p in paths:
+            self.computed.append(p)
+            on_ready(p)
+
+
+class FakeApp:
+    def __init__(self, thumbs):
+        self.thumbs = thumbs
+        self.posted = []
+        self.ui_queue = self
+        self.on_thumbnail = "on_thumbnail"
+
+    def post(self, fn, *args):
+        self.posted.append((fn, *args))
+
+
+def test_thumbnails_load_and_compute_on_the_worker(tmp_path):
+    a, b = tmp_path / "a.wav", tmp_path / "b.wav"
+    app = FakeApp(FakeThumbs({a}))
+    gui.App.load_thumbnails(app, [a, b], lambda: False)
+    assert app.thumbs.computed == [b]
+    # one redraw for what the cache had, one per computed file
+    assert app.posted == [("on_thumbnail", a), ("on_thumbnail", b)]
+    app = FakeApp(FakeThumbs(set()))
+    gui.App.load_thumbnails(app, [a], lambda: True)
+    assert app.posted == [] and app.thumbs.computed == []
+
+
+class FakeCanvas:
+    def __init__(self):
+        self.options = {}
+        self.placed = {}
+
+    def winfo_width(self):
+        return 300
+
+    def itemconfigure(self, item, **options):
+        self.options.setdefault(item, {}).update(options)
+
+    def coords(self, item, *xy):
+        self.placed[item] = xy
+
+    def focus_set(self):
+        pass
+
+
+class CountingView:
+    """A lazy 20k-row source that counts the rows it hands out."""
+
+    def __init__(self, n):
+        self.n = n
+        self.reads = 0
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        self.reads += 1
+        return f"row {i}"
+
+
+def virtual_list(rows=5, on_select=None):
+    # a VirtualList without a window: just the state redraw() works on
+    vl = gui.VirtualList.__new__(gui.VirtualList)
+    vl.canvas = FakeCanvas()
+    vl.rows, vl.row_h = rows, 20
+    vl.top, vl.selected, vl.source = 0, None, []
+    vl.items = [f"row{i}" for i in range(rows + 1)]
+    vl.waves, vl.highlight, vl.vscroll = [], "highlight", None
+    vl.fg, vl.thumbnail, vl.on_select = "#f0f6fc", None, on_select
+    return vl
+
+
+def shown(vl):
+    return [vl.canvas.options[item]["text"] for item in vl.items]
+
+
+def test_virtual_list_draws_only_the_rows_in_view():
+    vl = virtual_list()
+    view = CountingView(20_000)
+    vl.set_source(view)
+    assert shown(vl) == [f"row {i}" for i in range(6)]
+    assert view.reads == 6
+    vl.yview("moveto", "0.5")
+    assert vl.top == 10_000 and shown(vl)[0] == "row 10000"
+    vl.scroll(50_000)
+    assert vl.top == 19_995
+    assert shown(vl) == [f"row {i}" for i in range(19_995, 20_000)] + [""]
+    assert view.reads == 6 + 6 + 5
+
+
+def test_virtual_list_selection_follows_keys_and_clicks():
+    picked = []
+    vl = virtual_list(on_select=lambda i, value: picked.append((i, value)))
+    vl.set_source([f"s{i}" for i in range(20)])
+    for _ in range(7):
+        vl._move(1)
+    assert vl.selected == 6 and vl.top == 2
+    assert vl.canvas.options["highlight"]["state"] == "normal"
+    assert vl.canvas.placed["highlight"] == (0, 80, 300, 100)
+    vl.scroll(10)
+    assert vl.canvas.options["highlight"]["state"] == "hidden"
+    vl._on_click(type("Event", (), {"y": 45})())
+    assert vl.selected == 14 and picked == [(14, "s14")]
+    vl.set_source(["a", "b"])
+    assert vl.top == 0 and vl.curselection() == () and shown(vl)[2] == ""
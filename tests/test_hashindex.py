@@ -0,0 +1,34 @@
+import os
+
+from hashindex import HashIndex, collapse
+
+
+def test_collapse_replaces_a_stale_temp_file(tmp_path):
+    keep, dup = tmp_path / "a.wav", tmp_path / "b.wav"
+    keep.write_bytes(b"RIFF" * 100)
+    dup.write_bytes(b"RIFF" * 100)
+    (tmp_path / ".b.wav.dedupe").write_bytes(b"left by a crash")
+    assert collapse([keep, dup]) == (400, [])
+    assert os.path.samefile(keep, dup)
+    assert not (tmp_path / ".b.wav.dedupe").exists()
+
+
+def test_collapse_reports_files_it_cannot_swap(tmp_path):
+    keep = tmp_path / "a.wav"
+    keep.write_bytes(b"RIFF")
+    gone = tmp_path / "missing" / "b.wav"
+    reclaimed, skipped = collapse([keep, gone])
+    assert reclaimed == 0 and [p for p, _ in skipped] == [gone]
+
+
+def test_rename_replaces_a_stale_row_for_the_new_name(library):
+    index = HashIndex()
+    old, new = library / "a.wav", library / "b.wav"
+    new.write_bytes(b"gone soon")
+    index.add(new)
+    new.unlink()
+    old.write_bytes(b"RIFF" * 100)
+    digest = index.add(old)
+    old.rename(new)
+    index.rename(old, new)
+    assert index.digests() == {new: digest}
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+import ingest
+from hashindex import HashIndex
+
+
+@pytest.mark.parametrize("duplicates", ["copy", "link", "skip"])
+def test_store_handles_duplicates(song_folder, tmp_path, duplicates):
+    _, folder = song_folder
+    index = HashIndex()
+    filed = folder / "Kick_old.wav"
+    filed.write_bytes(b"RIFF" * 100)
+    index.add(filed)
+    staged = tmp_path / "staged"
+    staged.mkdir()
+    (staged / "dup.wav").write_bytes(b"RIFF" * 100)
+    (staged / "new.wav").write_bytes(b"RIFX" * 100)
+    sources = [(staged / "dup.wav", "dup"), (staged / "new.wav", "new")]
+
+    prepared = ingest.prepare(sources, folder, {}, index)
+    assert list(prepared.dups.values()) == [filed]
+    seen = []
+    results = ingest.store(
+        prepared, duplicates=duplicates, index=index, progress=lambda *p: seen.append(p)
+    )
+
+    dup, new = folder / "dup.wav", folder / "new.wav"
+    assert results[new].ok and new.exists()
+    assert (dup in results) == (duplicates != "skip")
+    assert dup.exists() == (duplicates != "skip")
+    if duplicates == "link":
+        assert os.path.samefile(dup, filed)
+    assert seen[-1] == (len(results), len(results))
+    assert new in index.digests()
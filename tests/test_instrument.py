@@ -0,0 +1,83 @@
+import pytest
+
+import instrument
+
+
+@pytest.fixture
+def collecting():
+    instrument.reset()
+    instrument.enable()
+    yield
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled_probes_record_nothing():
+    instrument.reset()
+    assert not instrument.enabled
+
+    @instrument.timed("test.off")
+    def work():
+        return 42
+
+    assert work() == 42
+    with instrument.span("test.off.span"):
+        pass
+    assert instrument.stats() == {}
+
+
+def test_spans_and_timed_functions_are_counted(collecting):
+    @instrument.timed("test.fn")
+    def work(x):
+        if x < 0:
+            raise ValueError(x)
+        return x
+
+    assert work(1) == 1
+    with pytest.raises(ValueError):
+        work(-1)
+    with instrument.span("test.block", folder="x"):
+        pass
+    stats = instrument.stats()
+    assert stats["test.fn"][0] == 2 and stats["test.block"][0] == 1
+    count, last, peak, mean = stats["test.fn"]
+    assert 0 <= last <= peak and 0 <= mean <= peak
+
+
+def test_enable_and_disable_nest():
+    instrument.enable()
+    instrument.enable()
+    instrument.disable()
+    assert instrument.enabled
+    instrument.disable()
+    assert not instrument.enabled
+    instrument.disable()
+    assert not instrument.enabled
+
+
+def test_trace_round_trip(tmp_path):
+    path = tmp_path / "trace" / "run.jsonl"
+    instrument.start_trace(str(path))
+    assert instrument.tracing() == str(path) and instrument.enabled
+    for _ in range(3):
+        with instrument.span("test.a", n=1):
+            pass
+    with instrument.span("test.b"):
+        pass
+    assert instrument.stop_trace() == str(path)
+    assert instrument.tracing() is None and not instrument.enabled
+    with open(path, "a") as f:
+        f.write('{"name": "torn')
+    events = instrument.read_trace(path)
+    assert events[0]["ph"] == "M"  # the thread's name comes first
+    assert [e["name"] for e in events if e["ph"] == "X"] == ["test.a"] * 3 + ["test.b"]
+    assert events[1]["args"] == {"n": 1}
+    summary = instrument.summarize(events)
+    assert {name: count for name, count, _, _ in summary} == {
+        "test.a": 3,
+        "test.b": 1,
+    }
+    out = tmp_path / "chrome.json"
+    instrument.write_chrome(events, out)
+    assert out.read_text().startswith('{"traceEvents": [')
+    instrument.reset()
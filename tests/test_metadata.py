@@ -0,0 +1,44 @@
+from hashindex import HashIndex
+from metadata import MetadataStore
+
+
+def tagged(library, keys):
+    """One library file per key, its metadata stored under its digest."""
+    index, store = HashIndex(), MetadataStore()
+    for i, key in enumerate(keys):
+        path = library / f"{i}.wav"
+        path.write_bytes(b"RIFF%d" % i)
+        index.add(path)
+        store.put_many([(index.full_digests([path])[path], {"key": key})])
+    return store
+
+
+def found(store, key):
+    return sorted(meta["key"] for _, meta in store.find(key=key))
+
+
+def test_key_matches_the_whole_tonic(library):
+    store = tagged(library, ["C", "C Minor", "C#", "C# Minor", "c major", "D"])
+    assert found(store, "C") == ["C", "C Minor", "c major"]
+    assert found(store, "c#") == ["C#", "C# Minor"]
+    assert found(store, "C#  minor") == ["C# Minor"]
+    assert found(store, "C_") == []
+
+
+def test_files_sharing_a_fast_hash_keep_their_own_metadata(library):
+    # the same size and sampled blocks, different bytes in between
+    a, b = library / "a.wav", library / "b.wav"
+    data = bytearray(1 << 20)
+    a.write_bytes(data)
+    data[100_000] = 1
+    b.write_bytes(data)
+    index, store = HashIndex(), MetadataStore()
+    assert index.add(a) == index.add(b)
+    full = index.full_digests()
+    assert full[a] != full[b]
+    store.put_many([(full[a], {"key": "C"}), (full[b], {"key": "D"})])
+    assert [(p.name, m["key"]) for p, m in store.find(key="D")] == [("b.wav", "D")]
+    # re-adding a file drops its stored full hash with the rest of its row
+    b.write_bytes(bytes(1 << 20))
+    index.add(b)
+    assert index.full_digests([b]) == {b: full[a]}
@@ -0,0 +1,100 @@
+import core
+import renamer
+
+SONG = ("Drums", "Kicks", "X", "Y")
+
+
+def touch(folder, *names):
+    for name in names:
+        (folder / name).write_bytes(b"RIFF")
+
+
+def planned(plan):
+    return {src.name: dest.name for status, src, dest, _ in plan}
+
+
+def test_parse_keeps_base_names_that_look_like_prefixes():
+    parse = core.parse_filename
+    assert parse("Kick_808_boom_og.wav", "Kicks", "X", "Y", (120,), ("C Minor",)) == (
+        "808_boom",
+        {
+            "prefix_artist": False,
+            "prefix_song": False,
+            "prefix_bpm": False,
+            "prefix_key": False,
+            "suffix_og": True,
+        },
+        ".wav",
+    )
+    base, options, _ = parse(
+        "Kick_Am_chord.wav", "Kicks", "X", "Y", (120,), ("C Minor",)
+    )
+    assert base == "Am_chord" and not options["prefix_key"]
+    base, options, _ = parse(
+        "Kick_120_X_C_Minor_B_side.wav", "Kicks", "X", "Y", (120,), ("C Minor",)
+    )
+    assert base == "B_side"
+    assert options["prefix_bpm"] and options["prefix_artist"] and options["prefix_key"]
+
+
+def test_rename_leaves_numeric_and_note_base_names_alone(song_folder):
+    catalog, folder = song_folder
+    touch(folder, "Kick_808_boom_og.wav", "Kick_Am_chord_og.wav", "Kick_B_side_og.wav")
+    assert renamer.plan_renames(catalog, [SONG]) == []
+    plan = renamer.plan_renames(catalog, [SONG], {"prefix_bpm": True})
+    assert planned(plan) == {
+        "Kick_808_boom_og.wav": "Kick_120_808_boom_og.wav",
+        "Kick_Am_chord_og.wav": "Kick_120_Am_chord_og.wav",
+        "Kick_B_side_og.wav": "Kick_120_B_side_og.wav",
+    }
+
+
+def test_rename_picks_up_a_corrected_bpm_and_key(song_folder):
+    catalog, folder = song_folder
+    touch(folder, "Kick_118_Eb_Major_808_og.wav")
+    was = {"bpm": 118, "key": "Eb Major"}
+    plan = renamer.plan_renames(catalog, [SONG], renamed=was)
+    assert planned(plan) == {
+        "Kick_118_Eb_Major_808_og.wav": "Kick_120_C_Minor_808_og.wav"
+    }
+    # without the old values the prefixes are part of the base name
+    assert renamer.plan_renames(catalog, [SONG]) == []
+
+
+def test_move_renames_only_the_moved_prefix(song_folder):
+    catalog, folder = song_folder
+    touch(folder, "Kick_808_boom.wav", "Kick_X_Am_chord.wav", "Kick_120_X_B_side.wav")
+    skipped = renamer.move_node(
+        catalog, "rename_artist", {"name": "X", "new_name": "Z"}, rename_files=True
+    )
+    assert skipped == []
+    moved = core.target_dir("Drums", "Kicks", "Z", "Y")
+    assert sorted(p.name for p in moved.iterdir()) == [
+        "Kick_120_Z_B_side.wav",
+        "Kick_808_boom.wav",
+        "Kick_Z_Am_chord.wav",
+    ]
+
+
+def test_failed_rollback_leaves_the_file_for_recovery(song_folder, monkeypatch):
+    _, folder = song_folder
+    src, dest = folder / "a.wav", folder / "b.wav"
+    src.write_bytes(b"RIFF")
+
+    def blocked(tmp, dest):
+        # meanwhile something takes the source name, so it can't go back
+        (src / "sub").mkdir(parents=True)
+        raise OSError(5, "Input/output error")
+
+    monkeypatch.setattr(renamer, "_move_no_clobber", blocked)
+    [(stranded, to, reason)] = renamer.apply_renames([(src, dest)])
+    assert stranded.name.startswith(".b.wav.renaming") and stranded.exists()
+    assert to == dest and reason == "Input/output error"
+    assert renamer._journal_path().exists()
+
+    monkeypatch.undo()
+    (src / "sub").rmdir()
+    src.rmdir()
+    assert renamer.recover_renames()
+    assert dest.read_bytes() == b"RIFF" and not stranded.exists()
+    assert not renamer._journal_path().exists()
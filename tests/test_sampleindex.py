@@ -0,0 +1,101 @@
+import pytest
+
+import core
+import sampleindex
+from sampleindex import SampleIndex, tokenize
+from scanner import LibraryScan
+
+QUERIES = [
+    "kick",
+    "kic 120",
+    "120",
+    "12",
+    "1200",
+    "c#",
+    "C# minor",
+    "c",
+    "drums kick",
+    "x y",
+    "boom 120",
+    "café",
+    "cafe",
+    "zzz",
+    "_",
+]
+
+
+@pytest.fixture
+def library_files(song_folder):
+    catalog, folder = song_folder
+    catalog.update_many(
+        [
+            {"op": "add_subtype", "type_name": "Drums", "name": "Snares"},
+            {"op": "add_song", "artist": "X", "song": {"name": "Z", "key": "C# Minor"}},
+        ]
+    )
+    names = [
+        folder / "Kick_120_boom.wav",
+        folder / "Kick_1200_hz.wav",
+        folder / "Café_pad.aiff",
+        folder / "Kickstart.wav",
+        core.target_dir("Drums", "Snares", "X", "Z") / "Snare_C#_crack.wav",
+        core.target_dir("Drums", "Snares", "X", "Z") / "Clap.wav",
+    ]
+    for p in names:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_bytes(b"RIFF")
+    (folder / ".hidden.wav").write_bytes(b"RIFF")
+    return catalog, names
+
+
+def brute(index, paths, text):
+    terms = tokenize(text)
+    if not terms:
+        return []
+    out = []
+    for p in paths:
+        tokens = index.tokens(p.relative_to(core.ROOT_DIR).as_posix())
+        if all(
+            t in tokens if t.isdigit() else any(u.startswith(t) for u in tokens)
+            for t in terms
+        ):
+            out.append(p)
+    return sorted(out)
+
+
+def indexes(catalog, tmp_path, monkeypatch):
+    fts = SampleIndex(catalog, tmp_path / "fts.db")
+    monkeypatch.setattr(sampleindex, "_has_fts5", lambda db: False)
+    plain = SampleIndex(catalog, tmp_path / "plain.db")
+    return fts, plain
+
+
+def test_fts5_and_postings_give_the_same_results(library_files, tmp_path, monkeypatch):
+    catalog, paths = library_files
+    fts, plain = indexes(catalog, tmp_path, monkeypatch)
+    if not fts.fts:
+        pytest.skip("this SQLite has no FTS5")
+    assert not plain.fts
+    scan = LibraryScan()
+    scan.rescan()
+    for index in (fts, plain):
+        assert index.sync(scan) == (len(paths), 0)
+    for text in QUERIES:
+        expected = brute(fts, paths, text)
+        assert fts.search(text) == expected, text
+        assert plain.search(text) == expected, text
+
+
+def test_updates_keep_both_backends_in_step(library_files, tmp_path, monkeypatch):
+    catalog, paths = library_files
+    for index in indexes(catalog, tmp_path, monkeypatch):
+        index.add(paths)
+        index.add(paths[:1])  # re-adding replaces
+        assert index.count() == len(paths)
+        moved = paths[0].with_name("Kick_120_thud.wav")
+        index.rename(paths[0], moved)
+        assert index.search("thud") == [moved] and index.search("boom") == []
+        index.remove(moved)
+        index.remove_tree(paths[-1].parent)
+        assert index.search("snare") == [] and index.count() == len(paths) - 3
+        assert index.search("kick", limit=1) in ([paths[1]], [paths[3]])
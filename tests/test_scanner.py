@@ -0,0 +1,88 @@
+import os
+
+import scanner
+from scanner import LibraryScan
+
+OLD = 1_000_000_000  # seconds; far outside the racy window
+
+
+def age(*folders):
+    for folder in folders:
+        os.utime(folder, (OLD, OLD))
+
+
+def names(scan, **kwargs):
+    return sorted(e.path.name for e in scan.files(**kwargs))
+
+
+def make_tree(root):
+    kicks = root / "Drums" / "Kicks" / "X" / "Y"
+    kicks.mkdir(parents=True)
+    (kicks / "Kick.wav").write_bytes(b"RIFF")
+    (kicks / ".Kick2.wav.part").write_bytes(b"RI")
+    (kicks / "notes.txt").write_text("hi")
+    (root / ".fsys" / "x").mkdir(parents=True, exist_ok=True)
+    (root / ".fsys" / "x" / "hidden.wav").write_bytes(b"RIFF")
+    folders = [root, root / "Drums", root / "Drums" / "Kicks"]
+    return kicks, folders + [kicks.parent, kicks]
+
+
+def test_rescan_records_files_and_skips_hidden_folders(library):
+    kicks, folders = make_tree(library)
+    scan = LibraryScan()
+    assert scan.rescan() == (5, 5)
+    assert names(scan) == ["Kick.wav"]
+    assert names(scan, hidden=True, audio_only=False) == [
+        ".Kick2.wav.part",
+        "Kick.wav",
+        "notes.txt",
+    ]
+    assert scan.count() == (3, 5)
+    assert scan.has_folder(kicks) and not scan.has_folder(library / ".fsys")
+
+
+def test_rescan_lists_only_changed_folders(library):
+    kicks, folders = make_tree(library)
+    scan = LibraryScan()
+    age(*folders)
+    scan.rescan()
+    assert scan.rescan() == (0, 5)
+    (kicks / "Snare.wav").write_bytes(b"RIFF")
+    assert scan.rescan() == (1, 5)
+    assert names(scan) == ["Kick.wav", "Snare.wav"]
+    assert scan.rescan(full=True) == (5, 5)
+
+
+def test_a_folder_changed_near_the_scan_is_listed_again(library):
+    kicks, folders = make_tree(library)
+    scan = LibraryScan()
+    age(*folders)
+    scan.rescan()
+    (kicks / "a.wav").write_bytes(b"RIFF")
+    assert scan.rescan() == (1, 5)
+    # another change inside the same mtime tick leaves the mtime as it was
+    mtime = os.stat(kicks).st_mtime_ns
+    (kicks / "b.wav").write_bytes(b"RIFF")
+    os.utime(kicks, ns=(mtime, mtime))
+    assert scan.rescan() == (1, 5)
+    assert "b.wav" in names(scan)
+
+
+def test_rescan_trusts_a_folder_once_it_leaves_the_window(library, monkeypatch):
+    kicks, folders = make_tree(library)
+    scan = LibraryScan()
+    monkeypatch.setattr(scanner, "RACY_WINDOW_NS", 0)
+    scan.rescan()
+    assert scan.rescan() == (0, 5)
+
+
+def test_removed_folders_are_dropped(library):
+    kicks, folders = make_tree(library)
+    scan = LibraryScan()
+    scan.rescan()
+    for p in kicks.iterdir():
+        p.unlink()
+    kicks.rmdir()
+    scan.rescan()
+    assert names(scan, audio_only=False, hidden=True) == []
+    assert not scan.has_folder(kicks) and scan.count() == (0, 4)
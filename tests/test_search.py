@@ -0,0 +1,76 @@
+import random
+import re
+
+import pytest
+
+from search import SearchIndex, _span
+
+WORDS = ["kick", "snare", "big", "Hat", "open", "808", "boom", "ki", "sub", "tom"]
+
+
+def brute(index, text, limit):
+    """The ranking query() promises, by checking every key."""
+    q = text.lower()
+    keys = index.keys
+    if not q:
+        return index.values[:limit]
+    tiers = [[i for i, k in enumerate(keys) if k.startswith(q)]]
+    taken = set(tiers[0])
+    starts = [
+        i
+        for i, k in enumerate(keys)
+        if i not in taken
+        and any(
+            k[p - 1] in " _-.()[]" and k[p] not in " _-.()[]" and k[p:].startswith(q)
+            for p in range(1, len(k))
+        )
+    ]
+    tiers.append(starts)
+    taken.update(starts)
+    sub = [i for i, k in enumerate(keys) if q in k and i not in taken]
+    tiers.append(sorted(sub, key=lambda i: (keys[i].find(q), i)))
+    taken.update(sub)
+    if len(q) > 1:
+        pattern = re.compile(".*?".join(map(re.escape, q)), re.S)
+        fuzzy = [i for i, k in enumerate(keys) if i not in taken and pattern.search(k)]
+        tiers.append(sorted(fuzzy, key=lambda i: (_span(keys[i], q), i)))
+    return [index.values[i] for tier in tiers for i in tier][:limit]
+
+
+@pytest.fixture(scope="module")
+def names():
+    rng = random.Random(7)
+    seps = [" ", "_", "-", " (", ""]
+    out = set()
+    while len(out) < 400:
+        n = rng.randint(1, 4)
+        out.add("".join(rng.choice(WORDS) + rng.choice(seps) for _ in range(n)).strip())
+    return sorted(out)
+
+
+def test_ranking_tiers():
+    index = SearchIndex(["Big Kick", "Kick", "Kick 2", "Sidekick", "K_i_c_k", "Snare"])
+    assert index.query("kick") == ["Kick", "Kick 2", "Big Kick", "Sidekick", "K_i_c_k"]
+    assert index.query("") == sorted(index.values, key=str.lower)
+    assert index.query("zz") == []
+
+
+@pytest.mark.parametrize("limit", [5, 100])
+def test_queries_match_a_brute_force_filter(names, limit):
+    rng = random.Random(limit)
+    index = SearchIndex(names)
+    for _ in range(200):
+        text = rng.choice(names)[: rng.randint(1, 6)]
+        if rng.random() < 0.3:
+            text = "".join(rng.sample(text, len(text)))
+        assert index.query(text, limit) == brute(index, text, limit), text
+
+
+def test_narrowing_while_typing_matches_a_fresh_index(names):
+    # typing, then deleting, reuses the previous query's matches
+    index = SearchIndex(names)
+    for word in ["kick_boom", "hat sub", "808-tom", "bgkk", "snare"]:
+        typed = [word[:n] for n in range(1, len(word) + 1)]
+        for text in typed + typed[::-1]:
+            assert index.query(text) == brute(index, text, 100), text
+            assert index.query(text) == SearchIndex(names).query(text), text
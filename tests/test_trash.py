@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+import core
+import trash
+from catalog import Catalog
+from trash import Trash
+
+DELETE_SONG = [{"op": "delete_song", "artist": "X", "name": "Y"}]
+
+
+class Crash(Exception):
+    pass
+
+
+def manifest(tx):
+    return json.loads((tx.folder / trash.MANIFEST).read_text())
+
+
+def delete_song(catalog, folder):
+    (folder / "Kick.wav").write_bytes(b"RIFF")
+    return Trash().delete(catalog, DELETE_SONG, catalog.song_dirs("X", "Y"))
+
+
+def test_delete_commits_and_undo_restores(song_folder):
+    catalog, folder = song_folder
+    tx = delete_song(catalog, folder)
+    assert manifest(tx)["state"] == "committed"
+    assert not folder.exists()
+    assert (tx.folder / "0" / "Kick.wav").exists()
+    assert Catalog.load().get_song("X", "Y") is None
+
+    undone, restored = Trash().undo(catalog)
+    assert undone.id == tx.id and restored == [folder]
+    assert (folder / "Kick.wav").exists()
+    assert manifest(tx)["state"] == "undone"
+    assert Catalog.load().get_song("X", "Y").bpm == 120
+    assert Trash().undo(catalog) == (None, [])
+
+
+def test_undo_restores_next_to_a_new_folder(song_folder):
+    catalog, folder = song_folder
+    delete_song(catalog, folder)
+    folder.mkdir()
+    (folder / "New.wav").write_bytes(b"RIFF")
+    _, restored = Trash().undo(catalog)
+    assert restored == [folder.with_name("Y (restored)")]
+    assert (folder / "New.wav").exists()
+    assert (folder.with_name("Y (restored)") / "Kick.wav").exists()
+
+
+@pytest.mark.parametrize("crash_at", ["rename", "journal", "commit"])
+def test_recover_finishes_a_pending_delete(song_folder, monkeypatch, crash_at):
+    catalog, folder = song_folder
+    (folder / "Kick.wav").write_bytes(b"RIFF")
+
+    def crash(*args, **kwargs):
+        raise Crash
+
+    if crash_at == "rename":
+        monkeypatch.setattr(trash, "_rename", crash)
+    elif crash_at == "journal":
+        # folders moved, config not journaled yet
+        monkeypatch.setattr(Catalog, "update_many", crash)
+    else:
+        # folders moved and config journaled, manifest still pending
+        save = trash.Transaction.save
+        monkeypatch.setattr(
+            trash.Transaction,
+            "save",
+            lambda tx: crash() if tx.state == "committed" else save(tx),
+        )
+    with pytest.raises(Crash):
+        Trash().delete(catalog, DELETE_SONG, catalog.song_dirs("X", "Y"))
+    monkeypatch.undo()
+
+    [tx] = Trash().transactions()
+    assert tx.state == "pending"
+    restarted = Catalog.load()
+    assert Trash().recover(restarted) == 1
+    assert manifest(tx)["state"] == "committed"
+    assert not folder.exists() and (tx.folder / "0" / "Kick.wav").exists()
+    assert restarted.get_song("X", "Y") is None
+    assert Catalog.load().get_song("X", "Y") is None
+    assert Trash().recover(restarted) == 0
+
+
+def test_reclaim_keeps_the_newest_and_pending(library):
+    catalog = Catalog.load()
+    box = Trash()
+    txs = [box.delete(catalog, []) for _ in range(3)]
+    box.undo(catalog, txs[0])
+    pending = trash.Transaction("99999999999999999999", 0)
+    pending.folder.mkdir(parents=True)
+    pending.save()
+    (core.TRASH_DIR / "stray").mkdir()
+    assert box.reclaim(keep=1) == 2
+    assert sorted(p.name for p in core.TRASH_DIR.iterdir()) == [
+        txs[2].id,
+        pending.id,
+    ]
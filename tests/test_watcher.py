@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+import watcher
+from watcher import DirCache
+
+
+def wait_for(check, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if check():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_files_added_during_the_first_scan_show_up(tmp_path, monkeypatch):
+    cache = DirCache()
+    if cache.backend != "inotify":
+        pytest.skip("needs inotify")
+    (tmp_path / "a.wav").write_bytes(b"RIFF")
+    scan = watcher.scan_folder
+
+    def racy_scan(folder):
+        names = scan(folder)
+        if not (tmp_path / "late.wav").exists():
+            (tmp_path / "late.wav").write_bytes(b"RIFF")
+        return names
+
+    monkeypatch.setattr(watcher, "scan_folder", racy_scan)
+    cache.start()
+    try:
+        assert cache.listing(tmp_path) in (["a.wav"], ["a.wav", "late.wav"])
+        assert wait_for(lambda: cache.listing(tmp_path) == ["a.wav", "late.wav"])
+    finally:
+        cache.stop()
+
+
+def test_repeated_events_are_idempotent(tmp_path):
+    (tmp_path / "a.wav").write_bytes(b"RIFF")
+    seen = []
+    cache = DirCache(on_change=lambda folder, names: seen.append(names))
+    assert cache.listing(tmp_path) == ["a.wav"]
+    cache._patch(tmp_path, added=["a.wav"], removed=["gone.wav"])
+    assert seen == [] and cache.listing(tmp_path) == ["a.wav"]
+    cache._patch(tmp_path, added=["b.wav"])
+    cache._patch(tmp_path, added=["b.wav"])
+    assert seen == [["a.wav", "b.wav"]]
@@ -0,0 +1,212 @@
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+import core
+from analysis import to_float
+from metadata import read_header
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# (min, max) pairs per thumbnail, one signed byte each
+COLUMNS = 48
+# without numpy, frames read per column (evenly spaced) instead of all
+SAMPLES_PER_COLUMN = 256
+# key length, data length, mtime_ns, size
+RECORD = struct.Struct("<HHqq")
+
+
+def _peaks_numpy(mm, pcm, columns):
+    frames, width = pcm["frames"], pcm["channels"] * pcm["width"]
+    raw = np.frombuffer(mm, np.uint8, frames * width, pcm["offset"])
+    raw = raw.reshape(frames, width)
+    edges = np.linspace(0, frames, columns + 1).astype(int)
+    out = []
+    for a, b in zip(edges[:-1], edges[1:]):
+        if b <= a:
+            out.append((0.0, 0.0))
+            continue
+        x = to_float(raw[a:b], pcm)
+        out.append((float(x.min()), float(x.max())))
+    del raw
+    return out
+
+
+def _peaks_sampled(mm, pcm, columns):
+    frames, channels, width = pcm["frames"], pcm["channels"], pcm["width"]
+    align = channels * width
+    base = pcm["offset"]
+    order = "little" if pcm["order"] == "<" else "big"
+    signed = not pcm.get("unsigned")
+    scale = 1 << (8 * width - 1)
+    bias = 0 if signed else scale
+    unpack = struct.Struct(pcm["order"] + ("f" if width == 4 else "d")).unpack_from
+
+    def read(p):
+        if pcm["float"]:
+            return unpack(mm, p)[0]
+        return (int.from_bytes(mm[p : p + width], order, signed=signed) - bias) / scale
+
+    out = []
+    for c in range(columns):
+        a = frames * c // columns
+        b = frames * (c + 1) // columns
+        if b <= a:
+            out.append((0.0, 0.0))
+            continue
+        step = max(1, (b - a) // SAMPLES_PER_COLUMN)
+        # first channel only; plenty for a thumbnail
+        values = [read(base + i * align) for i in range(a, b, step)]
+        out.append((min(values), max(values)))
+    return out
+
+
+def waveform(path, columns=COLUMNS):
+    """Min/max decimation of a WAV/AIFF file into columns signed-byte pairs.
+
+    The samples are read through an mmap, so only the pages that are
+    touched get loaded. With numpy every frame counts; without it each
+    column is sampled. Returns bytes (min, max, min, max, ...), or b""
+    for files we can't decode.
+    """
+    meta, pcm = read_header(path)
+    if not meta or not pcm.get("supported") or not pcm.get("frames"):
+        return b""
+    if pcm["width"] not in (1, 2, 3, 4, 8) or "offset" not in pcm:
+        return b""
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if pcm["offset"] + pcm["frames"] * pcm["channels"] * pcm["width"] > size:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if np is not None:
+                peaks = _peaks_numpy(mm, pcm, columns)
+            else:
+                peaks = _peaks_sampled(mm, pcm, columns)
+    out = bytearray()
+    for lo, hi in peaks:
+        out += struct.pack(
+            "bb",
+            max(-127, min(127, round(lo * 127))),
+            max(-127, min(127, round(hi * 127))),
+        )
+    return bytes(out)
+
+
+class ThumbnailCache:
+    """Waveform thumbnails for library files, packed into one cache file.
+
+    STATE_DIR/thumbs.bin is a run of records (header, relative path,
+    waveform bytes), appended as thumbnails are computed; a later record
+    for the same path wins. Opening maps the file and indexes it, and an
+    entry is only used while the file's mtime and size still match.
+    Rewritten without stale records when they make up most of it.
+    """
+
+    def __init__(self, path=None):
+        self.root = core.ROOT_DIR
+        self.path = Path(path) if path else core.STATE_DIR / "thumbs.bin"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = {}  # rel path -> (mtime_ns, size, waveform)
+        self._ready = {}  # path -> waveform, checked against disk this session
+        self._records = 0
+        self._load()
+        self._out = open(self.path, "ab")
+        if self._records > 2 * len(self._index) + 1000:
+            self._compact()
+
+    def _load(self):
+        try:
+            f = open(self.path, "rb")
+        except FileNotFoundError:
+            return
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                pos = 0
+                end = len(mm)
+                while pos + RECORD.size <= end:
+                    klen, dlen, mtime, size = RECORD.unpack_from(mm, pos)
+                    pos += RECORD.size
+                    if pos + klen + dlen > end:
+                        break  # torn final append
+                    key = mm[pos : pos + klen].decode("utf-8", "replace")
+                    pos += klen
+                    self._index[key] = (mtime, size, mm[pos : pos + dlen])
+                    pos += dlen
+                    self._records += 1
+            if pos != end:
+                # drop the torn tail so new records stay readable
+                os.truncate(self.path, pos)
+
+    def _compact(self):
+        tmp = self.path.with_name(f".{self.path.name}.tmp")
+        with open(tmp, "wb") as f:
+            for key, (mtime, size, data) in self._index.items():
+                self._write(f, key, mtime, size, data)
+        self._out.close()
+        os.replace(tmp, self.path)
+        self._out = open(self.path, "ab")
+        self._records = len(self._index)
+
+    @staticmethod
+    def _write(f, key, mtime, size, data):
+        k = key.encode("utf-8")
+        f.write(RECORD.pack(len(k), len(data), mtime, size) + k + data)
+
+    def close(self):
+        self._out.close()
+
+    def get(self, path):
+        """Thumbnail for path if it's loaded and current, else None."""
+        return self._ready.get(path)
+
+    def load(self, paths):
+        """Make cached thumbnails for paths available to get().
+
+        Returns the paths that still need computing.
+        """
+        missing = []
+        for p in paths:
+            try:
+                st = os.stat(p)
+                key = Path(p).relative_to(self.root).as_posix()
+            except (OSError, ValueError):
+                continue
+            entry = self._index.get(key)
+            if entry is not None and entry[:2] == (st.st_mtime_ns, st.st_size):
+                self._ready[p] = entry[2]
+            else:
+                missing.append(p)
+        return missing
+
+    def compute(self, paths, on_ready=None, cancelled=None):
+        """Build and store thumbnails for paths (run off the UI thread).
+
+        on_ready(path) is called after each one; cancelled() is checked
+        between files so a stale request can be dropped.
+        """
+        for p in paths:
+            if cancelled is not None and cancelled():
+                return
+            try:
+                key = Path(p).relative_to(self.root).as_posix()
+                st = os.stat(p)
+                data = waveform(p)
+            except (OSError, ValueError, struct.error):
+                continue
+            with self._lock:
+                self._index[key] = (st.st_mtime_ns, st.st_size, data)
+                self._write(self._out, key, st.st_mtime_ns, st.st_size, data)
+                self._out.flush()
+                self._records += 1
+            self._ready[p] = data
+            if on_ready:
+                on_ready(p)
@@ -0,0 +1,194 @@
+import errno
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+import core
+from configstore import write_atomic
+
+# committed deletes kept around for undo; older ones are reclaimed
+KEEP_TRANSACTIONS = 20
+MANIFEST = "manifest.json"
+
+
+def _rename(src, dest):
+    try:
+        os.rename(src, dest)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        # a folder mounted from another volume inside the library
+        shutil.move(src, dest)
+
+
+class Transaction:
+    """One delete: library folders moved into the trash plus config changes.
+
+    state goes pending -> committed -> (undone). ``items`` are
+    {"path": library-relative folder, "slot": name inside the transaction
+    folder}; ``ops`` are the config journal entries the delete applied and
+    ``undo`` the entries that put them back.
+    """
+
+    __slots__ = ("id", "time", "state", "items", "ops", "undo")
+
+    def __init__(self, id, time, state="pending", items=(), ops=(), undo=()):
+        self.id = id
+        self.time = time
+        self.state = state
+        self.items = list(items)
+        self.ops = list(ops)
+        self.undo = list(undo)
+
+    @property
+    def folder(self):
+        return core.TRASH_DIR / self.id
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def save(self):
+        write_atomic(self.folder / MANIFEST, json.dumps(self.to_dict(), indent=1))
+
+
+class Trash:
+    """Deletes as renames into core.TRASH_DIR, reclaimed in the background.
+
+    delete() writes a pending manifest first, then renames each folder
+    into the transaction's own trash folder (one rename per node, however
+    many files it holds), then journals the config changes in one write
+    and marks the manifest committed. Renames and config ops are both
+    safe to repeat, so a transaction found pending after a crash is
+    simply finished (recover()).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reclaiming = threading.Lock()
+
+    def transactions(self):
+        """Every transaction in the trash, oldest first."""
+        out = []
+        try:
+            names = sorted(os.listdir(core.TRASH_DIR))
+        except FileNotFoundError:
+            return out
+        for name in names:
+            try:
+                with open(core.TRASH_DIR / name / MANIFEST) as f:
+                    out.append(Transaction(**json.load(f)))
+            except (OSError, ValueError, TypeError):
+                continue
+        return out
+
+    def delete(self, catalog, ops, paths=()):
+        """Apply config ops and move paths into the trash as one transaction.
+
+        ops are {"op": ..., **fields} entries for catalog.update_many.
+        Returns the committed Transaction.
+        """
+        undo = []
+        for entry in ops:
+            fields = dict(entry)
+            undo = catalog.inverse(fields.pop("op"), **fields) + undo
+        with self._lock:
+            tx = Transaction(f"{time.time_ns():020d}", time.time(), ops=ops, undo=undo)
+            tx.folder.mkdir(parents=True)
+            for i, p in enumerate(paths):
+                p = Path(p)
+                if p.exists():
+                    rel = p.relative_to(core.ROOT_DIR).as_posix()
+                    tx.items.append({"path": rel, "slot": str(i)})
+            tx.save()
+            self._finish(catalog, tx)
+        return tx
+
+    def _finish(self, catalog, tx):
+        for item in tx.items:
+            src = core.ROOT_DIR / item["path"]
+            dest = tx.folder / item["slot"]
+            if src.exists() and not dest.exists():
+                _rename(src, dest)
+        catalog.update_many(tx.ops)
+        tx.state = "committed"
+        tx.save()
+
+    def recover(self, catalog):
+        """Finish transactions a crash left pending. Returns how many."""
+        pending = [tx for tx in self.transactions() if tx.state == "pending"]
+        with self._lock:
+            for tx in pending:
+                self._finish(catalog, tx)
+        return len(pending)
+
+    def last(self):
+        committed = [tx for tx in self.transactions() if tx.state == "committed"]
+        return committed[-1] if committed else None
+
+    def undo(self, catalog, tx=None):
+        """Put back the last committed delete (or tx).
+
+        Folders go back where they were; if something new has been created
+        at that path since, the old folder comes back next to it as
+        "<name> (restored)". Returns (transaction, restored paths), or
+        (None, []) when there's nothing to undo.
+        """
+        with self._lock:
+            tx = tx or self.last()
+            if tx is None:
+                return None, []
+            restored = []
+            for item in tx.items:
+                src = tx.folder / item["slot"]
+                if not src.exists():
+                    continue
+                dest = core.ROOT_DIR / item["path"]
+                if dest.exists():
+                    dest = dest.with_name(f"{dest.name} (restored)")
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                _rename(src, dest)
+                restored.append(dest)
+            catalog.update_many(tx.undo)
+            tx.state = "undone"
+            tx.save()
+        return tx, restored
+
+    def reclaim(self, keep=KEEP_TRANSACTIONS):
+        """Really delete all but the newest keep committed transactions.
+
+        Meant for a background thread; removes the manifest first, so a
+        transaction being reclaimed can no longer be undone. Returns the
+        number of transactions removed.
+        """
+        if not self._reclaiming.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                txs = self.transactions()
+                committed = [tx for tx in txs if tx.state == "committed"]
+                old = committed[: max(0, len(committed) - keep)]
+                old += [tx for tx in txs if tx.state == "undone"]
+                for tx in old:
+                    os.unlink(tx.folder / MANIFEST)
+                known = {tx.id for tx in txs}
+                doomed = [tx.folder for tx in old]
+                # folders left by a reclaim that was interrupted halfway
+                try:
+                    doomed += [
+                        core.TRASH_DIR / name
+                        for name in os.listdir(core.TRASH_DIR)
+                        if name not in known
+                    ]
+                except FileNotFoundError:
+                    pass
+            for folder in doomed:
+                shutil.rmtree(folder, ignore_errors=True)
+            return len(old)
+        finally:
+            self._reclaiming.release()
+
+    def start_reclaim(self):
+        threading.Thread(target=self.reclaim, name="fsys-trash", daemon=True).start()
@@ -0,0 +1,274 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+from bisect import insort
+from pathlib import Path
+
+import instrument
+
+POLL_INTERVAL = 1.0
+
+# <sys/inotify.h>
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (
+    IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF
+)
+EVENT = struct.Struct("iIII")
+
+
+def _visible(name):
+    return not name.startswith(".")
+
+
+@instrument.timed("dir.list")
+def scan_folder(folder):
+    """Sorted names of the visible files in folder, or None if it's missing."""
+    try:
+        with os.scandir(folder) as it:
+            names = [e.name for e in it if _visible(e.name) and e.is_file()]
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    names.sort(key=str.lower)
+    return names
+
+
+class DirCache:
+    """Listings of library folders, kept current in the background.
+
+    The first listing() of a folder scans it once; after that it is a dict
+    read, and the folder is watched (inotify on Linux, polling the folder's
+    mtime elsewhere) so files added or removed behind the app's back are
+    patched into the cached list. Every change replaces the list rather
+    than mutating it, so a list handed to the UI never changes under it.
+
+    on_change(folder, names) is passed through dispatch like the copy
+    engine's callbacks; names is None once the folder is gone.
+    """
+
+    def __init__(self, on_change=None, dispatch=None, poll_interval=POLL_INTERVAL):
+        self.on_change = on_change
+        self.dispatch = dispatch or (lambda fn, *args: fn(*args))
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._entries = {}  # folder -> sorted names
+        self._mtimes = {}  # folder -> st_mtime_ns, for polling
+        self._wds = {}  # inotify wd -> folder
+        self._loading = {}  # folder -> changed while its first scan ran
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = _Inotify.open() if sys.platform.startswith("linux") else None
+
+    @property
+    def backend(self):
+        return "inotify" if self._inotify is not None else "poll"
+
+    def start(self):
+        if self._thread is None:
+            target = self._inotify_loop if self._inotify else self._poll_loop
+            self._thread = threading.Thread(
+                target=target, name="fsys-watch", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    # -- cache --
+
+    def listing(self, folder):
+        folder = Path(folder)
+        with self._lock:
+            names = self._entries.get(folder)
+        if names is not None:
+            return names
+        return self._load(folder)
+
+    def _load(self, folder):
+        # watch before scanning, so nothing slips in between the two
+        wd = self._inotify.add_watch(folder) if self._inotify else None
+        with self._lock:
+            if wd is not None:
+                self._wds[wd] = folder
+            self._loading[folder] = False
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            mtime = None
+        names = scan_folder(folder) if mtime is not None else None
+        with self._lock:
+            changed = self._loading.pop(folder, False)
+            if names is None:
+                if wd is not None and self._wds.pop(wd, None) is not None:
+                    self._inotify.rm_watch(wd)
+                return None
+            self._entries[folder] = names
+            self._mtimes[folder] = mtime
+        if changed:
+            # an event came in mid-scan; the scan may or may not have seen it
+            names = scan_folder(folder)
+            if names is None:
+                self.forget(folder)
+            else:
+                self._replace(folder, names)
+        return names
+
+    def add(self, path):
+        """Patch one new file in right away (e.g. after our own save)."""
+        path = Path(path)
+        self._patch(path.parent, added=[path.name])
+
+    def forget(self, folder):
+        """Drop folder and everything cached under it (e.g. after a delete)."""
+        folder = Path(folder)
+        with self._lock:
+            gone = [f for f in self._entries if f == folder or folder in f.parents]
+            for f in gone:
+                del self._entries[f]
+                self._mtimes.pop(f, None)
+            for wd, f in list(self._wds.items()):
+                if f in gone:
+                    del self._wds[wd]
+                    if self._inotify:
+                        self._inotify.rm_watch(wd)
+        for f in gone:
+            self._notify(f, None)
+
+    def _patch(self, folder, added=(), removed=()):
+        with self._lock:
+            names = self._entries.get(folder)
+            if names is None:
+                if folder in self._loading:
+                    self._loading[folder] = True
+                return
+            # events can repeat what the first scan already saw
+            present = set(names)
+            drop = {n for n in removed if n in present}
+            add = {n for n in added if _visible(n) and n not in present}
+            if not drop and not add:
+                return
+            new = [n for n in names if n not in drop]
+            for name in add:
+                insort(new, name, key=str.lower)
+            self._entries[folder] = new
+        self._notify(folder, new)
+
+    def _replace(self, folder, names):
+        with self._lock:
+            if folder not in self._entries or self._entries[folder] == names:
+                return
+            self._entries[folder] = names
+        self._notify(folder, names)
+
+    def _notify(self, folder, names):
+        if self.on_change:
+            self.dispatch(self.on_change, folder, names)
+
+    # -- backends --
+
+    def _poll_loop(self):
+        while not self._stop.wait(self.poll_interval):
+            with self._lock:
+                folders = list(self._mtimes.items())
+            for folder, mtime in folders:
+                try:
+                    now = os.stat(folder).st_mtime_ns
+                except OSError:
+                    self.forget(folder)
+                    continue
+                if now != mtime:
+                    with self._lock:
+                        self._mtimes[folder] = now
+                    names = scan_folder(folder)
+                    if names is None:
+                        self.forget(folder)
+                    else:
+                        self._replace(folder, names)
+
+    def _inotify_loop(self):
+        ino = self._inotify
+        while not self._stop.is_set():
+            for wd, mask, name in ino.read(timeout=0.5):
+                if mask & IN_Q_OVERFLOW:
+                    # missed events; rescan everything we're showing
+                    with self._lock:
+                        folders = list(self._entries)
+                    for folder in folders:
+                        names = scan_folder(folder)
+                        if names is None:
+                            self.forget(folder)
+                        else:
+                            self._replace(folder, names)
+                    continue
+                with self._lock:
+                    folder = self._wds.get(wd)
+                if folder is None:
+                    continue
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF | IN_IGNORED):
+                    self.forget(folder)
+                elif mask & IN_ISDIR:
+                    continue
+                elif mask & (IN_CREATE | IN_MOVED_TO):
+                    self._patch(folder, added=[name])
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._patch(folder, removed=[name])
+
+
+class _Inotify:
+    """Just enough of inotify(7) through ctypes."""
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+
+    @classmethod
+    def open(cls):
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        except (OSError, AttributeError):
+            return None
+        if fd < 0:
+            return None
+        return cls(libc, fd)
+
+    def add_watch(self, folder):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(str(folder)), ctypes.c_uint32(WATCH_MASK)
+        )
+        # out of watches (ENOSPC) just means this folder won't live-update
+        return wd if wd >= 0 else None
+
+    def rm_watch(self, wd):
+        self.libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos + EVENT.size <= len(data):
+            wd, mask, _cookie, length = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = data[pos : pos + length].rstrip(b"\0")
+            pos += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events